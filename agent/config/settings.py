@@ -19,6 +19,52 @@ class Settings:
         self.SERVER_PORT = int(os.getenv('SERVER_PORT', 5000))
         self.API_KEY = os.getenv('API_KEY', 'dev-key-123')
         
+        # Sync HTTP settings
+        self.SYNC_TIMEOUT = int(os.getenv('SYNC_TIMEOUT', 10))
+        self.SYNC_MAX_RETRIES = int(os.getenv('SYNC_MAX_RETRIES', 3))
+        self.SYNC_BACKOFF_FACTOR = float(os.getenv('SYNC_BACKOFF_FACTOR', 0.5))
+        self.SYNC_POOL_SIZE = int(os.getenv('SYNC_POOL_SIZE', 4))
+        self.SYNC_WIRE_FORMAT = os.getenv('SYNC_WIRE_FORMAT', 'auto')  # auto or json
+        self.SYNC_NEGOTIATE_INTERVAL = int(os.getenv('SYNC_NEGOTIATE_INTERVAL', 3600))  # seconds between format checks
+        self.SYNC_CHUNK_SIZE = int(os.getenv('SYNC_CHUNK_SIZE', 500))  # rows per table per upload
+        self.SYNC_INTERVAL = int(os.getenv('SYNC_INTERVAL', 300))  # seconds between syncs
+        self.SYNC_JITTER = int(os.getenv('SYNC_JITTER', 30))  # up to this many seconds earlier or later
+        
+        # System stats sampling settings
+        self.SYSTEM_PROBE_INTERVAL = int(os.getenv('SYSTEM_PROBE_INTERVAL', 15))  # seconds between probes
+        self.SYSTEM_FAST_INTERVAL = int(os.getenv('SYSTEM_FAST_INTERVAL', 2))  # seconds, after a spike
+        self.SYSTEM_CPU_THRESHOLD = float(os.getenv('SYSTEM_CPU_THRESHOLD', 85))  # percent
+        self.SYSTEM_MEMORY_THRESHOLD = float(os.getenv('SYSTEM_MEMORY_THRESHOLD', 90))  # percent
+        self.SYSTEM_CHANGE_THRESHOLD = float(os.getenv('SYSTEM_CHANGE_THRESHOLD', 25))  # points between probes
+        self.SYSTEM_MAX_ROWS_PER_HOUR = int(os.getenv('SYSTEM_MAX_ROWS_PER_HOUR', 240))
+        # One min/avg/max/p95 summary per window instead of individual rows (0 records rows as sampled).
+        # The default matches the calm sampling interval (12 rows/hour); a shorter window gives finer
+        # history at 3600/window rows per hour, still capped by SYSTEM_MAX_ROWS_PER_HOUR
+        self.STATS_AGGREGATION_WINDOW = int(os.getenv('STATS_AGGREGATION_WINDOW', 300))  # seconds
+        self.STATS_KEEP_RAW_SECONDS = int(os.getenv('STATS_KEEP_RAW_SECONDS', 0))  # local-only raw probes, 0 keeps none
+        
+        # Detailed metric collectors (comma separated, empty disables), see agent/monitors/collectors.py
+        self.METRIC_COLLECTORS = [
+            name.strip() for name in os.getenv(
+                'METRIC_COLLECTORS', 'cpu_cores,load,swap,filesystems,disk_io,network,processes'
+            ).split(',') if name.strip()
+        ]
+        self.METRIC_TOP_PROCESSES = int(os.getenv('METRIC_TOP_PROCESSES', 5))  # per ranking (CPU, memory)
+        
+        # Screenshot settings
+        self.SCREENSHOT_CHANGE_THRESHOLD = float(os.getenv('SCREENSHOT_CHANGE_THRESHOLD', 0.01))  # share of screen
+        self.SCREENSHOT_MAX_UNCHANGED = int(os.getenv('SCREENSHOT_MAX_UNCHANGED', 12))  # skips before a forced capture
+        self.SCREENSHOT_PROFILE = os.getenv('SCREENSHOT_PROFILE', 'balanced')  # full, balanced or low
+        self.SCREENSHOT_MAX_WIDTH = int(os.getenv('SCREENSHOT_MAX_WIDTH', 0))  # pixels, 0 uses the profile's
+        self.SCREENSHOT_QUALITY = int(os.getenv('SCREENSHOT_QUALITY', 0))  # JPEG 1-95, 0 uses the profile's
+        
+        # Screenshot capture worker process (False grabs and encodes inside the agent)
+        self.SCREENSHOT_WORKER = os.getenv('SCREENSHOT_WORKER', 'True').lower() == 'true'
+        self.SCREENSHOT_WORKER_RECYCLE = int(os.getenv('SCREENSHOT_WORKER_RECYCLE', 25))  # captures per worker
+        self.SCREENSHOT_WORKER_TIMEOUT = int(os.getenv('SCREENSHOT_WORKER_TIMEOUT', 30))  # seconds
+        self.SCREENSHOT_WORKER_NICE = int(os.getenv('SCREENSHOT_WORKER_NICE', 10))
+        self.SCREENSHOT_WORKER_MAX_MEMORY_MB = int(os.getenv('SCREENSHOT_WORKER_MAX_MEMORY_MB', 1024))
+        
         # Agent settings
         self.AGENT_ID = os.getenv('AGENT_ID', 'device-001')
         self.REPORT_INTERVAL = int(os.getenv('REPORT_INTERVAL', 300))  # 5 minutes
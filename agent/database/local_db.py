@@ -4,23 +4,114 @@ Local SQLite database management for storing device monitoring data
 
 import sqlite3
 import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
 from datetime import datetime
 from pathlib import Path
 
+# Tables drained to the server by the sync path
+SYNC_TABLES = ('power_events', 'session_events', 'system_stats', 'metric_samples')
+
+# Schema migrations applied in order, tracked with PRAGMA user_version
+SCHEMA_MIGRATIONS = [
+    # 1: partial indexes for the sync drain and timestamp indexes for recent-first reads
+    (1, [
+        'CREATE INDEX IF NOT EXISTS idx_power_events_unsynced ON power_events(id) WHERE synced = 0',
+        'CREATE INDEX IF NOT EXISTS idx_session_events_unsynced ON session_events(id) WHERE synced = 0',
+        'CREATE INDEX IF NOT EXISTS idx_system_stats_unsynced ON system_stats(id) WHERE synced = 0',
+        'CREATE INDEX IF NOT EXISTS idx_screenshots_unsynced ON screenshots(id) WHERE synced = 0',
+        'CREATE INDEX IF NOT EXISTS idx_power_events_timestamp ON power_events(timestamp)',
+        'CREATE INDEX IF NOT EXISTS idx_system_stats_timestamp ON system_stats(timestamp)',
+        'CREATE INDEX IF NOT EXISTS idx_screenshots_timestamp ON screenshots(timestamp)',
+    ]),
+    # 2: "no change" markers for captures skipped because the screen looked the same
+    (2, [
+        'ALTER TABLE screenshots ADD COLUMN unchanged_count INTEGER DEFAULT 0',
+        'ALTER TABLE screenshots ADD COLUMN last_checked DATETIME',
+    ]),
+    # 3: detailed metrics from the collector set, one narrow row per (metric, label) sample
+    (3, [
+        '''CREATE TABLE IF NOT EXISTS metric_samples (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            metric TEXT NOT NULL,
+            label TEXT NOT NULL DEFAULT '',
+            value REAL,
+            synced INTEGER DEFAULT 0
+        )''',
+        'CREATE INDEX IF NOT EXISTS idx_metric_samples_unsynced ON metric_samples(id) WHERE synced = 0',
+    ]),
+    # 4: per-window summaries from StatsAggregator, and the short-lived raw probes behind them
+    (4, [
+        'ALTER TABLE system_stats ADD COLUMN cpu_min REAL',
+        'ALTER TABLE system_stats ADD COLUMN cpu_max REAL',
+        'ALTER TABLE system_stats ADD COLUMN cpu_p95 REAL',
+        'ALTER TABLE system_stats ADD COLUMN memory_min REAL',
+        'ALTER TABLE system_stats ADD COLUMN memory_max REAL',
+        'ALTER TABLE system_stats ADD COLUMN memory_p95 REAL',
+        'ALTER TABLE system_stats ADD COLUMN sample_count INTEGER',
+        '''CREATE TABLE IF NOT EXISTS raw_system_samples (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            cpu_percent REAL,
+            memory_percent REAL
+        )''',
+        'CREATE INDEX IF NOT EXISTS idx_raw_system_samples_timestamp ON raw_system_samples(timestamp)',
+    ]),
+    # 5: seconds a summary's probes cover, which time-weighted averages are taken over
+    (5, [
+        'ALTER TABLE system_stats ADD COLUMN covered_seconds REAL',
+    ]),
+]
+
+# Window summary fields stored next to the averages in system_stats
+SUMMARY_COLUMNS = [
+    'cpu_min', 'cpu_max', 'cpu_p95', 'memory_min', 'memory_max', 'memory_p95', 'sample_count', 'covered_seconds'
+]
+
+# Rows per multi-row INSERT, keeps bound parameters under SQLite's limit
+INSERT_CHUNK = 300
+
+# Queue marker asking the writer thread to exit
+_STOP = object()
+
 class LocalDatabase:
-    def __init__(self, db_path='agent_data.db'):
-        """Initialize database connection"""
+    def __init__(self, db_path='agent_data.db', batch_size=500, flush_interval=1.0):
+        """
+        Initialize database connections and the write-behind writer
+        :param db_path: SQLite database file
+        :param batch_size: Maximum queued writes grouped into one transaction
+        :param flush_interval: Seconds queued writes may wait to be grouped
+        """
         self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
         self.connection = None
         self.logger = logging.getLogger(__name__)
+        
+        # Writes go through the queue to the writer thread, which owns its connection;
+        # reads use self.connection, serialized by a lock
+        self._write_connection = None
+        self._write_queue = queue.Queue()
+        self._read_lock = threading.Lock()
+        self._closed = False
+        
         self._init_database()
+        
+        self._writer_thread = threading.Thread(target=self._writer_loop, name='LocalDatabaseWriter', daemon=True)
+        self._writer_thread.start()
     
     def _init_database(self):
         """Create database and tables if they don't exist"""
         try:
-            self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
-            self.connection.row_factory = sqlite3.Row
-            cursor = self.connection.cursor()
+            self._write_connection = sqlite3.connect(self.db_path, check_same_thread=False)
+            cursor = self._write_connection.cursor()
+            
+            # WAL lets sync reads run while the writer commits; NORMAL only fsyncs at checkpoints
+            cursor.execute('PRAGMA journal_mode=WAL')
+            cursor.execute('PRAGMA synchronous=NORMAL')
             
             # Create power_events table
             cursor.execute('''
@@ -71,91 +162,228 @@ class LocalDatabase:
                 )
             ''')
             
-            self.connection.commit()
-            self.logger.info("Database initialized successfully")
+            self._write_connection.commit()
+            self._migrate()
             
+            self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
+            self.connection.row_factory = sqlite3.Row
+            self.logger.info("Database initialized successfully")
+        
         except sqlite3.Error as e:
             self.logger.error(f"Database initialization error: {e}")
             raise
     
-    def log_power_event(self, event_type, details=''):
-        """Log a power-related event"""
+    def _migrate(self):
+        """Apply pending schema migrations, each in its own transaction"""
+        cursor = self._write_connection.cursor()
+        current = cursor.execute('PRAGMA user_version').fetchone()[0]
+        
+        for version, statements in SCHEMA_MIGRATIONS:
+            if version <= current:
+                continue
+            
+            try:
+                cursor.execute('BEGIN')
+                for statement in statements:
+                    cursor.execute(statement)
+                # PRAGMA doesn't take parameters; version is a trusted int
+                cursor.execute(f'PRAGMA user_version = {int(version)}')
+                self._write_connection.commit()
+                self.logger.info(f"Applied schema migration {version}")
+            except sqlite3.Error:
+                self._write_connection.rollback()
+                raise
+    
+    def _writer_loop(self):
+        """Drain queued writes into grouped transactions"""
+        while True:
+            item = self._write_queue.get()
+            if item is _STOP:
+                return
+            
+            group = [item]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            
+            # Someone waiting on a result (flush, mark_as_synced, ...) commits the group at once
+            while len(group) < self.batch_size and group[-1][2] is None:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._write_queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                group.append(item)
+            
+            self._execute_group(group)
+            if stop:
+                return
+    
+    def _execute_group(self, group):
+        """Run one group of queued writes in a single transaction"""
+        results = []
+        cursor = self._write_connection.cursor()
         try:
-            cursor = self.connection.cursor()
-            cursor.execute('''
-                INSERT INTO power_events (event_type, details, timestamp)
-                VALUES (?, ?, ?)
-            ''', (event_type, details, datetime.now()))
-            self.connection.commit()
-            self.logger.info(f"Logged power event: {event_type}")
-            return cursor.lastrowid
+            cursor.execute('BEGIN')
+            for sql, params, _ in group:
+                if sql is None:
+                    results.append(None)  # flush marker
+                    continue
+                try:
+                    cursor.execute(sql, params)
+                    results.append(cursor.lastrowid)
+                except sqlite3.Error as e:
+                    results.append(e)
+            self._write_connection.commit()
         except sqlite3.Error as e:
-            self.logger.error(f"Error logging power event: {e}")
+            self.logger.error(f"Error committing queued writes: {e}")
+            self._write_connection.rollback()
+            results = [e] * len(group)
+        
+        for (_, _, future), result in zip(group, results):
+            if isinstance(result, Exception):
+                if future is not None:
+                    future.set_exception(result)
+                else:
+                    self.logger.error(f"Error in queued write: {result}")
+            elif future is not None:
+                future.set_result(result)
+    
+    def _write(self, sql, params=(), wait=False):
+        """
+        Queue a write for the writer thread
+        :param wait: Block until committed and return lastrowid (raises sqlite3.Error)
+        """
+        if self._closed:
+            self.logger.warning("Write after database close ignored")
             return None
+        
+        future = Future() if wait else None
+        self._write_queue.put((sql, params, future))
+        return future.result() if wait else True
+    
+    def _read(self, sql, params=()):
+        """Run a read query on the shared read connection"""
+        with self._read_lock:
+            cursor = self.connection.cursor()
+            cursor.execute(sql, params)
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def flush(self):
+        """Block until every write queued so far is committed"""
+        if not self._closed:
+            self._write(None, wait=True)
+    
+    def log_power_event(self, event_type, details=''):
+        """Log a power-related event"""
+        self._write('''
+            INSERT INTO power_events (event_type, details, timestamp)
+            VALUES (?, ?, ?)
+        ''', (event_type, details, datetime.now()))
+        self.logger.info(f"Logged power event: {event_type}")
+        return True
     
     def log_session_event(self, session_type, start_time, end_time=None, duration=None, username=''):
         """Log a session event (login/logout)"""
+        self._write('''
+            INSERT INTO session_events (session_type, start_time, end_time, duration, username)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (session_type, start_time, end_time, duration, username))
+        self.logger.info(f"Logged session event: {session_type}")
+        return True
+    
+    def log_system_stats(self, cpu_percent, memory_percent, disk_percent, uptime, summary=None):
+        """
+        Log current system statistics
+        :param summary: Optional window summary (see SUMMARY_COLUMNS); cpu/memory_percent are then the window averages
+        """
+        summary = summary or {}
+        return self._write(f'''
+            INSERT INTO system_stats (cpu_percent, memory_percent, disk_percent, uptime, {', '.join(SUMMARY_COLUMNS)})
+            VALUES (?, ?, ?, ?, {', '.join('?' * len(SUMMARY_COLUMNS))})
+        ''', (cpu_percent, memory_percent, disk_percent, uptime) + tuple(summary.get(c) for c in SUMMARY_COLUMNS))
+    
+    def log_raw_sample(self, cpu_percent, memory_percent):
+        """Keep one raw CPU/memory probe locally (never synced, see prune_raw_samples)"""
+        return self._write(
+            'INSERT INTO raw_system_samples (cpu_percent, memory_percent) VALUES (?, ?)',
+            (cpu_percent, memory_percent)
+        )
+    
+    def prune_raw_samples(self, max_age_seconds):
+        """Delete raw probes older than max_age_seconds"""
         try:
-            cursor = self.connection.cursor()
-            cursor.execute('''
-                INSERT INTO session_events (session_type, start_time, end_time, duration, username)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (session_type, start_time, end_time, duration, username))
-            self.connection.commit()
-            self.logger.info(f"Logged session event: {session_type}")
-            return cursor.lastrowid
+            self._write(
+                "DELETE FROM raw_system_samples WHERE timestamp < datetime('now', ?)",
+                (f'-{int(max_age_seconds)} seconds',)
+            )
+            return True
         except sqlite3.Error as e:
-            self.logger.error(f"Error logging session event: {e}")
-            return None
+            self.logger.error(f"Error pruning raw samples: {e}")
+            return False
     
-    def log_system_stats(self, cpu_percent, memory_percent, disk_percent, uptime):
-        """Log current system statistics"""
+    def get_raw_samples(self, limit=500):
+        """Get the most recent raw probes, newest first"""
         try:
-            cursor = self.connection.cursor()
-            cursor.execute('''
-                INSERT INTO system_stats (cpu_percent, memory_percent, disk_percent, uptime)
-                VALUES (?, ?, ?, ?)
-            ''', (cpu_percent, memory_percent, disk_percent, uptime))
-            self.connection.commit()
-            return cursor.lastrowid
+            return self._read('SELECT * FROM raw_system_samples ORDER BY timestamp DESC LIMIT ?', (limit,))
         except sqlite3.Error as e:
-            self.logger.error(f"Error logging system stats: {e}")
-            return None
+            self.logger.error(f"Error retrieving raw samples: {e}")
+            return []
     
-    def get_unsynced_events(self):
-        """Retrieve all events that haven't been synced to the server"""
-        try:
-            cursor = self.connection.cursor()
-            
-            # Get power events
-            cursor.execute('SELECT * FROM power_events WHERE synced = 0')
-            power_events = [dict(row) for row in cursor.fetchall()]
-            
-            # Get session events
-            cursor.execute('SELECT * FROM session_events WHERE synced = 0')
-            session_events = [dict(row) for row in cursor.fetchall()]
+    def log_metric_samples(self, samples):
+        """
+        Log collector samples, all with the same timestamp
+        :param samples: List of (metric, label, value) tuples
+        """
+        timestamp = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')  # same form as CURRENT_TIMESTAMP
+        for start in range(0, len(samples), INSERT_CHUNK):
+            chunk = samples[start:start + INSERT_CHUNK]
+            params = []
+            for metric, label, value in chunk:
+                params.extend((timestamp, metric, label, value))
+            self._write(
+                'INSERT INTO metric_samples (timestamp, metric, label, value) VALUES '
+                + ', '.join(['(?, ?, ?, ?)'] * len(chunk)),
+                params
+            )
+        return True
+    
+    def iter_unsynced_batches(self, chunk_size=500):
+        """
+        Yield unsynced data for all sync tables as chunked envelopes
+        Each envelope holds up to chunk_size rows per table, keyed by table name
+        """
+        cursors = {table_name: 0 for table_name in SYNC_TABLES}
+        while True:
+            batch = {}
+            try:
+                for table_name in SYNC_TABLES:
+                    batch[table_name] = self._read(
+                        f'SELECT * FROM {table_name} WHERE synced = 0 AND id > ? ORDER BY id LIMIT ?',
+                        (cursors[table_name], chunk_size)
+                    )
+            except sqlite3.Error as e:
+                self.logger.error(f"Error retrieving unsynced events: {e}")
+                return
             
-            # Get system stats
-            cursor.execute('SELECT * FROM system_stats WHERE synced = 0')
-            system_stats = [dict(row) for row in cursor.fetchall()]
+            if not any(batch.values()):
+                return
             
-            return {
-                'power_events': power_events,
-                'session_events': session_events,
-                'system_stats': system_stats
-            }
-        except sqlite3.Error as e:
-            self.logger.error(f"Error retrieving unsynced events: {e}")
-            return None
+            yield batch
+            for table_name, rows in batch.items():
+                if rows:
+                    cursors[table_name] = rows[-1]['id']
     
     def mark_as_synced(self, table_name, event_ids):
         """Mark events as synced to the server"""
         try:
-            cursor = self.connection.cursor()
             placeholders = ','.join('?' * len(event_ids))
             query = f'UPDATE {table_name} SET synced = 1 WHERE id IN ({placeholders})'
-            cursor.execute(query, event_ids)
-            self.connection.commit()
+            self._write(query, event_ids, wait=True)
             self.logger.info(f"Marked {len(event_ids)} events as synced in {table_name}")
             return True
         except sqlite3.Error as e:
@@ -165,13 +393,11 @@ class LocalDatabase:
     def get_recent_stats(self, limit=10):
         """Get recent system statistics"""
         try:
-            cursor = self.connection.cursor()
-            cursor.execute('''
-                SELECT * FROM system_stats 
-                ORDER BY timestamp DESC 
+            return self._read('''
+                SELECT * FROM system_stats
+                ORDER BY timestamp DESC
                 LIMIT ?
             ''', (limit,))
-            return [dict(row) for row in cursor.fetchall()]
         except sqlite3.Error as e:
             self.logger.error(f"Error retrieving recent stats: {e}")
             return []
@@ -179,23 +405,39 @@ class LocalDatabase:
     def log_screenshot(self, filename, filepath, filesize):
         """Log a screenshot capture"""
         try:
-            cursor = self.connection.cursor()
-            cursor.execute('''
+            # Written synchronously: screenshot cleanup reads the table right after
+            return self._write('''
                 INSERT INTO screenshots (filename, filepath, filesize, timestamp)
                 VALUES (?, ?, ?, ?)
-            ''', (filename, filepath, filesize, datetime.now()))
-            self.connection.commit()
-            return cursor.lastrowid
+            ''', (filename, filepath, filesize, datetime.now()), wait=True)
         except sqlite3.Error as e:
             self.logger.error(f"Error logging screenshot: {e}")
             return None
     
+    def mark_screenshot_unchanged(self, screenshot_id):
+        """Record that a capture matched this screenshot and was skipped"""
+        try:
+            self._write('''
+                UPDATE screenshots SET unchanged_count = unchanged_count + 1, last_checked = ?
+                WHERE id = ?
+            ''', (datetime.now(), screenshot_id))
+            return True
+        except sqlite3.Error as e:
+            self.logger.error(f"Error marking screenshot unchanged: {e}")
+            return False
+    
+    def get_unsynced_screenshots(self):
+        """Get screenshots the server hasn't acknowledged yet, oldest first"""
+        try:
+            return self._read('SELECT * FROM screenshots WHERE synced = 0 ORDER BY id')
+        except sqlite3.Error as e:
+            self.logger.error(f"Error retrieving unsynced screenshots: {e}")
+            return []
+    
     def get_screenshots(self):
         """Get all screenshots"""
         try:
-            cursor = self.connection.cursor()
-            cursor.execute('SELECT * FROM screenshots ORDER BY timestamp DESC')
-            return [dict(row) for row in cursor.fetchall()]
+            return self._read('SELECT * FROM screenshots ORDER BY timestamp DESC')
         except sqlite3.Error as e:
             self.logger.error(f"Error retrieving screenshots: {e}")
             return []
@@ -203,16 +445,28 @@ class LocalDatabase:
     def delete_screenshot(self, screenshot_id):
         """Delete a screenshot from database"""
         try:
-            cursor = self.connection.cursor()
-            cursor.execute('DELETE FROM screenshots WHERE id = ?', (screenshot_id,))
-            self.connection.commit()
+            self._write('DELETE FROM screenshots WHERE id = ?', (screenshot_id,), wait=True)
             return True
         except sqlite3.Error as e:
             self.logger.error(f"Error deleting screenshot: {e}")
             return False
     
     def close(self):
-        """Close database connection"""
+        """Flush queued writes and close database connections"""
+        if self._closed:
+            return
+        
+        self._closed = True
+        self._write_queue.put(_STOP)
+        self._writer_thread.join()
+        
+        # Anything that raced in behind the stop marker is not written
+        while not self._write_queue.empty():
+            _, _, future = self._write_queue.get_nowait()
+            if future is not None:
+                future.set_exception(sqlite3.ProgrammingError('Database is closed'))
+        
+        self._write_connection.close()
         if self.connection:
             self.connection.close()
-            self.logger.info("Database connection closed")
\ No newline at end of file
+        self.logger.info("Database connection closed")
@@ -5,7 +5,6 @@ Monitors device power states and system events
 """
 
 import sys
-import time
 import signal
 import logging
 from pathlib import Path
@@ -17,26 +16,69 @@ from agent.config.settings import Settings
 from agent.monitors.power_monitor import PowerMonitor
 from agent.monitors.system_monitor import SystemMonitor
 from agent.monitors.screenshot_monitor import ScreenshotMonitor
+from agent.monitors.capture_worker import CaptureWorker
+from agent.monitors.collectors import CollectorSet
 from agent.database.local_db import LocalDatabase
 from agent.utils.logger import setup_logger
+from agent.utils.scheduler import Scheduler
 from agent.sync.server_sync import ServerSync
-import schedule
 
 class DeviceMonitorAgent:
     def __init__(self):
         self.settings = Settings()
         self.logger = setup_logger()
         self.db = LocalDatabase()
+        # One thread runs every periodic task (plus a worker for capture and sync)
+        self.scheduler = Scheduler(self.logger)
         self.power_monitor = PowerMonitor(self.db, self.logger)
-        self.system_monitor = SystemMonitor(self.db, self.logger)
-        self.screenshot_monitor = ScreenshotMonitor(self.db, self.logger, interval=300, max_screenshots=3)
+        self.system_monitor = SystemMonitor(
+            self.db,
+            self.logger,
+            probe_interval=self.settings.SYSTEM_PROBE_INTERVAL,
+            fast_interval=self.settings.SYSTEM_FAST_INTERVAL,
+            cpu_threshold=self.settings.SYSTEM_CPU_THRESHOLD,
+            memory_threshold=self.settings.SYSTEM_MEMORY_THRESHOLD,
+            change_threshold=self.settings.SYSTEM_CHANGE_THRESHOLD,
+            max_rows_per_hour=self.settings.SYSTEM_MAX_ROWS_PER_HOUR,
+            aggregation_window=self.settings.STATS_AGGREGATION_WINDOW,
+            keep_raw_seconds=self.settings.STATS_KEEP_RAW_SECONDS,
+            collectors=CollectorSet.from_names(
+                self.settings.METRIC_COLLECTORS, top_processes=self.settings.METRIC_TOP_PROCESSES
+            ) if self.settings.METRIC_COLLECTORS else None
+        )
+        self.screenshot_monitor = ScreenshotMonitor(
+            self.db,
+            self.logger,
+            interval=300,
+            max_screenshots=3,
+            change_threshold=self.settings.SCREENSHOT_CHANGE_THRESHOLD,
+            max_unchanged=self.settings.SCREENSHOT_MAX_UNCHANGED,
+            capture_worker=CaptureWorker(
+                profile=self.settings.SCREENSHOT_PROFILE,
+                max_width=self.settings.SCREENSHOT_MAX_WIDTH,
+                quality=self.settings.SCREENSHOT_QUALITY,
+                use_process=self.settings.SCREENSHOT_WORKER,
+                recycle=self.settings.SCREENSHOT_WORKER_RECYCLE,
+                timeout=self.settings.SCREENSHOT_WORKER_TIMEOUT,
+                nice=self.settings.SCREENSHOT_WORKER_NICE,
+                max_memory_mb=self.settings.SCREENSHOT_WORKER_MAX_MEMORY_MB
+            )
+        )
         self.server_sync = ServerSync(
             database=self.db,
             server_url=f"http://{self.settings.SERVER_HOST}:{self.settings.SERVER_PORT}",
             api_key=self.settings.API_KEY,
-            device_id=self.settings.AGENT_ID
+            device_id=self.settings.AGENT_ID,
+            timeout=self.settings.SYNC_TIMEOUT,
+            max_retries=self.settings.SYNC_MAX_RETRIES,
+            backoff_factor=self.settings.SYNC_BACKOFF_FACTOR,
+            pool_size=self.settings.SYNC_POOL_SIZE,
+            wire_format=self.settings.SYNC_WIRE_FORMAT,
+            negotiate_interval=self.settings.SYNC_NEGOTIATE_INTERVAL,
+            chunk_size=self.settings.SYNC_CHUNK_SIZE
         )
         self.running = False
+        self.stopped = False
         
     def start(self):
         """Start the monitoring agent"""
@@ -52,17 +94,22 @@ class DeviceMonitorAgent:
             if self.server_sync.test_connection():
                 self.server_sync.register_device()
             
-            self.power_monitor.start()
-            self.system_monitor.start()
-            self.screenshot_monitor.start()
+            self.power_monitor.start(self.scheduler)
+            self.system_monitor.start(self.scheduler)
+            self.screenshot_monitor.start(self.scheduler)
             
-            # Schedule sync every 5 minutes
-            schedule.every(5).minutes.do(self.server_sync.sync_all)
+            # Sync every 5 minutes; jitter keeps a fleet from uploading in lockstep
+            self.scheduler.every(
+                self.settings.SYNC_INTERVAL,
+                self.server_sync.sync_all,
+                name='sync',
+                jitter=self.settings.SYNC_JITTER,
+                threaded=True
+            )
             
-            # Main loop
-            while self.running:
-                schedule.run_pending()
-                time.sleep(1)
+            # Main loop: sleeps until the next task is due, returns once stop is requested
+            if self.running:
+                self.scheduler.run()
                 
         except Exception as e:
             self.logger.error(f"Error in main loop: {e}")
@@ -71,22 +118,40 @@ class DeviceMonitorAgent:
     
     def stop(self):
         """Stop the monitoring agent"""
+        # stop() is reached from the finally blocks in start() and __main__
+        if self.stopped:
+            return
+        self.stopped = True
+        
         self.logger.info("Stopping Device Monitor Agent...")
         self.running = False
         
+        if hasattr(self, 'scheduler'):
+            self.scheduler.stop()
+            self.logger.info(f"Scheduler timing: {self.scheduler.stats()}")
+        
         if hasattr(self, 'power_monitor'):
             self.power_monitor.stop()
         if hasattr(self, 'system_monitor'):
             self.system_monitor.stop()
         if hasattr(self, 'screenshot_monitor'):
             self.screenshot_monitor.stop()
+        if hasattr(self, 'server_sync'):
+            self.server_sync.close()
+        
+        # Flush queued writes (including the SHUTDOWN event) before exit
+        if hasattr(self, 'db'):
+            self.db.close()
         
         self.logger.info("Agent stopped successfully")
     
     def _signal_handler(self, signum, frame):
         """Handle shutdown signals"""
         self.logger.info(f"Received signal {signum}, shutting down...")
-        self.stop()
+        # Only ask the scheduler to return; start() then stops everything once
+        # the task that was interrupted has finished
+        self.running = False
+        self.scheduler.stop()
 
 if __name__ == "__main__":
     agent = DeviceMonitorAgent()
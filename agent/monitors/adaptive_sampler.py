@@ -0,0 +1,144 @@
+"""
+Adaptive sampling policy for system statistics
+Metrics are probed cheaply at a base rate and recorded once per base interval
+(as the average of the probes in between). When a probe crosses a threshold
+or moves quickly, probing speeds up and every fast probe is recorded (as the
+peak since the last row), until enough calm probes in a row decay it back. A token bucket caps recorded rows
+per hour, so a machine that stays busy can't flood the database or the uploads.
+"""
+
+class AdaptiveSampler:
+    def __init__(self, base_interval=300, probe_interval=15, fast_interval=2,
+                 cpu_threshold=85.0, memory_threshold=90.0, change_threshold=25.0,
+                 calm_probes=10, max_rows_per_hour=240):
+        """
+        Initialize the sampler
+        :param base_interval: Seconds between recorded rows while calm
+        :param probe_interval: Seconds between probes while calm
+        :param fast_interval: Seconds between probes (each one recorded) while escalated
+        :param cpu_threshold: CPU percent that escalates
+        :param memory_threshold: Memory percent that escalates
+        :param change_threshold: Percentage points CPU or memory may move between probes before escalating
+        :param calm_probes: Calm probes in a row that decay back to the base rate
+        :param max_rows_per_hour: Recorded rows allowed in any hour; a quarter of them can be spent
+                                  in one burst, the rest refill evenly over the hour
+        """
+        self.base_interval = base_interval
+        self.probe_interval = probe_interval
+        self.fast_interval = fast_interval
+        self.cpu_threshold = cpu_threshold
+        self.memory_threshold = memory_threshold
+        self.change_threshold = change_threshold
+        self.calm_probes = calm_probes
+        self.max_rows_per_hour = max_rows_per_hour
+
+        self.escalated = False
+        self.calm_streak = 0
+        self.previous = None
+        self.window = []  # probes since the last recorded row
+        self.window_start = None
+        self.burst = max(1.0, max_rows_per_hour / 4)
+        self.refill_rate = (max_rows_per_hour - self.burst) / 3600  # tokens per second
+        self.tokens = self.burst
+        self.token_time = None
+
+        self.probes = 0
+        self.rows = 0
+        self.escalations = 0
+        self.rows_deferred = 0
+
+    def _is_hot(self, cpu, memory):
+        """Whether a probe is over a threshold or moved quickly since the last one"""
+        if cpu >= self.cpu_threshold or memory >= self.memory_threshold:
+            return True
+        if self.previous is None:
+            return False
+        return (abs(cpu - self.previous[0]) >= self.change_threshold or
+                abs(memory - self.previous[1]) >= self.change_threshold)
+
+    def _take_token(self, now):
+        """Spend one recorded row from the hourly budget, False when it's used up"""
+        if self.token_time is not None:
+            self.tokens = min(self.burst, self.tokens + (now - self.token_time) * self.refill_rate)
+        self.token_time = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+    def allow_row(self, now):
+        """
+        Spend one row of the hourly budget on a row recorded elsewhere (an aggregation summary)
+        :return: False when the budget is used up (counted as deferred)
+        """
+        if self._take_token(now):
+            self.rows += 1
+            return True
+        self.rows_deferred += 1
+        return False
+
+    def observe(self, now, cpu, memory, record=True):
+        """
+        Feed one probe
+        :param now: Monotonic time of the probe in seconds
+        :param cpu: CPU percent since the previous probe
+        :param memory: Memory percent
+        :param record: False when rows are recorded elsewhere (aggregation); only the probe rate is decided
+        :return: (row to record as {'cpu_percent', 'memory_percent', 'escalated'} or None,
+                  seconds until the next probe)
+        """
+        self.probes += 1
+        if record:
+            if self.window_start is None:
+                self.window_start = now
+            self.window.append((cpu, memory))
+
+        hot = self._is_hot(cpu, memory)
+        self.previous = (cpu, memory)
+
+        if hot:
+            self.calm_streak = 0
+            if not self.escalated:
+                self.escalated = True
+                self.escalations += 1
+        elif self.escalated:
+            self.calm_streak += 1
+            if self.calm_streak >= self.calm_probes:
+                self.escalated = False
+                self.calm_streak = 0
+
+        delay = self.fast_interval if self.escalated else self.probe_interval
+        if not record:
+            return None, delay
+
+        # The first probe is always recorded, so a fresh start shows up right away
+        due = self.escalated or hot or self.rows == 0 or now - self.window_start >= self.base_interval
+        row = None
+        if due:
+            if self._take_token(now):
+                if hot or self.escalated:
+                    # Fast rows keep the peak since the last row (a deferred row doesn't hide a spike)
+                    cpu = max(p[0] for p in self.window)
+                    memory = max(p[1] for p in self.window)
+                else:
+                    cpu = sum(p[0] for p in self.window) / len(self.window)
+                    memory = sum(p[1] for p in self.window) / len(self.window)
+                row = {'cpu_percent': round(cpu, 1), 'memory_percent': round(memory, 1), 'escalated': self.escalated}
+                self.rows += 1
+                self.window = []
+                self.window_start = now
+            else:
+                # Over budget: keep averaging, the next allowed row covers these probes
+                self.rows_deferred += 1
+
+        return row, delay
+
+    def stats(self):
+        """Probe and row counters"""
+        return {
+            'probes': self.probes,
+            'rows': self.rows,
+            'escalations': self.escalations,
+            'rows_deferred': self.rows_deferred,
+            'escalated': self.escalated
+        }
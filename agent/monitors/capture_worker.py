@@ -0,0 +1,302 @@
+"""
+Screen capture and JPEG encoding in a separate worker process
+The full-resolution frame only ever exists in the worker: the agent sends the
+reference thumbnail, and gets back the new thumbnail plus the encoded JPEG
+bytes (or just "unchanged"). The worker runs at a lower CPU priority with its
+address space capped, is restarted after a number of captures so its memory
+doesn't creep, and is killed if a capture hangs.
+"""
+
+import io
+import os
+import sys
+import time
+import threading
+import multiprocessing
+import psutil
+import pyscreenshot as ImageGrab
+from PIL import Image
+from agent.monitors.frame_diff import FrameComparator
+
+try:
+    import resource
+except ImportError:
+    resource = None  # Windows: no rlimits, the priority is still lowered
+
+# Downscale and quality presets; max_width None keeps the native resolution
+PROFILES = {
+    'full': {'max_width': None, 'quality': 60, 'optimize': True},
+    'balanced': {'max_width': 1920, 'quality': 60, 'optimize': True},
+    'low': {'max_width': 1280, 'quality': 45, 'optimize': False}
+}
+
+def resolve_profile(name, max_width=0, quality=0):
+    """
+    Look up a profile, with optional overrides (0 keeps the profile's value)
+    :raises ValueError: For an unknown profile name
+    """
+    if name not in PROFILES:
+        raise ValueError(f"Unknown screenshot profile: {name} (choose from {', '.join(PROFILES)})")
+    profile = dict(PROFILES[name])
+    if max_width:
+        profile['max_width'] = max_width
+    if quality:
+        profile['quality'] = quality
+    return profile
+
+def encode(image, profile):
+    """Convert, downscale to the profile's width and JPEG-encode a frame; returns (bytes, size)"""
+    image = image.convert('RGB')
+    max_width = profile['max_width']
+    if max_width and image.width > max_width:
+        height = round(image.height * max_width / image.width)
+        # reducing_gap=1 box-reduces by the whole factor first (4K -> 1080p is a cheap 2x reduce)
+        image = image.resize((max_width, height), Image.Resampling.BILINEAR, reducing_gap=1.0)
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=profile['quality'], optimize=profile['optimize'])
+    return buffer.getvalue(), image.size
+
+def peak_rss_kb():
+    """Peak resident memory of this process in KB"""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak // 1024 if sys.platform == 'darwin' else peak  # bytes on macOS
+    info = psutil.Process().memory_info()
+    return getattr(info, 'peak_wset', info.rss) // 1024
+
+def capture(reference, comparator_settings, force, profile, source=None):
+    """
+    Grab the screen, compare it with the reference thumbnail and encode it if it changed
+    Runs in the worker process, or in the agent when the worker is disabled
+    :param reference: FrameComparator.reference_bytes() of the last saved screenshot
+    :param comparator_settings: FrameComparator keyword arguments
+    :param force: Encode even if the frame looks unchanged
+    :param source: Callable returning a frame instead of grabbing the screen (benchmarks)
+    :return: Dict with 'unchanged', 'changed_fraction', 'reference' (the new reference thumbnail),
+             'jpeg' (None when unchanged), 'size', 'encoded_size', timings and 'peak_rss_kb'
+    """
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    image = source() if source else ImageGrab.grab()
+    grab_ms = (time.perf_counter() - started) * 1000
+
+    comparator = FrameComparator(**comparator_settings)
+    comparator.load_reference(reference)
+    diff_started = time.process_time()
+    unchanged, changed_fraction = comparator.compare(image)
+    diff_cpu_seconds = time.process_time() - diff_started
+
+    result = {
+        'unchanged': unchanged and not force,
+        'changed_fraction': changed_fraction,
+        'reference': comparator.reference_bytes(),
+        'jpeg': None,
+        'size': image.size,
+        'encoded_size': None,
+        'grab_ms': grab_ms,
+        'diff_cpu_seconds': diff_cpu_seconds,
+        'encode_cpu_seconds': 0.0
+    }
+    if not result['unchanged']:
+        encode_started = time.process_time()
+        result['jpeg'], result['encoded_size'] = encode(image, profile)
+        result['encode_cpu_seconds'] = time.process_time() - encode_started
+
+    del image
+    result['cpu_seconds'] = time.process_time() - cpu_started
+    result['total_ms'] = (time.perf_counter() - started) * 1000
+    result['peak_rss_kb'] = peak_rss_kb()
+    return result
+
+def limit_resources(nice, max_memory_mb):
+    """Lower this process's CPU priority and cap its address space (the cap is POSIX only)"""
+    if nice:
+        if hasattr(os, 'nice'):
+            os.nice(nice)
+        else:
+            psutil.Process().nice(psutil.BELOW_NORMAL_PRIORITY_CLASS)
+    if max_memory_mb and resource is not None:
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        limit = max_memory_mb * 1024 * 1024
+        if hard != resource.RLIM_INFINITY:
+            limit = min(limit, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+def _worker_main(connection, nice, max_memory_mb):
+    """Worker process loop: one capture request in, one result out, until the pipe closes"""
+    limit_resources(nice, max_memory_mb)
+    while True:
+        try:
+            request = connection.recv()
+        except EOFError:
+            return
+        if request is None:
+            return
+        try:
+            connection.send(('ok', capture(*request)))
+        except Exception as e:
+            # MemoryError from the address space cap lands here too
+            connection.send(('error', f"{type(e).__name__}: {e}"))
+
+class CaptureWorker:
+    def __init__(self, profile='balanced', max_width=0, quality=0, use_process=True, recycle=25,
+                 timeout=30, nice=10, max_memory_mb=1024, source=None):
+        """
+        Initialize the capture worker (the process starts with the first capture)
+        :param profile: Name of a PROFILES entry
+        :param max_width: Override the profile's downscale width (0 keeps it)
+        :param quality: Override the profile's JPEG quality (0 keeps it)
+        :param use_process: Capture in a worker process; False captures in this process
+        :param recycle: Captures before the worker process is replaced (0 = never)
+        :param timeout: Seconds a capture may take before the worker is killed
+        :param nice: Niceness added to the worker process (0 leaves its priority alone)
+        :param max_memory_mb: Address space cap for the worker process (0 = no cap)
+        :param source: Picklable callable returning a frame instead of grabbing the screen (benchmarks)
+        """
+        self.profile = resolve_profile(profile, max_width, quality)
+        self.profile_name = profile
+        self.use_process = use_process
+        self.recycle = recycle
+        self.timeout = timeout
+        self.nice = nice
+        self.max_memory_mb = max_memory_mb
+        self.source = source
+
+        self.process = None
+        self.connection = None
+        self.process_captures = 0
+        # Held for a whole capture, so close() from another thread can't pull the pipe out from under it
+        self.lock = threading.Lock()
+        self.closed = False
+
+        self.captures = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.starts = 0
+        self.max_worker_rss_kb = 0
+
+    def _start(self):
+        """Start a worker process; spawn, since the agent has threads running"""
+        context = multiprocessing.get_context('spawn')
+        self.connection, child_connection = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child_connection, self.nice, self.max_memory_mb),
+            name='ScreenshotCaptureWorker',
+            daemon=True
+        )
+        self.process.start()
+        child_connection.close()
+        self.process_captures = 0
+        self.starts += 1
+
+    def _stop_process(self, kill=False):
+        """Ask the worker to exit (or kill it) and wait for it"""
+        if self.process is None:
+            return
+        try:
+            if kill:
+                self.process.kill()
+            else:
+                self.connection.send(None)
+            self.process.join(timeout=5)
+            if self.process.is_alive():
+                self.process.kill()
+                self.process.join()
+        except (OSError, ValueError):
+            pass  # the pipe or process is already gone
+        self.connection.close()
+        self.process = None
+        self.connection = None
+
+    def capture(self, comparator, force=False):
+        """
+        Capture and encode a screenshot, comparing against (and updating) the comparator's reference
+        :return: The capture() result dict
+        :raises TimeoutError: When the worker hangs (it is killed and replaced next time)
+        :raises RuntimeError: When the capture failed or the worker died
+        """
+        request = (
+            comparator.reference_bytes(),
+            {
+                'size': comparator.size,
+                'pixel_threshold': comparator.pixel_threshold,
+                'change_threshold': comparator.change_threshold
+            },
+            force,
+            self.profile,
+            self.source
+        )
+
+        if self.use_process:
+            with self.lock:
+                if self.closed:
+                    raise RuntimeError("Screenshot capture worker is closed")
+                result = self._capture_in_worker(request)
+        else:
+            result = capture(*request)
+
+        comparator.load_reference(result['reference'])
+        self.captures += 1
+        self.max_worker_rss_kb = max(self.max_worker_rss_kb, result['peak_rss_kb'])
+        return result
+
+    def _capture_in_worker(self, request):
+        """Send one request to the worker process and wait for its result"""
+        if self.process is not None and (not self.process.is_alive() or
+                                         (self.recycle and self.process_captures >= self.recycle)):
+            self._stop_process()
+        if self.process is None:
+            self._start()
+
+        self.process_captures += 1
+        try:
+            self.connection.send(request)
+            finished = self.connection.poll(self.timeout)
+            if finished:
+                status, result = self.connection.recv()
+        except (EOFError, OSError) as e:
+            # Crashed, e.g. killed by the OS; the next capture starts a fresh worker
+            self.failures += 1
+            self._stop_process(kill=True)
+            raise RuntimeError(f"Screenshot capture worker died: {e}")
+
+        if not finished:
+            self.timeouts += 1
+            self._stop_process(kill=True)
+            raise TimeoutError(f"Screenshot capture took longer than {self.timeout}s, worker killed")
+
+        if status != 'ok':
+            self.failures += 1
+            raise RuntimeError(f"Screenshot capture failed in worker: {result}")
+        return result
+
+    def stats(self):
+        """Capture counters and the worker's peak memory"""
+        return {
+            'profile': self.profile_name,
+            'in_process': not self.use_process,
+            'captures': self.captures,
+            'failures': self.failures,
+            'timeouts': self.timeouts,
+            'worker_starts': self.starts,
+            'max_worker_rss_kb': self.max_worker_rss_kb
+        }
+
+    def close(self, wait=5.0):
+        """
+        Stop the worker process
+        :param wait: Seconds to let a capture in flight on another thread finish; after that
+                     the process is killed and that capture fails and cleans up on its own
+        """
+        self.closed = True
+        if self.lock.acquire(timeout=wait):
+            try:
+                self._stop_process()
+            finally:
+                self.lock.release()
+            return
+
+        process = self.process
+        if process is not None:
+            process.kill()
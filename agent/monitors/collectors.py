@@ -0,0 +1,253 @@
+"""
+Pluggable metric collectors for detailed system statistics
+Each collector returns (metric, label, value) samples, e.g. ('cpu.core', '3', 41.0)
+or ('fs.percent', '/home', 72.5). CollectorSet times every collector and backs
+off any that goes over its per-sample budget, so an expensive collector (many
+processes or mounts) runs less often instead of slowing every sample.
+"""
+
+import time
+import logging
+import psutil
+
+class Collector:
+    """Base class: subclasses set `name` and `budget_ms` and implement collect()"""
+
+    name = None
+    budget_ms = 5.0
+
+    def collect(self):
+        """Return a list of (metric, label, value) samples"""
+        raise NotImplementedError
+
+class RateCollector(Collector):
+    """Collector reporting per-second rates of monotonically increasing counters"""
+
+    def __init__(self):
+        self.previous = None
+
+    def counters(self):
+        """Current counter values as {metric: value}"""
+        raise NotImplementedError
+
+    def collect(self):
+        now = time.monotonic()
+        current = self.counters()
+        previous, self.previous = self.previous, (now, current)
+        if previous is None or now <= previous[0]:
+            return []
+
+        elapsed = now - previous[0]
+        # A counter that went backwards was reset (e.g. device re-attached), skip it
+        return [
+            (metric, '', (value - previous[1][metric]) / elapsed)
+            for metric, value in current.items()
+            if metric in previous[1] and value >= previous[1][metric]
+        ]
+
+class CpuCoresCollector(Collector):
+    """CPU percent per core since the previous sample"""
+
+    name = 'cpu_cores'
+
+    def __init__(self):
+        # Sets the starting point, like SystemMonitor does for the overall percent
+        psutil.cpu_percent(interval=None, percpu=True)
+
+    def collect(self):
+        return [('cpu.core', str(i), value) for i, value in enumerate(psutil.cpu_percent(interval=None, percpu=True))]
+
+class LoadAverageCollector(Collector):
+    """1, 5 and 15 minute load averages"""
+
+    name = 'load'
+
+    def collect(self):
+        return [('load', label, value) for label, value in zip(('1m', '5m', '15m'), psutil.getloadavg())]
+
+class SwapCollector(Collector):
+    """Swap use"""
+
+    name = 'swap'
+
+    def collect(self):
+        swap = psutil.swap_memory()
+        return [('swap.percent', '', swap.percent), ('swap.used', '', swap.used)]
+
+class FilesystemsCollector(Collector):
+    """Percent used of every mounted filesystem"""
+
+    name = 'filesystems'
+    budget_ms = 20.0
+
+    def __init__(self, refresh_every=20):
+        """
+        :param refresh_every: Samples between re-reading the mount table
+        """
+        self.refresh_every = refresh_every
+        self.runs = 0
+        self.mountpoints = []
+
+    def collect(self):
+        if self.runs % self.refresh_every == 0:
+            self.mountpoints = [partition.mountpoint for partition in psutil.disk_partitions(all=False)]
+        self.runs += 1
+
+        samples = []
+        for mountpoint in self.mountpoints:
+            try:
+                samples.append(('fs.percent', mountpoint, psutil.disk_usage(mountpoint).percent))
+            except OSError:
+                # Unmounted since the last refresh, or not readable (e.g. empty card reader)
+                continue
+        return samples
+
+class DiskIOCollector(RateCollector):
+    """Disk read/write bytes and operations per second, all disks together"""
+
+    name = 'disk_io'
+
+    def counters(self):
+        io = psutil.disk_io_counters()
+        if io is None:
+            return {}
+        return {
+            'disk.read_bps': io.read_bytes,
+            'disk.write_bps': io.write_bytes,
+            'disk.read_iops': io.read_count,
+            'disk.write_iops': io.write_count
+        }
+
+class NetworkCollector(RateCollector):
+    """Network bytes sent/received per second, all interfaces together"""
+
+    name = 'network'
+
+    def counters(self):
+        io = psutil.net_io_counters()
+        if io is None:
+            return {}
+        return {
+            'net.rx_bps': io.bytes_recv,
+            'net.tx_bps': io.bytes_sent,
+            'net.rx_errors': io.errin,
+            'net.tx_errors': io.errout
+        }
+
+class TopProcessesCollector(Collector):
+    """Top processes by CPU percent and by resident memory"""
+
+    name = 'processes'
+    budget_ms = 50.0
+    ATTRS = ['name', 'cpu_percent', 'memory_info']
+
+    def __init__(self, top_n=5):
+        """
+        :param top_n: Processes reported per ranking
+        """
+        self.top_n = top_n
+
+    def collect(self):
+        # process_iter keeps Process objects between calls, so cpu_percent is
+        # measured since the previous sample (the first sample reads 0.0)
+        processes = []
+        for process in psutil.process_iter(self.ATTRS):
+            info = process.info
+            if info['memory_info'] is None:
+                continue  # access denied
+            label = f"{info['name'] or '?'}:{process.pid}"[:128]
+            processes.append((label, info['cpu_percent'] or 0.0, info['memory_info'].rss))
+
+        by_cpu = sorted(processes, key=lambda p: p[1], reverse=True)[:self.top_n]
+        by_rss = sorted(processes, key=lambda p: p[2], reverse=True)[:self.top_n]
+        return [('proc.cpu', label, cpu) for label, cpu, _ in by_cpu] + \
+               [('proc.rss', label, rss) for label, _, rss in by_rss]
+
+# Collector name -> class, for the METRIC_COLLECTORS setting
+COLLECTORS = {
+    cls.name: cls for cls in (
+        CpuCoresCollector, LoadAverageCollector, SwapCollector, FilesystemsCollector,
+        DiskIOCollector, NetworkCollector, TopProcessesCollector
+    )
+}
+
+class CollectorSet:
+    def __init__(self, collectors, max_backoff=16):
+        """
+        Initialize the collector set
+        :param collectors: Collector instances to run on each sample
+        :param max_backoff: Most samples an over-budget collector is spread across
+        """
+        self.collectors = collectors
+        self.max_backoff = max_backoff
+        self.logger = logging.getLogger(__name__)
+        self.state = {
+            collector.name: {
+                'every': 1, 'due_in': 0, 'runs': 0, 'skipped': 0, 'errors': 0,
+                'last_ms': 0.0, 'avg_ms': 0.0, 'max_ms': 0.0
+            }
+            for collector in collectors
+        }
+
+    @classmethod
+    def from_names(cls, names, top_processes=5):
+        """
+        Build a set from collector names
+        :raises ValueError: For an unknown name
+        """
+        collectors = []
+        for name in names:
+            if name not in COLLECTORS:
+                raise ValueError(f"Unknown metric collector: {name} (choose from {', '.join(COLLECTORS)})")
+            collector_class = COLLECTORS[name]
+            if collector_class is TopProcessesCollector:
+                collectors.append(collector_class(top_n=top_processes))
+            else:
+                collectors.append(collector_class())
+        return cls(collectors)
+
+    def run(self):
+        """Run every collector that is due, returns all their samples"""
+        samples = []
+        for collector in self.collectors:
+            state = self.state[collector.name]
+            if state['due_in'] > 0:
+                state['due_in'] -= 1
+                state['skipped'] += 1
+                continue
+
+            started = time.perf_counter()
+            try:
+                samples.extend(collector.collect())
+            except Exception as e:
+                state['errors'] += 1
+                self.logger.warning(f"Metric collector {collector.name} failed: {e}")
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+            self._account(collector, state, elapsed_ms)
+        return samples
+
+    def _account(self, collector, state, elapsed_ms):
+        """Track a run's cost and adjust how often the collector runs"""
+        state['runs'] += 1
+        state['last_ms'] = elapsed_ms
+        state['max_ms'] = max(state['max_ms'], elapsed_ms)
+        state['avg_ms'] = elapsed_ms if state['runs'] == 1 else 0.8 * state['avg_ms'] + 0.2 * elapsed_ms
+
+        if state['avg_ms'] > collector.budget_ms and state['every'] < self.max_backoff:
+            state['every'] *= 2
+            self.logger.info(
+                f"Metric collector {collector.name} costs {state['avg_ms']:.1f} ms "
+                f"(budget {collector.budget_ms:.0f} ms), now runs every {state['every']} samples"
+            )
+        elif state['avg_ms'] < collector.budget_ms / 2 and state['every'] > 1:
+            state['every'] //= 2
+        state['due_in'] = state['every'] - 1
+
+    def stats(self):
+        """Per-collector cost and run counters"""
+        return {
+            name: dict(state, avg_ms=round(state['avg_ms'], 3), last_ms=round(state['last_ms'], 3),
+                       max_ms=round(state['max_ms'], 3))
+            for name, state in self.state.items()
+        }
@@ -0,0 +1,66 @@
+"""
+Cheap change detection between consecutive screen captures
+Each frame is reduced to a small grayscale thumbnail. A frame counts as
+unchanged when only a small share of thumbnail cells moved by more than a
+noise threshold, so a ticking clock or a blinking cursor is not a new screen.
+"""
+
+from PIL import Image, ImageChops
+
+class FrameComparator:
+    def __init__(self, size=(64, 36), pixel_threshold=12, change_threshold=0.01):
+        """
+        Initialize the comparator
+        :param size: Thumbnail size frames are compared at
+        :param pixel_threshold: Gray level difference (0-255) a cell must exceed to count as changed
+        :param change_threshold: Share of changed cells (0-1) above which a frame is new
+        """
+        self.size = size
+        self.pixel_threshold = pixel_threshold
+        self.change_threshold = change_threshold
+        self.previous = None
+
+    def fingerprint(self, image):
+        """
+        Grayscale thumbnail of a frame
+        Averaging every pixel of a full screen costs about as much as encoding it,
+        so a 4x4 grid of sampled pixels is averaged per thumbnail cell instead
+        """
+        width, height = self.size
+        sampled = image.resize((width * 4, height * 4), Image.Resampling.NEAREST)
+        return sampled.convert('L').resize(self.size, Image.Resampling.BOX)
+
+    def changed_fraction(self, first, second):
+        """Share of thumbnail cells that differ by more than the pixel threshold"""
+        histogram = ImageChops.difference(first, second).histogram()
+        changed = sum(histogram[self.pixel_threshold + 1:])
+        return changed / (self.size[0] * self.size[1])
+
+    def compare(self, image):
+        """
+        Compare a frame with the last changed frame
+        The reference only moves on a change, so a slow drift still adds up to one
+        :return: (unchanged, changed fraction); the first frame is always changed
+        """
+        current = self.fingerprint(image)
+        if self.previous is None:
+            self.previous = current
+            return False, 1.0
+
+        fraction = self.changed_fraction(self.previous, current)
+        unchanged = fraction <= self.change_threshold
+        if not unchanged:
+            self.previous = current
+        return unchanged, fraction
+
+    def reset(self):
+        """Forget the previous frame, so the next one is treated as new"""
+        self.previous = None
+
+    def reference_bytes(self):
+        """The reference thumbnail as raw bytes (None before the first frame), for another process"""
+        return self.previous.tobytes() if self.previous is not None else None
+
+    def load_reference(self, data):
+        """Set the reference thumbnail from reference_bytes() output"""
+        self.previous = Image.frombytes('L', self.size, data) if data is not None else None
@@ -5,7 +5,6 @@ Tracks device power events: startup, shutdown, sleep, wake, battery
 
 import psutil
 import platform
-import threading
 import time
 from datetime import datetime
 
@@ -14,13 +13,16 @@ class PowerMonitor:
         self.db = database
         self.logger = logger
         self.running = False
-        self.monitor_thread = None
+        self.scheduler = None
+        self.task = None
+        self.check_interval = 60  # Check every minute
+        self.last_check = None
         self.boot_time = None
         self.last_battery_status = None
         self.has_battery = self._check_battery()
         
-    def start(self):
-        """Start power monitoring"""
+    def start(self, scheduler):
+        """Start power monitoring on the shared scheduler"""
         self.running = True
         self.boot_time = datetime.fromtimestamp(psutil.boot_time())
         
@@ -28,9 +30,9 @@ class PowerMonitor:
         self.db.log_power_event('STARTUP', f'System booted at {self.boot_time}')
         self.logger.info(f"Power monitor started. Boot time: {self.boot_time}")
         
-        # Start monitoring thread
-        self.monitor_thread = threading.Thread(target=self._monitor_loop, daemon=True)
-        self.monitor_thread.start()
+        self.scheduler = scheduler
+        self.last_check = datetime.now()
+        self.task = scheduler.every(self.check_interval, self._check, name='power', first_delay=0)
     
     def _check_battery(self):
         """Check if device has a battery"""
@@ -88,34 +90,24 @@ class PowerMonitor:
         except Exception as e:
             self.logger.error(f"Error monitoring battery: {e}")
     
-    def _monitor_loop(self):
-        """Main monitoring loop"""
-        last_check = datetime.now()
-        check_interval = 60  # Check every minute
+    def _check(self):
+        """Check for a wake from sleep and for battery changes"""
+        current_time = datetime.now()
         
-        while self.running:
-            try:
-                current_time = datetime.now()
-                
-                # Check for system wake from sleep
-                # If there's a large gap between checks, system was likely asleep
-                time_diff = (current_time - last_check).total_seconds()
-                if time_diff > (check_interval + 60):  # More than expected interval + 1 min buffer
-                    sleep_duration = time_diff - check_interval
-                    self.logger.info(f"⏰ System wake detected. Was offline for {sleep_duration:.0f} seconds")
-                    self.db.log_power_event('WAKE', f'System was offline for {sleep_duration:.0f} seconds')
-                    self.db.log_power_event('SLEEP', f'Duration: {sleep_duration:.0f} seconds', )
-                
-                # Monitor battery
-                if self.has_battery:
-                    self._monitor_battery()
-                
-                last_check = current_time
-                time.sleep(check_interval)
-                
-            except Exception as e:
-                self.logger.error(f"Error in power monitoring loop: {e}")
-                time.sleep(60)
+        # Check for system wake from sleep
+        # If there's a large gap between checks (wall clock), system was likely asleep
+        time_diff = (current_time - self.last_check).total_seconds()
+        if time_diff > (self.check_interval + 60):  # More than expected interval + 1 min buffer
+            sleep_duration = time_diff - self.check_interval
+            self.logger.info(f"⏰ System wake detected. Was offline for {sleep_duration:.0f} seconds")
+            self.db.log_power_event('WAKE', f'System was offline for {sleep_duration:.0f} seconds')
+            self.db.log_power_event('SLEEP', f'Duration: {sleep_duration:.0f} seconds', )
+        
+        # Monitor battery
+        if self.has_battery:
+            self._monitor_battery()
+        
+        self.last_check = current_time
     
     def get_uptime(self):
         """Get system uptime in seconds"""
@@ -124,11 +116,10 @@ class PowerMonitor:
     def stop(self):
         """Stop power monitoring"""
         self.running = False
+        if self.task:
+            self.scheduler.cancel(self.task)
         
         # Log shutdown event
         uptime = self.get_uptime()
         self.db.log_power_event('SHUTDOWN', f'System uptime: {uptime:.0f} seconds')
-        self.logger.info("Power monitor stopped")
-        
-        if self.monitor_thread:
-            self.monitor_thread.join(timeout=2)
\ No newline at end of file
+        self.logger.info("Power monitor stopped")
\ No newline at end of file
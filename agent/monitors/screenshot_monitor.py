@@ -1,97 +1,151 @@
 """
 Screenshot monitoring module
 Captures screenshots periodically and manages storage
+A capture that looks the same as the last saved one is not encoded, stored or
+uploaded; the saved screenshot only gets a "no change" marker. Grabbing and
+encoding happen in a CaptureWorker process, so full-size frames never enter
+the agent process
 """
 
-import pyscreenshot as ImageGrab
-from PIL import Image
-import io
-import time
-import threading
 import logging
-import random
 from datetime import datetime
 from pathlib import Path
+from agent.monitors.frame_diff import FrameComparator
+from agent.monitors.capture_worker import CaptureWorker
 
 class ScreenshotMonitor:
-    def __init__(self, database, logger, interval=300, max_screenshots=3):
+    def __init__(self, database, logger, interval=300, max_screenshots=3, change_threshold=0.01, max_unchanged=12,
+                 capture_worker=None):
         """
         Initialize screenshot monitor
         :param database: Local database instance
         :param logger: Logger instance
         :param interval: Base screenshot interval in seconds (not used with random mode)
         :param max_screenshots: Maximum number of screenshots to keep (default: 3)
+        :param change_threshold: Share of the screen (0-1) that must change for a new screenshot
+        :param max_unchanged: Skipped captures in a row before one is saved anyway (0 = never)
+        :param capture_worker: CaptureWorker that grabs and encodes (default: a worker process, balanced profile)
         """
         self.db = database
         self.logger = logger
         self.interval = interval
         self.max_screenshots = max_screenshots
         self.running = False
-        self.monitor_thread = None
+        self.scheduler = None
+        self.task = None
         self.screenshot_dir = Path(__file__).parent.parent / "screenshots"
         self.screenshot_dir.mkdir(exist_ok=True)
         # Random interval range: 3 to 5 minutes
         self.min_interval = 180  # 3 minutes
         self.max_interval = 300  # 5 minutes
         
-    def start(self):
-        """Start screenshot monitoring"""
+        # Change detection against the last saved screenshot
+        self.comparator = FrameComparator(change_threshold=change_threshold)
+        self.capture_worker = capture_worker or CaptureWorker()
+        self.max_unchanged = max_unchanged
+        self.unchanged_streak = 0
+        self.last_screenshot_id = None
+        
+        # Counters for the savings report
+        self.captures_saved = 0
+        self.captures_skipped = 0
+        self.encode_cpu_seconds = 0.0  # spent encoding saved captures
+        self.diff_cpu_seconds = 0.0  # spent comparing all captures
+        self.bytes_written = 0  # JPEG bytes of saved captures
+        
+    def start(self, scheduler):
+        """Start screenshot monitoring on the shared scheduler"""
         self.running = True
         self.logger.info(f"[SCREENSHOT] Monitor started. Random interval: 3-5 minutes, Max: {self.max_screenshots}")
         
-        # Take initial screenshot
-        self._capture_screenshot()
-        
-        # Start monitoring thread
-        self.monitor_thread = threading.Thread(target=self._monitor_loop, daemon=True)
-        self.monitor_thread.start()
-    
-    def _monitor_loop(self):
-        """Main monitoring loop"""
-        while self.running:
-            try:
-                # Generate random interval between 3 and 5 minutes
-                next_interval = random.randint(self.min_interval, self.max_interval)
-                minutes = next_interval / 60
-                self.logger.info(f"[SCREENSHOT] Next capture in {minutes:.1f} minutes")
-                
-                time.sleep(next_interval)
-                
-                if self.running:
-                    self._capture_screenshot()
-            except Exception as e:
-                self.logger.error(f"Error in screenshot monitoring loop: {e}")
-                time.sleep(60)
+        # Initial screenshot right away, then every 3 to 5 minutes; capture and encode
+        # run on the scheduler's worker thread so they don't delay the quick probes
+        self.scheduler = scheduler
+        self.task = scheduler.every(
+            (self.min_interval + self.max_interval) / 2,
+            self._capture_screenshot,
+            name='screenshot',
+            jitter=(self.max_interval - self.min_interval) / 2,
+            first_delay=0,
+            threaded=True
+        )
     
     def _capture_screenshot(self):
-        """Capture a screenshot and save it"""
+        """Capture a screenshot and save it, unless the screen hasn't changed"""
         try:
-            # Capture screenshot
-            screenshot = ImageGrab.grab()
+            # The worker grabs the screen, compares a small thumbnail with the last saved
+            # screenshot and only encodes the frame if it changed (or a save is forced)
+            forced = bool(self.max_unchanged and self.unchanged_streak >= self.max_unchanged)
+            result = self.capture_worker.capture(self.comparator, force=forced or self.last_screenshot_id is None)
+            self.diff_cpu_seconds += result['diff_cpu_seconds']
+            changed_fraction = result['changed_fraction']
+            
+            if result['unchanged']:
+                self._skip_unchanged(changed_fraction)
+                return
             
             # Generate filename with timestamp
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"screenshot_{timestamp}.jpg"
             filepath = self.screenshot_dir / filename
             
-            # Compress and save (quality=60 for good balance)
-            screenshot = screenshot.convert('RGB')  # Convert to RGB
-            screenshot.save(filepath, 'JPEG', quality=60, optimize=True)
+            # Save the JPEG the worker encoded
+            filepath.write_bytes(result['jpeg'])
+            self.encode_cpu_seconds += result['encode_cpu_seconds']
             
             # Get file size
-            file_size = filepath.stat().st_size / 1024  # KB
+            file_bytes = len(result['jpeg'])
+            file_size = file_bytes / 1024  # KB
+            self.captures_saved += 1
+            self.bytes_written += file_bytes
+            self.unchanged_streak = 0
             
-            self.logger.info(f"[SCREENSHOT] Captured: {filename} ({file_size:.1f} KB)")
+            width, height = result['encoded_size']
+            self.logger.info(
+                f"[SCREENSHOT] Captured: {filename} ({file_size:.1f} KB, {width}x{height}, "
+                f"{changed_fraction:.1%} changed, {result['total_ms']:.0f} ms)"
+            )
             
             # Store in database
-            self.db.log_screenshot(filename, str(filepath), file_size)
+            self.last_screenshot_id = self.db.log_screenshot(filename, str(filepath), file_size)
             
             # Clean up old screenshots
             self._cleanup_old_screenshots()
             
         except Exception as e:
+            # Next capture is compared against nothing and saved
+            self.comparator.reset()
             self.logger.error(f"Error capturing screenshot: {e}")
     
+    def _skip_unchanged(self, changed_fraction):
+        """Record a "no change" marker instead of a new screenshot"""
+        self.captures_skipped += 1
+        self.unchanged_streak += 1
+        self.db.mark_screenshot_unchanged(self.last_screenshot_id)
+        
+        savings = self.get_savings()
+        self.logger.info(
+            f"[SCREENSHOT] Unchanged ({changed_fraction:.1%} changed), skipped encode and upload. "
+            f"Saved so far: {savings['skipped']} captures, ~{savings['bytes_saved'] / 1024:.0f} KB, "
+            f"~{savings['cpu_seconds_saved']:.2f}s CPU"
+        )
+    
+    def get_savings(self):
+        """
+        Estimate the CPU and upload bytes saved by skipping unchanged captures
+        Each skipped capture is counted at the average cost of a saved one, minus
+        the time spent comparing thumbnails
+        """
+        average_encode = self.encode_cpu_seconds / self.captures_saved if self.captures_saved else 0.0
+        average_bytes = self.bytes_written / self.captures_saved if self.captures_saved else 0
+        return {
+            'captured': self.captures_saved,
+            'skipped': self.captures_skipped,
+            'bytes_saved': int(average_bytes * self.captures_skipped),
+            'cpu_seconds_saved': max(0.0, average_encode * self.captures_skipped - self.diff_cpu_seconds),
+            'diff_cpu_seconds': self.diff_cpu_seconds
+        }
+    
     def _cleanup_old_screenshots(self):
         """Keep only the latest N screenshots, delete older ones"""
         try:
@@ -130,7 +184,12 @@ class ScreenshotMonitor:
     def stop(self):
         """Stop screenshot monitoring"""
         self.running = False
-        self.logger.info("[SCREENSHOT] Monitor stopped")
-        
-        if self.monitor_thread:
-            self.monitor_thread.join(timeout=2)
+        if self.task:
+            self.scheduler.cancel(self.task)
+        self.capture_worker.close()
+        savings = self.get_savings()
+        self.logger.info(
+            f"[SCREENSHOT] Monitor stopped. Captured {savings['captured']}, skipped {savings['skipped']} unchanged "
+            f"(~{savings['bytes_saved'] / 1024:.0f} KB upload, ~{savings['cpu_seconds_saved']:.2f}s CPU saved). "
+            f"Capture worker: {self.capture_worker.stats()}"
+        )
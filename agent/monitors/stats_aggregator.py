@@ -0,0 +1,105 @@
+"""
+On-agent pre-aggregation of system statistics
+Raw CPU/memory probes are folded into one summary per window (average,
+min, max and p95 of each, plus the probe count and seconds covered), so the
+agent can probe every few seconds while storing and uploading one row per window.
+Each probe measures the time since the one before it, and probes come faster
+during spikes, so averages and percentiles weight probes by those seconds.
+"""
+
+def percentile(values, fraction, weights=None):
+    """
+    Nearest-rank percentile of a non-empty list
+    :param weights: Optional weight per value (positive total); the result is the smallest
+                    value covering the fraction of the total weight
+    """
+    if weights is None:
+        weights = [1] * len(values)
+    threshold = fraction * sum(weights)
+    covered = 0
+    for value, weight in sorted(zip(values, weights)):
+        covered += weight
+        if covered >= threshold:
+            return value
+    return max(values)
+
+class StatsAggregator:
+    def __init__(self, window=300):
+        """
+        Initialize the aggregator
+        :param window: Seconds of probes folded into each summary
+        """
+        self.window = window
+        self.cpu = []
+        self.memory = []
+        # Seconds each probe measures (since the probe before it)
+        self.elapsed = []
+        self.window_start = None
+        self.last_probe = None
+
+        self.samples = 0
+        self.summaries = 0
+
+    def due(self, now):
+        """Whether the current window has run its length"""
+        return self.window_start is not None and now - self.window_start >= self.window
+
+    def add(self, now, cpu, memory, close=True):
+        """
+        Fold in one probe
+        The probe belongs to the window it measured, so one that reaches the
+        window's end is part of the summary it closes
+        :param now: Monotonic time of the probe in seconds
+        :param close: Close the window if it's due; False keeps extending it (e.g. over a row budget)
+        :return: Summary of the window this probe closed (see summarize), or None
+        """
+        # The first probe ever has no previous one to measure from
+        elapsed = now - self.last_probe if self.last_probe is not None else 0.0
+        self.last_probe = now
+        if self.window_start is None:
+            # A window starts where its first probe's measurement began
+            self.window_start = now - elapsed
+        self.cpu.append(cpu)
+        self.memory.append(memory)
+        self.elapsed.append(elapsed)
+        self.samples += 1
+
+        if close and self.due(now):
+            return self.summarize()
+        return None
+
+    def summarize(self):
+        """
+        Close the current window
+        :return: {'cpu_percent', 'cpu_min', 'cpu_max', 'cpu_p95', the same for memory, 'sample_count',
+                 'covered_seconds'}, or None if no probes came in
+        """
+        if not self.cpu:
+            return None
+
+        covered = sum(self.elapsed)
+        # Only a window holding nothing but the first probe ever covers no time; weigh probes equally then
+        weights = self.elapsed if covered > 0 else [1.0] * len(self.cpu)
+        total = sum(weights)
+
+        summary = {'sample_count': len(self.cpu), 'covered_seconds': round(covered, 3)}
+        for prefix, values in (('cpu', self.cpu), ('memory', self.memory)):
+            summary[f'{prefix}_percent'] = round(sum(v * w for v, w in zip(values, weights)) / total, 1)
+            summary[f'{prefix}_min'] = round(min(values), 1)
+            summary[f'{prefix}_max'] = round(max(values), 1)
+            summary[f'{prefix}_p95'] = round(percentile(values, 0.95, weights), 1)
+
+        self.cpu = []
+        self.memory = []
+        self.elapsed = []
+        self.window_start = None
+        self.summaries += 1
+        return summary
+
+    def stats(self):
+        """Probe and summary counters"""
+        return {
+            'samples': self.samples,
+            'summaries': self.summaries,
+            'pending': len(self.cpu)
+        }
@@ -1,58 +1,111 @@
 """
 System statistics monitoring module
 Tracks CPU, memory, disk usage and other system metrics
+CPU and memory are probed without blocking and recorded adaptively (see
+AdaptiveSampler): sparse while calm, every few seconds around a spike.
+With an aggregation window every probe goes to StatsAggregator instead and
+only one min/avg/max/p95 summary per window is stored and synced; the sampler
+then only sets the probe rate, and its row budget applies to the summaries
 """
 
 import psutil
-import threading
 import time
 from datetime import datetime
+from agent.monitors.adaptive_sampler import AdaptiveSampler
+from agent.monitors.stats_aggregator import StatsAggregator
 
 class SystemMonitor:
-    def __init__(self, database, logger, interval=300):
+    def __init__(self, database, logger, interval=300, probe_interval=15, fast_interval=2,
+                 cpu_threshold=85.0, memory_threshold=90.0, change_threshold=25.0, max_rows_per_hour=240,
+                 collectors=None, aggregation_window=0, keep_raw_seconds=0):
         """
         Initialize system monitor
-        :param interval: Monitoring interval in seconds (default: 5 minutes)
+        :param interval: Seconds between recorded stats while the system is calm (default: 5 minutes)
+        :param probe_interval: Seconds between cheap CPU/memory probes while calm
+        :param fast_interval: Seconds between probes, each one recorded, after a spike
+        :param cpu_threshold: CPU percent that switches to fast sampling
+        :param memory_threshold: Memory percent that switches to fast sampling
+        :param change_threshold: Percentage point jump between probes that switches to fast sampling
+        :param max_rows_per_hour: Cap on recorded stats per hour
+        :param collectors: Optional CollectorSet run with every recorded row for detailed metrics
+        :param aggregation_window: Seconds of probes summarized into each recorded row (0 records rows as sampled)
+        :param keep_raw_seconds: Keep every probe in the local raw_system_samples table this long (0 keeps none)
         """
         self.db = database
         self.logger = logger
         self.interval = interval
+        self.sampler = AdaptiveSampler(
+            base_interval=interval,
+            probe_interval=probe_interval,
+            fast_interval=fast_interval,
+            cpu_threshold=cpu_threshold,
+            memory_threshold=memory_threshold,
+            change_threshold=change_threshold,
+            max_rows_per_hour=max_rows_per_hour
+        )
+        self.collectors = collectors
+        self.aggregator = StatsAggregator(aggregation_window) if aggregation_window > 0 else None
+        self.keep_raw_seconds = keep_raw_seconds
         self.running = False
-        self.monitor_thread = None
+        self.scheduler = None
+        self.task = None
     
-    def start(self):
-        """Start system monitoring"""
+    def start(self, scheduler):
+        """Start system monitoring on the shared scheduler"""
         self.running = True
-        self.logger.info(f"System monitor started. Interval: {self.interval}s")
+        self.logger.info(
+            f"System monitor started. Interval: {self.interval}s, "
+            f"probing every {self.sampler.probe_interval}s ({self.sampler.fast_interval}s after a spike)"
+            + (f", one summary per {self.aggregator.window}s" if self.aggregator else "")
+        )
         
-        # Log initial stats
-        self._collect_stats()
+        # CPU percent is measured between calls; this call only sets the starting point
+        psutil.cpu_percent(interval=None)
         
-        # Start monitoring thread
-        self.monitor_thread = threading.Thread(target=self._monitor_loop, daemon=True)
-        self.monitor_thread.start()
+        # First probe (always recorded) right after start; each probe returns the next delay
+        self.scheduler = scheduler
+        self.task = scheduler.every(self.sampler.probe_interval, self._probe, name='system', first_delay=1)
     
-    def _monitor_loop(self):
-        """Main monitoring loop"""
-        while self.running:
-            try:
-                time.sleep(self.interval)
-                if self.running:
-                    self._collect_stats()
-            except Exception as e:
-                self.logger.error(f"Error in system monitoring loop: {e}")
-                time.sleep(60)
+    def _probe(self):
+        """Probe CPU and memory without blocking, record a row if the sampler asks; returns the next delay"""
+        # CPU usage since the previous probe
+        cpu_percent = psutil.cpu_percent(interval=None)
+        memory_percent = psutil.virtual_memory().percent
+        
+        now = time.monotonic()
+        was_escalated = self.sampler.escalated
+        row, delay = self.sampler.observe(now, cpu_percent, memory_percent, record=self.aggregator is None)
+        if self.sampler.escalated != was_escalated:
+            if self.sampler.escalated:
+                self.logger.info(
+                    f"System spike (CPU: {cpu_percent}%, Memory: {memory_percent}%), sampling every {delay}s"
+                )
+            else:
+                self.logger.info(f"System calm again, back to sampling every {self.interval}s")
+        
+        if self.keep_raw_seconds > 0:
+            self.db.log_raw_sample(cpu_percent, memory_percent)
+        
+        if self.aggregator:
+            # Rows come from the window summaries; over the row budget a window runs on until a row is allowed
+            # This probe measured the window it ends, so it's added before the window closes
+            self.aggregator.add(now, cpu_percent, memory_percent, close=False)
+            if self.aggregator.due(now) and self.sampler.allow_row(now):
+                self._record_summary(self.aggregator.summarize())
+        elif row:
+            self._collect_stats(row['cpu_percent'], row['memory_percent'])
+        return delay
+    
+    def _record_summary(self, summary):
+        """Log a closed aggregation window"""
+        if summary:
+            self._collect_stats(summary['cpu_percent'], summary['memory_percent'], summary)
+        if self.keep_raw_seconds > 0:
+            self.db.prune_raw_samples(self.keep_raw_seconds)
     
-    def _collect_stats(self):
-        """Collect and log system statistics"""
+    def _collect_stats(self, cpu_percent, memory_percent, summary=None):
+        """Log system statistics, with the slower disk and uptime lookups done only for recorded rows"""
         try:
-            # Get CPU usage (average over 1 second)
-            cpu_percent = psutil.cpu_percent(interval=1)
-            
-            # Get memory usage
-            memory = psutil.virtual_memory()
-            memory_percent = memory.percent
-            
             # Get disk usage
             disk = psutil.disk_usage('/')
             disk_percent = disk.percent
@@ -65,9 +118,16 @@ class SystemMonitor:
                 cpu_percent=cpu_percent,
                 memory_percent=memory_percent,
                 disk_percent=disk_percent,
-                uptime=int(uptime)
+                uptime=int(uptime),
+                summary=summary
             )
             
+            # Detailed metrics; each collector is timed and backed off if over budget
+            if self.collectors:
+                samples = self.collectors.run()
+                if samples:
+                    self.db.log_metric_samples(samples)
+            
             self.logger.debug(
                 f"Stats - CPU: {cpu_percent}%, Memory: {memory_percent}%, "
                 f"Disk: {disk_percent}%, Uptime: {uptime:.0f}s"
@@ -89,7 +149,15 @@ class SystemMonitor:
     def stop(self):
         """Stop system monitoring"""
         self.running = False
-        self.logger.info("System monitor stopped")
+        if self.task:
+            self.scheduler.cancel(self.task)
         
-        if self.monitor_thread:
-            self.monitor_thread.join(timeout=2)
\ No newline at end of file
+        if self.aggregator:
+            # Keep the probes of the unfinished window
+            self._record_summary(self.aggregator.summarize())
+            self.logger.info(f"System monitor stopped. Sampling: {self.sampler.stats()}, "
+                             f"aggregation: {self.aggregator.stats()}")
+        else:
+            self.logger.info(f"System monitor stopped. Sampling: {self.sampler.stats()}")
+        if self.collectors:
+            self.logger.info(f"Metric collector costs: {self.collectors.stats()}")
\ No newline at end of file
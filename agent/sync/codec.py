@@ -0,0 +1,127 @@
+"""
+Compact columnar wire format for sync uploads
+Encodes a batch envelope as typed column arrays and compresses it
+
+Layout (before compression):
+    b'DMC1' | uint32 header length | JSON header | numeric column blocks
+The header carries the format version and lists each table's row count,
+its string columns and the extension columns sent. Numeric columns follow
+in schema order (then the extension columns) as little-endian arrays:
+timestamps as int64 epoch microseconds (milliseconds in version 1, which
+lost the sub-millisecond part JSON uploads keep), integers as int64,
+percentages as float32 and unbounded metric values (byte rates, sizes) as
+float64. Missing values are NaN for floats and INT64_NULL for
+integers/timestamps.
+"""
+
+import json
+import zlib
+import struct
+from array import array
+from datetime import datetime, timedelta
+import sys
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+CONTENT_TYPE = 'application/x-devmon-columnar'
+MAGIC = b'DMC1'
+INT64_NULL = -2 ** 63
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+# Version 2: microsecond timestamps; servers reject tables they don't know.
+# Only sent to servers whose health check advertises at least this version
+FORMAT_VERSION = 2
+
+# Column name and type per table, shared with server/api/codec.py
+SCHEMAS = {
+    'power_events': [
+        ('timestamp', 'ts'), ('event_type', 'str'), ('details', 'str')
+    ],
+    'session_events': [
+        ('session_type', 'str'), ('start_time', 'ts'), ('end_time', 'ts'),
+        ('duration', 'i8'), ('username', 'str')
+    ],
+    'system_stats': [
+        ('timestamp', 'ts'), ('cpu_percent', 'f4'), ('memory_percent', 'f4'),
+        ('disk_percent', 'f4'), ('uptime', 'i8')
+    ],
+    # Appended last: older decoders stop after the tables they know
+    'metric_samples': [
+        ('timestamp', 'ts'), ('metric', 'str'), ('label', 'str'), ('value', 'f8')
+    ]
+}
+
+# Columns added to an existing table after its schema shipped. Their blocks
+# follow every SCHEMAS block, so decoders that predate them (and stop at the
+# end of SCHEMAS) still read the base columns correctly
+EXTENSIONS = {
+    'system_stats': [
+        ('cpu_min', 'f4'), ('cpu_max', 'f4'), ('cpu_p95', 'f4'),
+        ('memory_min', 'f4'), ('memory_max', 'f4'), ('memory_p95', 'f4'),
+        ('sample_count', 'i8'), ('covered_seconds', 'f8')
+    ]
+}
+
+def supported_encodings():
+    """Content-Encodings this agent can produce, preferred first"""
+    encodings = ['deflate']
+    if zstandard is not None:
+        encodings.insert(0, 'zstd')
+    return encodings
+
+def _to_epoch_us(value):
+    """Convert a stored local timestamp to epoch microseconds (wall clock kept as-is)"""
+    if not value:
+        return INT64_NULL
+    if not isinstance(value, datetime):
+        value = datetime.fromisoformat(value)
+    return (value - EPOCH) // MICROSECOND
+
+def _column_array(kind, values):
+    """Pack one numeric column"""
+    if kind in ('f4', 'f8'):
+        packed = array('f' if kind == 'f4' else 'd', (float('nan') if v is None else v for v in values))
+    elif kind == 'ts':
+        packed = array('q', (_to_epoch_us(v) for v in values))
+    else:
+        packed = array('q', (INT64_NULL if v is None else int(v) for v in values))
+
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    return packed.tobytes()
+
+def encode(envelope):
+    """Encode a batch envelope (table name -> list of row dicts) to uncompressed bytes"""
+    header = {'version': FORMAT_VERSION, 'tables': {}}
+    blocks = []
+
+    for table, columns in SCHEMAS.items():
+        rows = envelope.get(table) or []
+        strings = {}
+        for name, kind in columns:
+            values = [row.get(name) for row in rows]
+            if kind == 'str':
+                strings[name] = values
+            else:
+                blocks.append(_column_array(kind, values))
+        header['tables'][table] = {'count': len(rows), 'strings': strings}
+
+    for table, columns in EXTENSIONS.items():
+        rows = envelope.get(table) or []
+        for name, kind in columns:
+            blocks.append(_column_array(kind, [row.get(name) for row in rows]))
+        header['tables'][table]['extensions'] = [name for name, _ in columns]
+
+    header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    return b''.join([MAGIC, struct.pack('<I', len(header_bytes)), header_bytes] + blocks)
+
+def compress(data, encoding):
+    """Compress encoded bytes for the given Content-Encoding"""
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    if encoding == 'deflate':
+        return zlib.compress(data, 6)
+    raise ValueError(f"Unsupported encoding: {encoding}")
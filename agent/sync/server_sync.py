@@ -3,28 +3,99 @@ Server synchronization module
 Sends collected data from agent to central server
 """
 
+import time
+import hashlib
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import logging
 from datetime import datetime
 import socket
 import platform
 from pathlib import Path
+from agent.sync import codec
+from agent.database.local_db import SUMMARY_COLUMNS
+
+# Tables every /batch endpoint has stored; servers that predate per-table
+# counts in the response acknowledge exactly these
+LEGACY_BATCH_TABLES = ('power_events', 'session_events', 'system_stats')
 
 class ServerSync:
-    def __init__(self, database, server_url, api_key, device_id):
+    def __init__(self, database, server_url, api_key, device_id,
+                 timeout=10, max_retries=3, backoff_factor=0.5, pool_size=4, wire_format='auto',
+                 chunk_size=500, negotiate_interval=3600):
         """
         Initialize server sync
         :param database: Local database instance
         :param server_url: Server URL (e.g., http://localhost:5000)
         :param api_key: API key for authentication
         :param device_id: Unique device identifier
+        :param timeout: Request timeout in seconds
+        :param max_retries: Retries for connection errors and 503 responses
+        :param backoff_factor: Exponential backoff factor between retries
+        :param pool_size: Number of keep-alive connections kept to the server
+        :param wire_format: 'auto' to use the compact format when the server offers it, or 'json'
+        :param chunk_size: Maximum rows per table sent in one upload
+        :param negotiate_interval: Seconds before the upload format is checked against the server again
         """
         self.db = database
         self.server_url = server_url.rstrip('/')
         self.api_key = api_key
         self.device_id = device_id
+        self.timeout = timeout
+        self.chunk_size = chunk_size
         self.logger = logging.getLogger(__name__)
         self.api_base_url = f"{self.server_url}/api/v1"
+        self.session = self._create_session(max_retries, backoff_factor, pool_size)
+        self.wire_format = wire_format
+        # Content-Encoding for columnar uploads, None means plain JSON
+        self.wire_encoding = None
+        self.negotiate_interval = negotiate_interval
+        # Monotonic time of the next format check, 0 until the first one succeeds
+        self.renegotiate_at = 0.0
+        # Device metadata last accepted by the server, None until registered
+        self.registered_info = None
+        # Screenshot file bytes actually sent (existence-checked ones aren't)
+        self.screenshot_bytes_uploaded = 0
+    
+    def _create_session(self, max_retries, backoff_factor, pool_size):
+        """Create the long-lived HTTP session shared by every sync call"""
+        # Never retry after the server may have read the request (read=0), so a
+        # slow commit can't turn into a duplicate ingest. Only 503 is retried:
+        # a proxy's 502/504 can come after the upstream already committed it
+        retry = Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=0,
+            status=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(503,),
+            allowed_methods=frozenset(['GET', 'HEAD', 'POST']),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers.update({
+            'X-API-Key': self.api_key,
+            'Connection': 'keep-alive'
+        })
+        return session
+    
+    def close(self):
+        """Close pooled server connections"""
+        self.session.close()
+    
+    def _device_info(self):
+        """Get the device metadata sent on registration"""
+        return {
+            'device_id': self.device_id,
+            'hostname': socket.gethostname(),
+            'platform': platform.system(),
+            'platform_version': platform.version()
+        }
         
     def register_device(self):
         """Register this device with the server"""
@@ -32,21 +103,12 @@ class ServerSync:
             url = f"{self.api_base_url}/devices/register"
             
             # Get system information
-            data = {
-                'device_id': self.device_id,
-                'hostname': socket.gethostname(),
-                'platform': platform.system(),
-                'platform_version': platform.version()
-            }
+            data = self._device_info()
             
-            headers = {
-                'Content-Type': 'application/json',
-                'X-API-Key': self.api_key
-            }
-            
-            response = requests.post(url, json=data, headers=headers, timeout=10)
+            response = self.session.post(url, json=data, timeout=self.timeout)
             
             if response.status_code == 200:
+                self.registered_info = data
                 self.logger.info(f"✅ Device registered successfully: {self.device_id}")
                 return True
             else:
@@ -57,115 +119,206 @@ class ServerSync:
             self.logger.error(f"Error registering device: {e}")
             return False
     
-    def sync_power_events(self):
-        """Sync unsynced power events to server"""
+    @staticmethod
+    def _format_power_event(event):
+        """Format a local power event row for the server"""
+        return {
+            'event_type': event['event_type'],
+            'timestamp': event['timestamp'],
+            'details': event.get('details', '')
+        }
+    
+    @staticmethod
+    def _format_session_event(session):
+        """Format a local session event row for the server"""
+        return {
+            'session_type': session['session_type'],
+            'start_time': session['start_time'],
+            'end_time': session['end_time'],
+            'duration': session['duration'],
+            'username': session['username']
+        }
+    
+    @staticmethod
+    def _format_system_stat(stat):
+        """Format a local system stat row for the server"""
+        return {
+            'timestamp': stat['timestamp'],
+            'cpu_percent': stat['cpu_percent'],
+            'memory_percent': stat['memory_percent'],
+            'disk_percent': stat['disk_percent'],
+            'uptime': stat['uptime'],
+            # Window summary, None for rows recorded as sampled
+            **{column: stat.get(column) for column in SUMMARY_COLUMNS}
+        }
+    
+    @staticmethod
+    def _format_metric_sample(sample):
+        """Format a local metric sample row for the server"""
+        return {
+            'timestamp': sample['timestamp'],
+            'metric': sample['metric'],
+            'label': sample['label'],
+            'value': sample['value']
+        }
+    
+    def ensure_registered(self):
+        """Register the device unless the server already has its current metadata"""
+        if self.registered_info == self._device_info():
+            return True
+        return self.register_device()
+    
+    def _negotiate_encoding(self, health):
+        """Pick the compact upload encoding from the server's health response"""
+        previous = self.wire_encoding
+        self.wire_encoding = None
+        self.renegotiate_at = time.monotonic() + self.negotiate_interval
+        if self.wire_format != 'auto':
+            return
+        
+        # Older servers decode an earlier layout (millisecond timestamps); they get JSON
+        if (health.get('sync_format') or 1) < codec.FORMAT_VERSION:
+            if previous:
+                self.logger.info("Server no longer accepts the columnar sync format, using JSON")
+            return
+        
+        offered = health.get('sync_encodings') or []
+        for encoding in codec.supported_encodings():
+            if encoding in offered:
+                self.wire_encoding = encoding
+                if encoding != previous:
+                    self.logger.info(f"Using columnar sync format ({encoding})")
+                return
+    
+    def refresh_encoding(self):
+        """
+        Re-check the upload format once negotiate_interval has passed
+        Picks up a server upgraded (or downgraded) since startup, and retries
+        negotiation when the startup health check didn't reach the server
+        """
+        if self.wire_format != 'auto' or time.monotonic() < self.renegotiate_at:
+            return
         try:
-            # Get unsynced events
-            unsynced_data = self.db.get_unsynced_events()
-            power_events = unsynced_data.get('power_events', [])
-            
-            if not power_events:
-                return True
-            
-            url = f"{self.api_base_url}/devices/{self.device_id}/power_events"
-            
-            # Format events for server
-            events_data = []
-            for event in power_events:
-                events_data.append({
-                    'event_type': event['event_type'],
-                    'timestamp': event['timestamp'],
-                    'details': event.get('details', '')
-                })
-            
-            headers = {
-                'Content-Type': 'application/json',
-                'X-API-Key': self.api_key
-            }
-            
-            response = requests.post(
+            response = self.session.get(f"{self.api_base_url}/health", timeout=5)
+            if response.status_code == 200:
+                self._negotiate_encoding(response.json())
+        except (requests.exceptions.RequestException, ValueError) as e:
+            self.logger.warning(f"Could not check the server's sync format: {e}")
+    
+    def _post_envelope(self, url, envelope):
+        """POST a batch envelope, compact if negotiated, falling back to JSON"""
+        if self.wire_encoding:
+            body = codec.compress(codec.encode(envelope), self.wire_encoding)
+            response = self.session.post(
                 url,
-                json={'events': events_data},
-                headers=headers,
-                timeout=10
+                data=body,
+                headers={
+                    'Content-Type': codec.CONTENT_TYPE,
+                    'Content-Encoding': self.wire_encoding
+                },
+                timeout=self.timeout
             )
+            if response.status_code != 415:
+                return response
             
-            if response.status_code == 200:
-                # Mark events as synced
-                event_ids = [e['id'] for e in power_events]
-                self.db.mark_as_synced('power_events', event_ids)
-                self.logger.info(f"✅ Synced {len(events_data)} power events")
-                return True
-            else:
-                self.logger.error(f"Failed to sync power events: {response.status_code}")
-                return False
-                
-        except Exception as e:
-            self.logger.error(f"Error syncing power events: {e}")
-            return False
+            self.logger.warning("Server rejected columnar sync format, falling back to JSON")
+            self.wire_encoding = None
+            self.renegotiate_at = time.monotonic() + self.negotiate_interval
+        
+        return self.session.post(url, json=envelope, timeout=self.timeout)
     
-    def sync_system_stats(self):
-        """Sync unsynced system statistics to server"""
+    def sync_batch(self):
+        """
+        Sync all unsynced events and stats to server
+        The backlog is drained in chunks of chunk_size rows per table; each chunk is
+        uploaded in one request and marked synced before the next one is read
+        """
         try:
-            # Get unsynced stats
-            unsynced_data = self.db.get_unsynced_events()
-            system_stats = unsynced_data.get('system_stats', [])
-            
-            if not system_stats:
-                return True
+            # Commit queued local writes so this cycle ships everything logged so far
+            self.db.flush()
+            url = f"{self.api_base_url}/devices/{self.device_id}/batch"
+            reregistered = False
             
-            url = f"{self.api_base_url}/devices/{self.device_id}/system_stats"
-            
-            # Format stats for server
-            stats_data = []
-            for stat in system_stats:
-                stats_data.append({
-                    'timestamp': stat['timestamp'],
-                    'cpu_percent': stat['cpu_percent'],
-                    'memory_percent': stat['memory_percent'],
-                    'disk_percent': stat['disk_percent'],
-                    'uptime': stat['uptime']
-                })
-            
-            headers = {
-                'Content-Type': 'application/json',
-                'X-API-Key': self.api_key
-            }
-            
-            response = requests.post(
-                url,
-                json={'stats': stats_data},
-                headers=headers,
-                timeout=10
-            )
+            for chunk in self.db.iter_unsynced_batches(self.chunk_size):
+                power_events = chunk['power_events']
+                session_events = chunk['session_events']
+                system_stats = chunk['system_stats']
+                metric_samples = chunk['metric_samples']
+                
+                # Format records for server
+                envelope = {
+                    'power_events': [self._format_power_event(e) for e in power_events],
+                    'session_events': [self._format_session_event(e) for e in session_events],
+                    'system_stats': [self._format_system_stat(s) for s in system_stats],
+                    'metric_samples': [self._format_metric_sample(m) for m in metric_samples]
+                }
+                
+                response = self._post_envelope(url, envelope)
+                
+                if response.status_code == 404 and not reregistered:
+                    # Server lost the device (e.g. database reset), register again and retry once
+                    reregistered = True
+                    self.registered_info = None
+                    if not self.register_device():
+                        return False
+                    response = self._post_envelope(url, envelope)
+                
+                # 202: accepted into the server's ingest queue
+                if response.status_code not in (200, 202):
+                    self.logger.error(f"Failed to sync batch: {response.status_code}")
+                    return False
+                
+                # Mark this chunk before reading the next one, but only the tables
+                # the server says it stored; an older server ignores newer tables
+                accepted = self._accepted_tables(response)
+                rejected = []
+                for table_name, records in chunk.items():
+                    if not records:
+                        continue
+                    if table_name in accepted:
+                        self.db.mark_as_synced(table_name, [r['id'] for r in records])
+                    else:
+                        rejected.append(table_name)
+                
+                if rejected:
+                    # Kept unsynced; stop here instead of re-sending them chunk after chunk
+                    self.logger.warning(f"Server did not accept {', '.join(rejected)}; keeping them for a later sync")
+                    return False
+                self.logger.info(
+                    f"✅ Synced {len(power_events)} power events, {len(session_events)} session events, "
+                    f"{len(system_stats)} system stats, {len(metric_samples)} metric samples"
+                )
             
-            if response.status_code == 200:
-                # Mark stats as synced
-                stat_ids = [s['id'] for s in system_stats]
-                self.db.mark_as_synced('system_stats', stat_ids)
-                self.logger.info(f"✅ Synced {len(stats_data)} system stats")
-                return True
-            else:
-                self.logger.error(f"Failed to sync system stats: {response.status_code}")
-                return False
+            return True
                 
         except Exception as e:
-            self.logger.error(f"Error syncing system stats: {e}")
+            self.logger.error(f"Error syncing batch: {e}")
             return False
     
+    @staticmethod
+    def _accepted_tables(response):
+        """Tables a /batch response reports as stored or queued"""
+        try:
+            counts = response.json().get('counts')
+        except (ValueError, AttributeError):
+            counts = None
+        if not isinstance(counts, dict):
+            return set(LEGACY_BATCH_TABLES)
+        return set(counts)
+    
     def sync_all(self):
         """Sync all unsynced data to server"""
         try:
             self.logger.info("🔄 Starting data synchronization...")
             
-            # Register/update device
-            self.register_device()
+            # Register only if the device metadata changed
+            self.ensure_registered()
             
-            # Sync power events
-            self.sync_power_events()
+            # Pick up a server format change since the last check
+            self.refresh_encoding()
             
-            # Sync system stats
-            self.sync_system_stats()
+            # Sync power events, session events and system stats together
+            self.sync_batch()
             
             # Sync screenshots
             self.sync_screenshots()
@@ -178,36 +331,43 @@ class ServerSync:
             return False
     
     def sync_screenshots(self):
-        """Sync screenshots to server"""
+        """
+        Send screenshots the server hasn't acknowledged yet, each one at most once
+        The server is first offered the screenshot's sha256; the file is only
+        uploaded when the server doesn't already store that content
+        """
         try:
-            # Get unsynced screenshots
-            screenshots = self.db.get_screenshots()
-            
-            for screenshot in screenshots:
-                if screenshot.get('synced') == 0:
-                    # Read screenshot file
-                    filepath = screenshot['filepath']
-                    
-                    if not Path(filepath).exists():
-                        self.logger.warning(f"Screenshot file not found: {filepath}")
-                        continue
-                    
-                    url = f"{self.api_base_url}/devices/{self.device_id}/screenshots"
-                    
-                    headers = {
-                        'X-API-Key': self.api_key
-                    }
-                    
-                    # Upload file
+            url = f"{self.api_base_url}/devices/{self.device_id}/screenshots"
+            
+            for screenshot in self.db.get_unsynced_screenshots():
+                filepath = Path(screenshot['filepath'])
+                
+                if not filepath.exists():
+                    self.logger.warning(f"Screenshot file not found: {filepath}")
+                    continue
+                
+                sha256 = self._file_sha256(filepath)
+                
+                # Existence check: a stored screenshot is recorded without sending it again
+                response = self.session.post(
+                    url, json={'sha256': sha256, 'filename': screenshot['filename']}, timeout=self.timeout
+                )
+                uploaded = response.status_code != 200
+                if uploaded:
                     with open(filepath, 'rb') as f:
                         files = {'file': (screenshot['filename'], f, 'image/jpeg')}
-                        response = requests.post(url, files=files, headers=headers, timeout=30)
-                    
-                    if response.status_code == 200:
-                        self.logger.info(f"📸 Synced screenshot: {screenshot['filename']}")
-                        # Note: We don't mark as synced because we manage screenshots locally
-                    else:
-                        self.logger.error(f"Failed to sync screenshot: {response.status_code}")
+                        response = self.session.post(url, files=files, timeout=30)
+                
+                if response.status_code == 200 and self._acknowledged(response, sha256):
+                    self.db.mark_as_synced('screenshots', [screenshot['id']])
+                    if uploaded:
+                        self.screenshot_bytes_uploaded += filepath.stat().st_size
+                    self.logger.info(
+                        f"📸 Synced screenshot: {screenshot['filename']}"
+                        f"{'' if uploaded else ' (already on server, not re-sent)'}"
+                    )
+                else:
+                    self.logger.error(f"Failed to sync screenshot: {response.status_code}")
             
             return True
             
@@ -215,13 +375,32 @@ class ServerSync:
             self.logger.error(f"Error syncing screenshots: {e}")
             return False
     
+    @staticmethod
+    def _file_sha256(filepath):
+        """Hex sha256 of a file, read in chunks"""
+        digest = hashlib.sha256()
+        with open(filepath, 'rb') as f:
+            for block in iter(lambda: f.read(65536), b''):
+                digest.update(block)
+        return digest.hexdigest()
+    
+    @staticmethod
+    def _acknowledged(response, sha256):
+        """Whether the server stored the content we hashed (servers without a blob store don't echo a hash)"""
+        try:
+            stored = response.json().get('screenshot', {}).get('sha256')
+        except ValueError:
+            return False
+        return stored in (None, sha256)
+    
     def test_connection(self):
         """Test connection to server"""
         try:
             url = f"{self.api_base_url}/health"
-            response = requests.get(url, timeout=5)
+            response = self.session.get(url, timeout=5)
             
             if response.status_code == 200:
+                self._negotiate_encoding(response.json())
                 self.logger.info(f"✅ Server connection successful: {self.server_url}")
                 return True
             else:
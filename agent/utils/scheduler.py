@@ -0,0 +1,221 @@
+"""
+Single shared scheduler for the agent's periodic tasks
+One thread (the caller of run()) sleeps until the earliest due task in a heap,
+so an idle agent wakes only when something is due. Quick tasks run on that
+thread; tasks marked threaded (screen capture, sync) run one at a time on a
+single worker thread so they can't delay the others. A task is rescheduled
+after it finishes (fixed delay), and can return a number to set its own next
+delay. Every task records its run time and lateness for stats().
+"""
+
+import heapq
+import queue
+import random
+import threading
+import time
+import logging
+
+# Missed-run policies: a run that is later than its grace period either runs
+# once now ('coalesce', any further missed runs are dropped) or is skipped
+# and waits for its next interval ('skip')
+MISFIRE_POLICIES = ('coalesce', 'skip')
+
+# Queue marker asking the worker thread to exit
+_STOP = object()
+
+class Task:
+    """A periodic task registered with Scheduler.every()"""
+
+    def __init__(self, name, func, interval, jitter, threaded, misfire, grace):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.jitter = jitter
+        self.threaded = threaded
+        self.misfire = misfire
+        self.grace = grace
+        self.cancelled = False
+        self.due = None
+
+        self.runs = 0
+        self.errors = 0
+        self.missed = 0
+        self.last_ms = 0.0
+        self.avg_ms = 0.0
+        self.max_ms = 0.0
+        self.last_late_ms = 0.0
+        self.max_late_ms = 0.0
+
+    def next_delay(self, result=None):
+        """Seconds until the next run: the delay the task returned, or the interval with jitter"""
+        if isinstance(result, (int, float)) and not isinstance(result, bool):
+            return max(0.0, result)
+        if self.jitter:
+            return max(0.0, self.interval + random.uniform(-self.jitter, self.jitter))
+        return self.interval
+
+    def stats(self, now):
+        """Run counters and timing in milliseconds"""
+        return {
+            'runs': self.runs,
+            'errors': self.errors,
+            'missed': self.missed,
+            'last_ms': round(self.last_ms, 3),
+            'avg_ms': round(self.avg_ms, 3),
+            'max_ms': round(self.max_ms, 3),
+            'last_late_ms': round(self.last_late_ms, 3),
+            'max_late_ms': round(self.max_late_ms, 3),
+            'next_in': round(self.due - now, 1) if self.due is not None and not self.cancelled else None
+        }
+
+class Scheduler:
+    def __init__(self, logger=None, shutdown_timeout=5.0):
+        """
+        Initialize the scheduler
+        :param logger: Logger for task errors (default: this module's logger)
+        :param shutdown_timeout: Seconds run() waits, once stopped, for a threaded task still running
+        """
+        self.logger = logger or logging.getLogger(__name__)
+        self.shutdown_timeout = shutdown_timeout
+        self.tasks = []
+        self.wakeups = 0
+
+        self._heap = []  # (due, sequence, task)
+        self._sequence = 0
+        # Re-entrant, so stop() is safe from a signal handler on the scheduler thread
+        self._condition = threading.Condition(threading.RLock())
+        self._stopping = False
+
+        self._work_queue = queue.Queue()
+        self._worker_thread = None
+
+    def every(self, interval, func, name=None, jitter=0.0, first_delay=None, threaded=False,
+              misfire='coalesce', grace=None):
+        """
+        Run func every interval seconds until cancelled
+        :param interval: Seconds between the end of one run and the start of the next
+        :param func: Callable with no arguments; returning a number sets the next delay instead
+        :param name: Name used in logs and stats (default: the function name)
+        :param jitter: Up to this many seconds are randomly added to or taken off each delay
+        :param first_delay: Seconds until the first run (default: one delay)
+        :param threaded: Run on the worker thread (for slow or blocking tasks)
+        :param misfire: What to do with a run later than grace: 'coalesce' or 'skip'
+        :param grace: Seconds a run may be late before it counts as missed (default: the interval)
+        :return: Task, for cancel() and stats
+        """
+        if misfire not in MISFIRE_POLICIES:
+            raise ValueError(f"Unknown misfire policy: {misfire} (choose from {', '.join(MISFIRE_POLICIES)})")
+
+        task = Task(name or func.__name__, func, interval, jitter, threaded, misfire,
+                    grace if grace is not None else max(1.0, interval))
+        with self._condition:
+            self.tasks.append(task)
+            self._push(task, time.monotonic() + (first_delay if first_delay is not None else task.next_delay()))
+        return task
+
+    def cancel(self, task):
+        """Stop scheduling a task; a run already in progress finishes"""
+        with self._condition:
+            task.cancelled = True
+            self._condition.notify_all()
+
+    def _push(self, task, due):
+        """Queue a task's next run and wake the loop if it's now the earliest"""
+        if task.cancelled:
+            return
+        task.due = due
+        self._sequence += 1
+        heapq.heappush(self._heap, (due, self._sequence, task))
+        self._condition.notify_all()
+
+    def run(self):
+        """Run due tasks until stop() is called (returns at once if it already was); blocks the calling thread"""
+        while True:
+            with self._condition:
+                while not self._stopping:
+                    while self._heap and self._heap[0][2].cancelled:
+                        heapq.heappop(self._heap)
+                    timeout = self._heap[0][0] - time.monotonic() if self._heap else None
+                    if timeout is not None and timeout <= 0:
+                        break
+                    self._condition.wait(timeout)
+                    self.wakeups += 1
+                if self._stopping:
+                    break
+                due, _, task = heapq.heappop(self._heap)
+
+            self._dispatch(task, due)
+
+        if self._worker_thread is not None:
+            # Queued threaded runs are dropped; one already running gets a moment to finish
+            self._work_queue.put(_STOP)
+            self._worker_thread.join(timeout=self.shutdown_timeout)
+            if self._worker_thread.is_alive():
+                self.logger.warning("Scheduler: a threaded task is still running, not waiting for it")
+            self._worker_thread = None
+
+    def _dispatch(self, task, due):
+        """Apply the missed-run policy, then run the task here or hand it to the worker"""
+        now = time.monotonic()
+        late = now - due
+        if late > task.grace:
+            task.missed += 1
+            if task.misfire == 'skip':
+                self.logger.warning(f"Scheduler: {task.name} was {late:.1f}s late, skipping this run")
+                with self._condition:
+                    self._push(task, now + task.next_delay())
+                return
+
+        if task.threaded:
+            if self._worker_thread is None:
+                self._worker_thread = threading.Thread(target=self._worker_loop, name='SchedulerWorker', daemon=True)
+                self._worker_thread.start()
+            self._work_queue.put((task, due))
+        else:
+            self._execute(task, due)
+
+    def _execute(self, task, due):
+        """Run a task, record its timing and schedule the next run"""
+        started = time.monotonic()
+        result = None
+        try:
+            result = task.func()
+        except Exception as e:
+            task.errors += 1
+            self.logger.error(f"Scheduled task {task.name} failed: {e}")
+        finished = time.monotonic()
+
+        elapsed_ms = (finished - started) * 1000
+        task.runs += 1
+        task.last_ms = elapsed_ms
+        task.max_ms = max(task.max_ms, elapsed_ms)
+        task.avg_ms = elapsed_ms if task.runs == 1 else 0.8 * task.avg_ms + 0.2 * elapsed_ms
+        task.last_late_ms = max(0.0, started - due) * 1000
+        task.max_late_ms = max(task.max_late_ms, task.last_late_ms)
+
+        with self._condition:
+            self._push(task, finished + task.next_delay(result))
+
+    def _worker_loop(self):
+        """Run threaded tasks one at a time"""
+        while True:
+            item = self._work_queue.get()
+            if item is _STOP:
+                return
+            if not self._stopping:
+                self._execute(*item)
+
+    def stop(self):
+        """Make run() return as soon as the task it is running (if any) finishes"""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+
+    def stats(self):
+        """Per-task timing plus the number of times the loop woke up"""
+        now = time.monotonic()
+        with self._condition:
+            return {
+                'wakeups': self.wakeups,
+                'tasks': {task.name: task.stats(now) for task in self.tasks if not task.cancelled}
+            }
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark the detailed metric collectors
+Times each collector per sample against its budget, then shows the collector
+set backing off a collector whose budget is set below its real cost
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from agent.monitors.collectors import COLLECTORS, CollectorSet, TopProcessesCollector
+
+def time_collector(collector, samples, interval):
+    """Median and max milliseconds per collect(), and samples produced by the last one"""
+    timings = []
+    produced = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        produced = collector.collect()
+        timings.append((time.perf_counter() - started) * 1000)
+        time.sleep(interval)
+    timings.sort()
+    return timings[len(timings) // 2], timings[-1], len(produced)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the detailed metric collectors')
+    parser.add_argument('--samples', type=int, default=20, help='Samples per collector')
+    parser.add_argument('--interval', type=float, default=0.05, help='Seconds between samples')
+    parser.add_argument('--top-processes', type=int, default=5)
+    args = parser.parse_args()
+
+    collector_set = CollectorSet.from_names(list(COLLECTORS), top_processes=args.top_processes)
+
+    print(f"\n{'='*80}")
+    print(f"📊 Cost per sample ({args.samples} samples each)")
+    print(f"{'='*80}")
+    print(f"{'Collector':<12} | {'Median ms':>9} | {'Max ms':>7} | {'Budget ms':>9} | {'Samples':>7}")
+    print("-" * 80)
+    total_ms = 0.0
+    total_samples = 0
+    for collector in collector_set.collectors:
+        median, worst, produced = time_collector(collector, args.samples, args.interval)
+        total_ms += median
+        total_samples += produced
+        print(f"{collector.name:<12} | {median:>9.3f} | {worst:>7.3f} | {collector.budget_ms:>9.0f} | {produced:>7}")
+    print("-" * 80)
+    print(f"{'all':<12} | {total_ms:>9.3f} | {'':>7} | {'':>9} | {total_samples:>7}")
+
+    # Backoff: give the process collector a budget it can't meet
+    class TightProcesses(TopProcessesCollector):
+        budget_ms = 0.01
+
+    tight = CollectorSet([TightProcesses(top_n=args.top_processes)])
+    for _ in range(args.samples * 2):
+        tight.run()
+    state = tight.stats()['processes']
+
+    print(f"{'='*80}")
+    print(f"🐢 processes with a {TightProcesses.budget_ms} ms budget over {args.samples * 2} samples: "
+          f"ran {state['runs']}x, skipped {state['skipped']}x, now every {state['every']} samples")
+    print(f"{'='*80}\n")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark server ingest throughput: per-row ORM path vs bulk executemany path
+Reports rows/sec for power_events and system_stats at several payload sizes
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+from datetime import datetime, timedelta
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+# Point the server at a throwaway database before importing its config
+_tmp_dir = tempfile.mkdtemp(prefix='devmon_bench_')
+os.environ['DATABASE_TYPE'] = 'sqlite'
+os.environ['DATABASE_PATH'] = str(Path(_tmp_dir) / 'bench.db')
+
+from server.app import create_app
+from server.models.database import db, Device, PowerEvent, SystemStat
+from server.api.ingest import insert_power_events, insert_system_stats
+
+def make_payloads(size):
+    """Build agent-shaped payloads of the given size"""
+    start = datetime(2024, 1, 1)
+    events = [
+        {
+            'event_type': 'WAKE' if i % 2 else 'SLEEP',
+            'timestamp': (start + timedelta(seconds=i)).isoformat(sep=' '),
+            'details': f'Duration: {i} seconds'
+        }
+        for i in range(size)
+    ]
+    stats = [
+        {
+            'timestamp': (start + timedelta(seconds=i)).isoformat(sep=' '),
+            'cpu_percent': (i * 7) % 100 + 0.5,
+            'memory_percent': (i * 3) % 100 + 0.25,
+            'disk_percent': 42.0,
+            'uptime': i
+        }
+        for i in range(size)
+    ]
+    return events, stats
+
+def legacy_power_events(device_pk, events):
+    """Original per-row ORM ingest"""
+    for event_data in events:
+        db.session.add(PowerEvent(
+            device_id=device_pk,
+            event_type=event_data.get('event_type'),
+            timestamp=datetime.fromisoformat(event_data.get('timestamp')) if event_data.get('timestamp') else datetime.utcnow(),
+            details=event_data.get('details')
+        ))
+
+def legacy_system_stats(device_pk, stats):
+    """Original per-row ORM ingest"""
+    for stat_data in stats:
+        db.session.add(SystemStat(
+            device_id=device_pk,
+            timestamp=datetime.fromisoformat(stat_data.get('timestamp')) if stat_data.get('timestamp') else datetime.utcnow(),
+            cpu_percent=stat_data.get('cpu_percent'),
+            memory_percent=stat_data.get('memory_percent'),
+            disk_percent=stat_data.get('disk_percent'),
+            uptime=stat_data.get('uptime')
+        ))
+
+def timed(func, device_pk, rows):
+    """Run one ingest function plus commit and return rows/sec"""
+    start = time.perf_counter()
+    func(device_pk, rows)
+    db.session.commit()
+    elapsed = time.perf_counter() - start
+    return len(rows) / elapsed if elapsed else float('inf')
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark server ingest paths')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    args = parser.parse_args()
+
+    app = create_app()
+
+    with app.app_context():
+        device = Device(device_id='bench-device', hostname='bench')
+        db.session.add(device)
+        db.session.commit()
+        device_pk = device.id
+
+        print(f"\n{'='*80}")
+        print(f"{'Table':<15} | {'Rows':>8} | {'ORM rows/s':>12} | {'Bulk rows/s':>12} | {'Speedup':>8}")
+        print("-" * 80)
+
+        for size in args.sizes:
+            events, stats = make_payloads(size)
+
+            for table, legacy, bulk, rows in (
+                ('power_events', legacy_power_events, insert_power_events, events),
+                ('system_stats', legacy_system_stats, insert_system_stats, stats),
+            ):
+                before = timed(legacy, device_pk, rows)
+                after = timed(bulk, device_pk, rows)
+                print(f"{table:<15} | {size:>8} | {before:>12,.0f} | {after:>12,.0f} | {after / before:>7.1f}x")
+
+        print(f"{'='*80}\n")
+
+if __name__ == '__main__':
+    main()
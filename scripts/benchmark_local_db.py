@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark agent SQLite query latency with and without the schema indexes
+Measures the sync drain page and recent-first reads at growing row counts
+"""
+
+import sys
+import time
+import random
+import sqlite3
+import logging
+import argparse
+import tempfile
+from pathlib import Path
+from datetime import datetime, timedelta
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from agent.database.local_db import LocalDatabase, SCHEMA_MIGRATIONS
+
+QUERIES = {
+    'unsynced page': 'SELECT * FROM system_stats WHERE synced = 0 AND id > 0 ORDER BY id LIMIT 500',
+    'recent stats': 'SELECT * FROM system_stats ORDER BY timestamp DESC LIMIT 10',
+    'unsynced events': 'SELECT * FROM power_events WHERE synced = 0 AND id > 0 ORDER BY id LIMIT 500',
+}
+
+def populate(connection, rows, unsynced_fraction=0.01):
+    """Fill system_stats and power_events with mostly-synced history"""
+    start = datetime(2024, 1, 1)
+    unsynced_from = int(rows * (1 - unsynced_fraction))
+    cursor = connection.cursor()
+
+    cursor.executemany(
+        'INSERT INTO system_stats (timestamp, cpu_percent, memory_percent, disk_percent, uptime, synced) '
+        'VALUES (?, ?, ?, ?, ?, ?)',
+        (
+            (start + timedelta(seconds=300 * i), random.random() * 100, 50.0, 60.0, i, int(i < unsynced_from))
+            for i in range(rows)
+        )
+    )
+    cursor.executemany(
+        'INSERT INTO power_events (event_type, timestamp, details, synced) VALUES (?, ?, ?, ?)',
+        (
+            ('WAKE', start + timedelta(seconds=60 * i), '', int(i < unsynced_from))
+            for i in range(rows // 10)
+        )
+    )
+    connection.commit()
+
+def time_query(connection, sql, repeat=20):
+    """Median latency in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        connection.execute(sql).fetchall()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+def index_names():
+    """Index names created by the schema migrations"""
+    names = []
+    for _, statements in SCHEMA_MIGRATIONS:
+        for statement in statements:
+            if 'CREATE INDEX' in statement:
+                names.append(statement.split('EXISTS ')[1].split(' ON')[0])
+    return names
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark agent SQLite indexes')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    tmp_dir = Path(tempfile.mkdtemp(prefix='devmon_bench_'))
+
+    print(f"\n{'='*80}")
+    print(f"{'Rows':>9} | {'Query':<16} | {'No index (ms)':>14} | {'Indexed (ms)':>13} | {'Speedup':>8}")
+    print("-" * 80)
+
+    for size in args.sizes:
+        db_path = tmp_dir / f'bench_{size}.db'
+        LocalDatabase(str(db_path)).close()
+
+        connection = sqlite3.connect(db_path)
+        populate(connection, size)
+
+        # Baseline: the pre-migration schema
+        for name in index_names():
+            connection.execute(f'DROP INDEX IF EXISTS {name}')
+        connection.execute('ANALYZE')
+        before = {label: time_query(connection, sql) for label, sql in QUERIES.items()}
+
+        # Re-run migrations from scratch to rebuild the indexes
+        connection.execute('PRAGMA user_version = 0')
+        connection.commit()
+        connection.close()
+        LocalDatabase(str(db_path)).close()
+
+        connection = sqlite3.connect(db_path)
+        connection.execute('ANALYZE')
+        for label, sql in QUERIES.items():
+            after = time_query(connection, sql)
+            print(f"{size:>9} | {label:<16} | {before[label]:>14.3f} | {after:>13.3f} | {before[label] / after:>7.1f}x")
+        connection.close()
+
+    print(f"{'='*80}\n")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Benchmark read API response size and latency for a large fleet
+Compares full listings against cursor pages and fields= projections
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+from datetime import datetime, timedelta
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+# Point the server at a throwaway database before importing its config
+_tmp_dir = tempfile.mkdtemp(prefix='devmon_bench_')
+os.environ['DATABASE_TYPE'] = 'sqlite'
+os.environ['DATABASE_PATH'] = str(Path(_tmp_dir) / 'bench.db')
+os.environ['RETENTION_ENABLED'] = 'False'
+
+from server.app import create_app
+from server.models.database import db, Device, SystemStat
+
+def seed(devices, stats_per_device):
+    """Insert a fleet of devices and one busy device's stat history"""
+    start = datetime(2024, 1, 1)
+    db.session.execute(Device.__table__.insert(), [
+        {
+            'device_id': f'bench-device-{i}',
+            'hostname': f'host-{i}.example.internal',
+            'platform': 'Linux',
+            'platform_version': '6.1.0-generic',
+            'last_seen': start + timedelta(seconds=i),
+            'is_active': True,
+            'created_at': start
+        }
+        for i in range(devices)
+    ])
+    db.session.execute(SystemStat.__table__.insert(), [
+        {
+            'device_id': 1,
+            'timestamp': start + timedelta(seconds=10 * i),
+            'cpu_percent': (i * 7) % 100 + 0.5,
+            'memory_percent': (i * 3) % 100 + 0.25,
+            'disk_percent': 42.0,
+            'uptime': i,
+            'created_at': start
+        }
+        for i in range(stats_per_device)
+    ])
+    db.session.commit()
+
+def measure(client, url, repeat):
+    """Return (bytes, median ms, json) for a GET"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(url)
+        timings.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 200, (url, response.status_code)
+    timings.sort()
+    return len(response.data), timings[len(timings) // 2], response.get_json()
+
+def walk(client, url, key):
+    """Follow next_cursor to the end, returns (pages, rows, seconds)"""
+    pages = rows = 0
+    cursor = None
+    started = time.perf_counter()
+    while True:
+        data = client.get(url + (f'&before={cursor}' if cursor else '')).get_json()
+        pages += 1
+        rows += len(data[key])
+        cursor = data['next_cursor']
+        if not cursor:
+            return pages, rows, time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark paginated read APIs')
+    parser.add_argument('--devices', type=int, default=10000)
+    parser.add_argument('--stats', type=int, default=50000, help='Stat rows for the first device')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_app()
+
+    with app.app_context():
+        seed(args.devices, args.stats)
+    client = app.test_client()
+
+    cases = [
+        ('All devices (legacy)', '/api/v1/devices'),
+        ('Devices, page of 50', '/api/v1/devices?limit=50'),
+        ('Devices, page of 50, 4 fields', '/api/v1/devices?limit=50&fields=device_id,hostname,is_active,last_seen'),
+        ('Stats, 50 newest', '/api/v1/devices/bench-device-0/stats?limit=50'),
+        ('Stats, 500 newest', '/api/v1/devices/bench-device-0/stats?limit=500'),
+        ('Stats, 500 newest, 2 fields', '/api/v1/devices/bench-device-0/stats?limit=500&fields=timestamp,cpu_percent'),
+        ('Stats, 1h window', '/api/v1/devices/bench-device-0/stats?limit=1000&from=2024-01-01T01:00:00Z&to=2024-01-01T02:00:00Z'),
+    ]
+
+    print(f"\n{'='*80}")
+    print(f"📊 {args.devices:,} devices, {args.stats:,} stats on one device")
+    print(f"{'='*80}")
+    print(f"{'Request':<32} | {'Rows':>6} | {'Bytes':>11} | {'Median ms':>10}")
+    print("-" * 80)
+
+    for label, url in cases:
+        size, ms, data = measure(client, url, args.repeat)
+        rows = len(data.get('devices', data.get('stats', [])))
+        print(f"{label:<32} | {rows:>6} | {size:>11,} | {ms:>10.2f}")
+
+    print("-" * 80)
+    for label, url, key in (
+        ('Walk devices by 500', '/api/v1/devices?limit=500&fields=device_id,last_seen', 'devices'),
+        ('Walk stats by 1000', '/api/v1/devices/bench-device-0/stats?limit=1000&fields=timestamp,cpu_percent', 'stats'),
+    ):
+        pages, rows, seconds = walk(client, url, key)
+        print(f"{label:<32} | {rows:>6} rows in {pages} pages, {seconds * 1000 / pages:.2f} ms/page")
+
+    print(f"{'='*80}\n")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark screenshot capture and encoding per resolution and profile
+For synthetic desktop frames at common resolutions, measures the compare +
+downscale + JPEG encode time and size of each profile, the peak memory it
+adds when done inside the agent process (the old path), and what the agent
+and the worker process use when it's done in the CaptureWorker instead
+"""
+
+import sys
+import time
+import argparse
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import psutil
+
+# Add the project root (and this directory, for the synthetic frames) to Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+sys.path.append(str(Path(__file__).parent))
+
+from agent.monitors.frame_diff import FrameComparator
+from agent.monitors.capture_worker import PROFILES, CaptureWorker, capture, peak_rss_kb
+from benchmark_screenshot_diff import desktop_frame
+
+RESOLUTIONS = [(1366, 768), (1920, 1080), (2560, 1440), (3840, 2160)]
+
+def comparator_settings():
+    """FrameComparator keyword arguments, as CaptureWorker sends them"""
+    comparator = FrameComparator()
+    return {
+        'size': comparator.size,
+        'pixel_threshold': comparator.pixel_threshold,
+        'change_threshold': comparator.change_threshold
+    }
+
+def in_process_case(width, height, profile_name, repeat):
+    """
+    Run in a fresh process: capture like the old in-agent path
+    :return: (median ms excluding the synthetic grab, JPEG bytes, encoded size, peak RSS added in KB)
+    """
+    source = functools.partial(desktop_frame, width, height)
+    baseline = peak_rss_kb()
+    timings = []
+    for _ in range(repeat):
+        result = capture(None, comparator_settings(), True, PROFILES[profile_name], source)
+        timings.append(result['total_ms'] - result['grab_ms'])
+    timings.sort()
+    return timings[len(timings) // 2], len(result['jpeg']), result['encoded_size'], peak_rss_kb() - baseline
+
+def worker_case(width, height, profile_name, repeat):
+    """
+    Capture through a CaptureWorker process from this process
+    :return: (first capture ms including the worker start, median ms after it,
+              worker peak RSS in KB, RSS this process gained in KB)
+    """
+    worker = CaptureWorker(profile=profile_name, recycle=0, source=functools.partial(desktop_frame, width, height))
+    rss_before = psutil.Process().memory_info().rss
+    timings = []
+    result = None
+    try:
+        for _ in range(repeat + 1):
+            comparator = FrameComparator()
+            started = time.perf_counter()
+            result = worker.capture(comparator, force=True)
+            timings.append((time.perf_counter() - started) * 1000 - result['grab_ms'])
+    finally:
+        worker.close()
+    rss_gained = (psutil.Process().memory_info().rss - rss_before) // 1024
+    steady = sorted(timings[1:])
+    return timings[0], steady[len(steady) // 2], result['peak_rss_kb'], rss_gained
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark screenshot capture and encoding')
+    parser.add_argument('--repeat', type=int, default=3, help='Captures per resolution and profile')
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context('spawn')
+
+    print(f"\n{'='*100}")
+    print(f"📸 Compare + downscale + JPEG encode per capture (median of {args.repeat}, synthetic grab excluded)")
+    print(f"{'='*100}")
+    print(f"{'Screen':<10} | {'Profile':<8} | {'Encoded':<10} | {'KB':>6} | {'In-agent ms':>11} | "
+          f"{'In-agent +RSS MB':>16} | {'Worker ms':>9} | {'Worker peak MB':>14} | {'Agent +MB':>9}")
+    print("-" * 100)
+    first_capture_ms = []
+    for width, height in RESOLUTIONS:
+        for profile_name in PROFILES:
+            # A fresh process per case, so the peak memory of one case doesn't hide the next
+            with ProcessPoolExecutor(1, mp_context=context) as pool:
+                encode_ms, jpeg_bytes, encoded_size, rss_added = pool.submit(
+                    in_process_case, width, height, profile_name, args.repeat
+                ).result()
+            first_ms, worker_ms, worker_peak, agent_gained = worker_case(width, height, profile_name, args.repeat)
+            first_capture_ms.append(first_ms - worker_ms)
+
+            print(f"{f'{width}x{height}':<10} | {profile_name:<8} | {f'{encoded_size[0]}x{encoded_size[1]}':<10} | "
+                  f"{jpeg_bytes / 1024:>6.0f} | {encode_ms:>11.0f} | {rss_added / 1024:>16.1f} | "
+                  f"{worker_ms:>9.0f} | {worker_peak / 1024:>14.1f} | {agent_gained / 1024:>9.1f}")
+    print(f"{'='*100}")
+    first_capture_ms.sort()
+    print(f"  Starting a worker adds ~{first_capture_ms[len(first_capture_ms) // 2]:.0f} ms to its first capture "
+          f"(amortized over SCREENSHOT_WORKER_RECYCLE captures)")
+    print(f"{'='*100}\n")
+
+if __name__ == '__main__':
+    main()
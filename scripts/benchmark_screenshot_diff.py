@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark the screenshot change detection against a full JPEG encode
+Times the thumbnail comparison and the RGB convert + optimized JPEG encode on
+synthetic desktop frames, checks which frames are treated as unchanged and
+estimates the CPU and upload bytes saved over a mostly idle session
+"""
+
+import io
+import sys
+import time
+import random
+import argparse
+from pathlib import Path
+
+from PIL import Image, ImageDraw
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from agent.monitors.frame_diff import FrameComparator
+
+def desktop_frame(width, height, seed=1, clock='12:00', window_x=200):
+    """A busy desktop-like RGBA frame: noisy wallpaper, a window with text lines, a taskbar clock"""
+    rng = random.Random(seed)
+    image = Image.new('RGBA', (width, height), (40, 70, 110, 255))
+    draw = ImageDraw.Draw(image)
+    for _ in range(400):
+        x, y = rng.randrange(width), rng.randrange(height)
+        draw.ellipse((x, y, x + rng.randrange(5, 60), y + rng.randrange(5, 60)),
+                     fill=(rng.randrange(256), rng.randrange(256), rng.randrange(256), 255))
+    draw.rectangle((window_x, 150, window_x + width // 2, 150 + height // 2), fill=(245, 245, 245, 255))
+    for line in range(30):
+        y = 170 + line * 16
+        draw.text((window_x + 20, y), ''.join(rng.choice('abcdefghij klmnop') for _ in range(70)), fill=(0, 0, 0, 255))
+    draw.rectangle((0, height - 40, width, height), fill=(20, 20, 20, 255))
+    draw.text((width - 60, height - 28), clock, fill=(255, 255, 255, 255))
+    return image
+
+def encode(image):
+    """The monitor's save path, to memory; returns the JPEG size in bytes"""
+    buffer = io.BytesIO()
+    image.convert('RGB').save(buffer, 'JPEG', quality=60, optimize=True)
+    return buffer.tell()
+
+def cpu_ms(function, *args, repeat=5):
+    """Median thread CPU time of a call in milliseconds, and its last result"""
+    samples = []
+    for _ in range(repeat):
+        started = time.thread_time()
+        result = function(*args)
+        samples.append((time.thread_time() - started) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2], result
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark screenshot change detection')
+    parser.add_argument('--width', type=int, default=1920)
+    parser.add_argument('--height', type=int, default=1080)
+    parser.add_argument('--captures', type=int, default=96, help='Captures in the simulated session')
+    parser.add_argument('--changes', type=int, default=8, help='Captures in the session where the screen changed')
+    parser.add_argument('--threshold', type=float, default=0.01, help='Changed share of the screen for a new frame')
+    args = parser.parse_args()
+
+    base = desktop_frame(args.width, args.height)
+    frames = {
+        'identical': desktop_frame(args.width, args.height),
+        'clock ticked': desktop_frame(args.width, args.height, clock='12:01'),
+        'window moved': desktop_frame(args.width, args.height, window_x=600),
+        'new wallpaper': desktop_frame(args.width, args.height, seed=2),
+    }
+
+    comparator = FrameComparator(change_threshold=args.threshold)
+    reference = comparator.fingerprint(base)
+    diff_ms, _ = cpu_ms(comparator.fingerprint, base)
+    encode_ms, jpeg_bytes = cpu_ms(encode, base)
+
+    print(f"\n{'='*80}")
+    print(f"🖼️  {args.width}x{args.height} frame: thumbnail diff {diff_ms:.1f} ms vs "
+          f"convert + JPEG encode {encode_ms:.1f} ms ({jpeg_bytes / 1024:.0f} KB)")
+    print(f"{'='*80}")
+    print(f"{'Frame':<14} | {'Changed':>8} | {'Decision':>9}")
+    print("-" * 80)
+    for label, frame in frames.items():
+        fraction = comparator.changed_fraction(reference, comparator.fingerprint(frame))
+        decision = 'skip' if fraction <= comparator.change_threshold else 'capture'
+        print(f"{label:<14} | {fraction:>8.2%} | {decision:>9}")
+
+    # Session estimate: every capture is compared, only changed ones are encoded and uploaded
+    skipped = args.captures - args.changes
+    before_cpu = args.captures * encode_ms
+    after_cpu = args.captures * diff_ms + args.changes * encode_ms
+    before_kb = args.captures * jpeg_bytes / 1024
+    after_kb = args.changes * jpeg_bytes / 1024
+
+    print(f"{'='*80}")
+    print(f"📉 Session of {args.captures} captures, {args.changes} with changes ({skipped} skipped):")
+    print(f"   CPU:    {before_cpu / 1000:.2f}s -> {after_cpu / 1000:.2f}s ({1 - after_cpu / before_cpu:.0%} saved)")
+    print(f"   Upload: {before_kb:,.0f} KB -> {after_kb:,.0f} KB ({1 - after_kb / before_kb:.0%} saved)")
+    print(f"{'='*80}\n")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark read-route serialization: ORM objects + to_dict + jsonify against
+raw column tuples + bulk timestamp formatting + orjson (and its stdlib fallback)
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+from datetime import datetime, timedelta
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+# Point the server at a throwaway database before importing its config
+_tmp_dir = tempfile.mkdtemp(prefix='devmon_bench_')
+os.environ['DATABASE_TYPE'] = 'sqlite'
+os.environ['DATABASE_PATH'] = str(Path(_tmp_dir) / 'bench.db')
+os.environ['RETENTION_ENABLED'] = 'False'
+
+from flask import jsonify
+from server.app import create_app
+from server.models.database import db, Device, SystemStat
+from server.api import serializers
+
+def seed(rows):
+    """One device with `rows` stats, uploaded in batches like an agent would"""
+    device = Device(device_id='bench-device', hostname='bench')
+    db.session.add(device)
+    db.session.flush()
+    start = datetime(2024, 1, 1)
+    db.session.execute(SystemStat.__table__.insert(), [
+        {
+            'device_id': device.id,
+            'timestamp': start + timedelta(seconds=10 * i, microseconds=i % 1000),
+            'cpu_percent': (i * 7) % 100 + 0.5,
+            'memory_percent': (i * 3) % 100 + 0.25,
+            'disk_percent': 42.0,
+            'uptime': i,
+            'created_at': start + timedelta(minutes=i // 500)
+        }
+        for i in range(rows)
+    ])
+    db.session.commit()
+    return device.id
+
+def orm_path(device_pk, limit):
+    """Original route body: ORM objects, to_dict per row, jsonify"""
+    stats = SystemStat.query.filter_by(device_id=device_pk)\
+        .order_by(SystemStat.timestamp.desc())\
+        .limit(limit)\
+        .all()
+    return jsonify({'stats': [stat.to_dict() for stat in stats]}).get_data()
+
+def tuple_path(device_pk, limit):
+    """Raw column tuples, bulk formatting, fast encoder"""
+    columns = list(SystemStat.__table__.c)
+    rows = db.session.execute(
+        db.select(*columns)
+        .where(SystemStat.device_id == device_pk)
+        .order_by(SystemStat.timestamp.desc())
+        .limit(limit)
+    ).all()
+    return serializers.json_response({'stats': serializers.rows_to_dicts(rows, columns)}).get_data()
+
+def rate(func, device_pk, limit, repeat):
+    """Best-of-repeat rows/sec and the body size"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = func(device_pk, limit)
+        best = min(best, time.perf_counter() - started)
+    return limit / best, len(body)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark read serialization paths')
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--limits', type=int, nargs='+', default=[50, 1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_app()
+
+    with app.app_context(), app.test_request_context():
+        device_pk = seed(args.rows)
+        orjson_module = serializers.orjson
+
+        print(f"\n{'='*80}")
+        print(f"{'Rows':>8} | {'to_dict rows/s':>15} | {'orjson rows/s':>14} | {'stdlib rows/s':>14} | {'Speedup':>8}")
+        print("-" * 80)
+
+        for limit in args.limits:
+            before, _ = rate(orm_path, device_pk, limit, args.repeat)
+
+            serializers.orjson = None
+            fallback, _ = rate(tuple_path, device_pk, limit, args.repeat)
+            serializers.orjson = orjson_module
+
+            if orjson_module is not None:
+                after, _ = rate(tuple_path, device_pk, limit, args.repeat)
+                fast = f"{after:>14,.0f}"
+            else:
+                after, fast = fallback, f"{'not installed':>14}"
+
+            print(f"{limit:>8} | {before:>15,.0f} | {fast} | {fallback:>14,.0f} | {after / before:>7.1f}x")
+
+        print(f"{'='*80}\n")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark on-agent pre-aggregation of system stats
+Replays a synthetic high-rate CPU/memory trace and compares storing and
+uploading every probe with storing one min/avg/max/p95 summary per window:
+rows, encoded upload bytes, and whether short spikes stay visible
+"""
+
+import sys
+import time
+import random
+import argparse
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from agent.sync import codec
+from agent.monitors.stats_aggregator import StatsAggregator
+
+def synthetic_trace(hours, probe_interval, spikes, seed=11):
+    """(seconds offset, cpu, memory) probes: idle noise with short CPU spikes"""
+    rng = random.Random(seed)
+    probes = []
+    spike_starts = sorted(rng.randrange(0, hours * 3600 - 60) for _ in range(spikes))
+    spike_windows = [(start, start + rng.randrange(6, 30)) for start in spike_starts]
+
+    t = 0
+    while t < hours * 3600:
+        cpu = max(0.0, rng.gauss(8, 3))
+        if any(start <= t < end for start, end in spike_windows):
+            cpu = min(100.0, rng.gauss(96, 2))
+        probes.append((t, round(cpu, 1), round(40 + rng.random() * 5, 1)))
+        t += probe_interval
+    return probes, spike_windows
+
+def raw_rows(probes, start):
+    """One system_stats row per probe, as recording every probe would store"""
+    return [
+        {'timestamp': (start + timedelta(seconds=t)).isoformat(), 'cpu_percent': cpu,
+         'memory_percent': memory, 'disk_percent': 61.0, 'uptime': 86400 + t}
+        for t, cpu, memory in probes
+    ]
+
+def aggregated_rows(probes, start, window):
+    """One summary row per window, and the CPU seconds spent folding the probes"""
+    aggregator = StatsAggregator(window)
+    rows = []
+    started = time.process_time()
+    for t, cpu, memory in probes:
+        summary = aggregator.add(float(t), cpu, memory)
+        if summary:
+            summary.update({'timestamp': (start + timedelta(seconds=t)).isoformat(),
+                            'disk_percent': 61.0, 'uptime': 86400 + t})
+            rows.append(summary)
+    return rows, time.process_time() - started
+
+def upload_bytes(rows, chunk_size=500):
+    """Columnar deflate bytes to upload the rows in sync-sized chunks"""
+    total = 0
+    for offset in range(0, len(rows), chunk_size):
+        envelope = {'system_stats': rows[offset:offset + chunk_size]}
+        total += len(codec.compress(codec.encode(envelope), 'deflate'))
+    return total
+
+def spikes_visible(rows, spike_windows, start, key, threshold=85.0, slack=0):
+    """Spikes with a stored row (or the window summary ending after them) over the threshold"""
+    times = [(datetime.fromisoformat(row['timestamp']) - start).total_seconds() for row in rows]
+    caught = 0
+    for spike_start, spike_end in spike_windows:
+        for t, row in zip(times, rows):
+            if t >= spike_start and (row.get(key) or 0) >= threshold:
+                if t <= spike_end + slack:
+                    caught += 1
+                break
+    return caught
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark on-agent pre-aggregation of system stats')
+    parser.add_argument('--hours', type=int, default=24, help='Length of the synthetic trace')
+    parser.add_argument('--probe-interval', type=int, default=2, help='Seconds between probes')
+    parser.add_argument('--window', type=int, default=60, help='Aggregation window in seconds')
+    parser.add_argument('--spikes', type=int, default=40, help='Short CPU spikes in the trace')
+    args = parser.parse_args()
+
+    start = datetime(2024, 1, 1)
+    probes, spike_windows = synthetic_trace(args.hours, args.probe_interval, args.spikes)
+    raw = raw_rows(probes, start)
+    summaries, fold_seconds = aggregated_rows(probes, start, args.window)
+
+    raw_bytes = upload_bytes(raw)
+    summary_bytes = upload_bytes(summaries)
+
+    print(f"\n{'='*80}")
+    print(f"📊 {args.hours}h trace, a probe every {args.probe_interval}s, {args.spikes} short spikes")
+    print(f"{'='*80}")
+    print(f"{'Stored':<22} | {'Rows':>8} | {'Upload KB':>10} | {'Spikes visible':>14}")
+    print("-" * 80)
+    print(f"{'every probe':<22} | {len(raw):>8,} | {raw_bytes / 1024:>10,.1f} | "
+          f"{spikes_visible(raw, spike_windows, start, 'cpu_percent'):>6} / {len(spike_windows):<5}")
+    print(f"{f'{args.window}s summaries (max)':<22} | {len(summaries):>8,} | {summary_bytes / 1024:>10,.1f} | "
+          f"{spikes_visible(summaries, spike_windows, start, 'cpu_max', slack=args.window):>6} / {len(spike_windows):<5}")
+    print(f"{f'{args.window}s summaries (avg)':<22} | {'':>8} | {'':>10} | "
+          f"{spikes_visible(summaries, spike_windows, start, 'cpu_percent', slack=args.window):>6} / {len(spike_windows):<5}")
+    print(f"{'='*80}")
+    print(f"  Rows: {len(summaries) / len(raw):.1%} of raw, upload: {summary_bytes / raw_bytes:.1%} of raw")
+    print(f"  Folding {len(probes):,} probes took {fold_seconds * 1000:.1f} ms CPU "
+          f"({fold_seconds / len(probes) * 1e6:.2f} µs per probe)")
+    print(f"{'='*80}\n")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Benchmark agent sync against a local Flask stand-in server
+Compares one-connection-per-request calls with the pooled keep-alive session
+and reports sync latency and TCP connections opened per cycle
+"""
+
+import sys
+import time
+import logging
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+
+import requests
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from flask import Flask, request, jsonify
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from agent.database.local_db import LocalDatabase
+from agent.sync.server_sync import ServerSync
+
+class ConnectionCounter:
+    """Counts TCP connections accepted by the stand-in server"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.count = 0
+
+    def record(self):
+        with self.lock:
+            self.count += 1
+
+    def reset(self):
+        with self.lock:
+            count = self.count
+            self.count = 0
+            return count
+
+def create_stand_in():
+    """Minimal Flask app exposing the routes ServerSync calls"""
+    app = Flask(__name__)
+
+    @app.route('/api/v1/health')
+    def health():
+        return jsonify({'status': 'healthy'})
+
+    @app.route('/api/v1/devices/register', methods=['POST'])
+    def register():
+        return jsonify({'message': 'ok'})
+
+    @app.route('/api/v1/devices/<device_id>/<kind>', methods=['POST'])
+    def ingest(device_id, kind):
+        request.get_data()
+        return jsonify({'message': 'ok'})
+
+    return app
+
+def create_server(app, counter):
+    """
+    HTTP/1.1 front for the Flask app
+    The Werkzeug dev server always sends "Connection: close", which would hide
+    any benefit of client-side keep-alive, so requests are dispatched through
+    the app's test client from a keep-alive capable handler instead
+    """
+    client = app.test_client()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True  # headers and body go out in separate writes
+
+        def setup(self):
+            counter.record()  # one handler instance per accepted connection
+            super().setup()
+
+        def _dispatch(self):
+            length = int(self.headers.get('Content-Length', 0))
+            body = self.rfile.read(length) if length else None
+            response = client.open(self.path, method=self.command,
+                                   headers=dict(self.headers), data=body)
+            data = response.get_data()
+            self.send_response(response.status_code)
+            self.send_header('Content-Type', response.content_type)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        do_GET = do_POST = _dispatch
+
+        def log_message(self, *args):
+            pass
+
+    return ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+
+class OneShotSession:
+    """Stand-in for the old module-level requests.post/get calls"""
+
+    def __init__(self, api_key):
+        self.headers = {'X-API-Key': api_key}
+
+    def get(self, url, **kwargs):
+        return requests.get(url, headers=self.headers, **kwargs)
+
+    def post(self, url, **kwargs):
+        return requests.post(url, headers=self.headers, **kwargs)
+
+    def close(self):
+        pass
+
+def run_cycles(sync, db, counter, cycles, rows):
+    """Run sync cycles with fresh local data, return (avg latency ms, connections per cycle)"""
+    latencies = []
+    connections = []
+
+    for _ in range(cycles):
+        for i in range(rows):
+            db.log_system_stats(10.0, 20.0, 30.0, i)
+        db.log_power_event('WAKE', 'benchmark')
+
+        counter.reset()
+        start = time.perf_counter()
+        # One full cycle: register, one batch post per chunk and a health check
+        sync.register_device()
+        sync.sync_batch()
+        sync.test_connection()
+        latencies.append((time.perf_counter() - start) * 1000)
+        connections.append(counter.reset())
+
+    return sum(latencies) / len(latencies), sum(connections) / len(connections)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark agent sync connection reuse')
+    parser.add_argument('--cycles', type=int, default=50)
+    parser.add_argument('--rows', type=int, default=20, help='System stats logged per cycle')
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+
+    counter = ConnectionCounter()
+    server = create_server(create_stand_in(), counter)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    server_url = f'http://127.0.0.1:{server.server_port}'
+
+    tmp_dir = Path(tempfile.mkdtemp(prefix='devmon_bench_'))
+
+    print(f"\n{'='*80}")
+    print(f"{'Mode':<20} | {'Cycles':>6} | {'Avg cycle (ms)':>14} | {'Connections/cycle':>17}")
+    print("-" * 80)
+
+    for mode in ('per-request', 'pooled session'):
+        db = LocalDatabase(str(tmp_dir / f'{mode.replace(" ", "_")}.db'))
+        sync = ServerSync(db, server_url, 'bench-key', 'bench-device')
+        if mode == 'per-request':
+            sync.session.close()
+            sync.session = OneShotSession(sync.api_key)
+
+        latency, conns = run_cycles(sync, db, counter, args.cycles, args.rows)
+        print(f"{mode:<20} | {args.cycles:>6} | {latency:>14.2f} | {conns:>17.1f}")
+
+        sync.close()
+        db.close()
+
+    print(f"{'='*80}\n")
+    server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark sync wire formats: JSON vs compact columnar (deflate / zstd)
+Reports bytes on the wire, agent encode time and server decode time
+"""
+
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+from datetime import datetime, timedelta
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from agent.sync import codec as agent_codec
+from server.api import codec as server_codec
+from server.api.ingest import parse_timestamps
+
+def make_envelope(size):
+    """Build an offline-backlog shaped envelope with `size` stats and events"""
+    start = datetime(2024, 1, 1, 9, 0, 0)
+    return {
+        'power_events': [
+            {
+                'event_type': 'WAKE' if i % 2 else 'SLEEP',
+                'timestamp': str(start + timedelta(seconds=60 * i, microseconds=1000 * (i % 1000))),
+                'details': f'Duration: {i} seconds'
+            }
+            for i in range(size // 10)
+        ],
+        'session_events': [],
+        'system_stats': [
+            {
+                'timestamp': str(start + timedelta(seconds=300 * i)),
+                'cpu_percent': round((i * 7.3) % 100, 1),
+                'memory_percent': round(40 + (i * 1.7) % 30, 1),
+                'disk_percent': 63.2,
+                'uptime': 300 * i
+            }
+            for i in range(size)
+        ]
+    }
+
+def decode_json(body):
+    """Server-side JSON decode including timestamp parsing, for a fair comparison"""
+    envelope = json.loads(body)
+    for table, column in (('power_events', 'timestamp'), ('system_stats', 'timestamp')):
+        parse_timestamps(row[column] for row in envelope[table])
+    return envelope
+
+def timed(func, *args, repeat=3):
+    """Best-of-N wall time in milliseconds"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return result, best * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark sync wire formats')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='System stats rows per envelope (power events are 10%%)')
+    args = parser.parse_args()
+
+    print(f"\n{'='*90}")
+    print(f"{'Rows':>8} | {'Format':<18} | {'Wire bytes':>12} | {'Ratio':>6} | {'Encode ms':>10} | {'Decode ms':>10}")
+    print("-" * 90)
+
+    for size in args.sizes:
+        envelope = make_envelope(size)
+
+        body, encode_ms = timed(lambda e: json.dumps(e).encode('utf-8'), envelope)
+        json_bytes = len(body)
+        _, decode_ms = timed(decode_json, body)
+        print(f"{size:>8} | {'json':<18} | {json_bytes:>12,} | {1.0:>6.1f} | {encode_ms:>10.1f} | {decode_ms:>10.1f}")
+
+        for encoding in agent_codec.supported_encodings():
+            body, encode_ms = timed(
+                lambda e: agent_codec.compress(agent_codec.encode(e), encoding), envelope
+            )
+            _, decode_ms = timed(server_codec.decode, body, encoding)
+            ratio = json_bytes / len(body)
+            label = f'columnar+{encoding}'
+            print(f"{size:>8} | {label:<18} | {len(body):>12,} | {ratio:>6.1f} | {encode_ms:>10.1f} | {decode_ms:>10.1f}")
+
+    print(f"{'='*90}\n")
+
+if __name__ == '__main__':
+    main()
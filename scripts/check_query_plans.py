@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Query-plan regression check for the server read routes, screenshot pruning
+and retention compaction
+Calls each hot route through the Flask test client (and runs one compaction
+pass), captures the SQL it runs and fails if SQLite plans any of it as a full
+table scan
+"""
+
+import io
+import os
+import sys
+import tempfile
+from pathlib import Path
+from datetime import datetime, timedelta
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+# Point the server at a throwaway database before importing its config
+_tmp_dir = tempfile.mkdtemp(prefix='devmon_plans_')
+os.environ['DATABASE_TYPE'] = 'sqlite'
+os.environ['DATABASE_PATH'] = str(Path(_tmp_dir) / 'plans.db')
+os.environ['RETENTION_ENABLED'] = 'False'
+os.environ['SCREENSHOT_STORE_PATH'] = str(Path(_tmp_dir) / 'screenshot_store')
+
+from sqlalchemy import event
+from server.app import create_app
+from server.models.database import db, Device, PowerEvent, SystemStat, MetricSample, Screenshot
+from server.api.retention import Compactor
+
+# Route -> tables whose access must go through an index
+ROUTES = {
+    '/api/v1/devices': ['devices'],
+    '/api/v1/devices?limit=20&fields=device_id,last_seen': ['devices'],
+    '/api/v1/devices/plan-device-1/stats?limit=50': ['system_stats'],
+    '/api/v1/devices/plan-device-1/stats?limit=50&from=2024-01-01T01:00:00Z&to=2024-01-01T02:00:00Z': ['system_stats'],
+    '/api/v1/devices/plan-device-1/power_events?limit=50': ['power_events'],
+    '/api/v1/devices/plan-device-1/screenshots': ['screenshots'],
+    '/api/v1/devices/plan-device-1/metric_samples?limit=200': ['metric_samples'],
+    '/api/v1/devices/plan-device-1/metric_samples?metric=fs.percent&label=/': ['metric_samples'],
+}
+
+# Upload route -> tables whose access must go through an index (the prune delete)
+UPLOAD_ROUTES = {
+    '/api/v1/devices/plan-device-1/screenshots': ['screenshots'],
+}
+
+# Tables the compactor's batch selects and deletes must reach through an index
+COMPACTED_TABLES = ['system_stats', 'power_events', 'session_events', 'metric_samples', 'system_stat_rollups']
+
+# Keeps nothing older than a day, so every table has rows past its horizon
+COMPACTION_POLICY = {
+    'system_stats': 1, 'power_events': 1, 'session_events': 1, 'metric_samples': 1,
+    'rollup_1m': 1, 'rollup_1h': 1, 'rollup_1d': 1
+}
+
+def seed(devices=50, rows=200):
+    """Create enough rows that the planner has a real choice"""
+    start = datetime(2024, 1, 1)
+    for d in range(devices):
+        device = Device(device_id=f'plan-device-{d}', hostname=f'host-{d}',
+                        last_seen=start + timedelta(minutes=d))
+        db.session.add(device)
+        db.session.flush()
+        db.session.execute(SystemStat.__table__.insert(), [
+            {'device_id': device.id, 'timestamp': start + timedelta(minutes=i), 'cpu_percent': 1.0}
+            for i in range(rows)
+        ])
+        db.session.execute(PowerEvent.__table__.insert(), [
+            {'device_id': device.id, 'timestamp': start + timedelta(minutes=i), 'event_type': 'WAKE'}
+            for i in range(rows)
+        ])
+        db.session.execute(MetricSample.__table__.insert(), [
+            {'device_id': device.id, 'timestamp': start + timedelta(minutes=i), 'metric': metric, 'label': label,
+             'value': 1.0}
+            for i in range(rows // 4)
+            for metric, label in (('cpu.core', '0'), ('cpu.core', '1'), ('fs.percent', '/'), ('net.rx_bps', ''))
+        ])
+        db.session.execute(Screenshot.__table__.insert(), [
+            {'device_id': device.id, 'timestamp': start + timedelta(minutes=i), 'filename': f'{d}-{i}.jpg'}
+            for i in range(5)
+        ])
+    db.session.commit()
+    db.session.execute(db.text('ANALYZE'))
+
+def check_plans(label, tables, queries, failures):
+    """Explain each captured query, recording full scans of the given tables"""
+    with db.engine.connect() as connection:
+        for statement, parameters in queries:
+            plan = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).fetchall()
+            details = [row[-1] for row in plan]
+            for table in tables:
+                scans = [d for d in details if d.startswith(f'SCAN {table}') and 'INDEX' not in d]
+                if scans:
+                    failures.append(f"{label}: {scans[0]}\n    {statement.strip()}")
+            print(f"  {label}\n    " + "\n    ".join(details))
+
+def main():
+    app = create_app()
+    failures = []
+
+    with app.app_context():
+        seed()
+
+        captured = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith(('SELECT', 'DELETE')):
+                captured.append((statement, parameters))
+
+        event.listen(db.engine, 'before_cursor_execute', capture)
+        client = app.test_client()
+
+        requests = [(route, tables, lambda route=route: client.get(route)) for route, tables in ROUTES.items()]
+        requests += [
+            (route, tables, lambda route=route: client.post(
+                route, data={'file': (io.BytesIO(b'plan'), 'plan.jpg')},
+                headers={'X-API-Key': os.getenv('API_KEY', 'dev-key-123')}, content_type='multipart/form-data'
+            ))
+            for route, tables in UPLOAD_ROUTES.items()
+        ]
+
+        for route, tables, send in requests:
+            captured.clear()
+            response = send()
+            if response.status_code != 200:
+                failures.append(f"{route}: HTTP {response.status_code}")
+                continue
+
+            check_plans(route, tables, list(captured), failures)
+
+        # One compaction pass, capturing its batch selects and deletes
+        captured.clear()
+        Compactor(app, COMPACTION_POLICY, batch_size=1000).run_once()
+        queries = [
+            (statement, parameters) for statement, parameters in captured
+            if any(table in statement for table in COMPACTED_TABLES)
+        ]
+        event.remove(db.engine, 'before_cursor_execute', capture)
+        if not queries:
+            failures.append("compaction: no batch queries captured")
+        check_plans('compaction', COMPACTED_TABLES, queries, failures)
+
+    print(f"\n{'='*80}")
+    if failures:
+        print("❌ Full table scans found:")
+        for failure in failures:
+            print(f"  {failure}")
+        print(f"{'='*80}\n")
+        sys.exit(1)
+
+    print("✅ All hot read routes, the screenshot prune and compaction use index scans")
+    print(f"{'='*80}\n")
+
+if __name__ == '__main__':
+    main()
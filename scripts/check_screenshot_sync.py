@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Check that agent screenshot sync sends each screenshot at most once
+Runs the server on a local port with a middleware counting request bytes,
+drives ServerSync.sync_screenshots for several cycles (adding a screenshot
+midway and losing the agent's sync state once) and compares the bytes sent
+with re-uploading every retained screenshot each cycle
+"""
+
+import os
+import sys
+import random
+import logging
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+
+from PIL import Image
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+# Point the server at a throwaway database and store before importing its config
+_tmp_dir = Path(tempfile.mkdtemp(prefix='devmon_shots_'))
+os.environ['DATABASE_TYPE'] = 'sqlite'
+os.environ['DATABASE_PATH'] = str(_tmp_dir / 'server.db')
+os.environ['SCREENSHOT_STORE_PATH'] = str(_tmp_dir / 'screenshot_store')
+os.environ['RETENTION_ENABLED'] = 'False'
+
+from werkzeug.serving import make_server
+from server.app import create_app
+from agent.database.local_db import LocalDatabase
+from agent.sync.server_sync import ServerSync
+
+API_KEY = os.getenv('API_KEY', 'dev-key-123')
+
+class ByteCounter:
+    """WSGI middleware counting the request bodies sent to the screenshot upload route"""
+
+    def __init__(self, app):
+        self.app = app
+        self.offers = 0
+        self.uploads = 0
+        self.bytes = 0
+
+    def __call__(self, environ, start_response):
+        if environ['REQUEST_METHOD'] == 'POST' and environ['PATH_INFO'].endswith('/screenshots'):
+            self.bytes += int(environ.get('CONTENT_LENGTH') or 0)
+            if environ.get('CONTENT_TYPE', '').startswith('multipart/'):
+                self.uploads += 1
+            else:
+                self.offers += 1
+        return self.app(environ, start_response)
+
+def add_screenshot(database, directory, index):
+    """Write a noisy JPEG (so it doesn't compress away) and log it like the monitor does"""
+    rng = random.Random(index)
+    image = Image.frombytes('RGB', (320, 200), bytes(rng.randrange(256) for _ in range(320 * 200 * 3)))
+    filepath = directory / f'screenshot_{index:04d}.jpg'
+    image.save(filepath, 'JPEG', quality=60)
+    database.log_screenshot(filepath.name, str(filepath), filepath.stat().st_size / 1024)
+    return filepath.stat().st_size
+
+def main():
+    parser = argparse.ArgumentParser(description='Check that screenshots are uploaded at most once')
+    parser.add_argument('--cycles', type=int, default=10, help='Sync cycles to run')
+    parser.add_argument('--port', type=int, default=5098)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+
+    counter = ByteCounter(create_app())
+    server = make_server('127.0.0.1', args.port, counter, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    shots_dir = _tmp_dir / 'agent_screenshots'
+    shots_dir.mkdir()
+    database = LocalDatabase(str(_tmp_dir / 'agent.db'))
+    sync = ServerSync(database, f'http://127.0.0.1:{args.port}', API_KEY, 'shot-device')
+    sync.register_device()
+
+    sizes = [add_screenshot(database, shots_dir, i) for i in range(3)]
+    naive_bytes = 0
+
+    try:
+        for cycle in range(args.cycles):
+            if cycle == args.cycles // 2:
+                # A new capture, and an agent that lost its sync state (e.g. restored database)
+                sizes.append(add_screenshot(database, shots_dir, cycle + 100))
+                database._write('UPDATE screenshots SET synced = 0', wait=True)
+
+            # What the old sync sent: every retained file, every cycle
+            naive_bytes += sum(Path(row['filepath']).stat().st_size for row in database.get_screenshots())
+            sync.sync_screenshots()
+    finally:
+        server.shutdown()
+        database.close()
+        sync.close()
+
+    unique_bytes = sum(sizes)
+    print(f"\n{'='*80}")
+    print(f"📸 {len(sizes)} screenshots, {args.cycles} sync cycles")
+    print(f"{'='*80}")
+    print(f"  Re-upload every cycle (old):  {naive_bytes / 1024:>9,.1f} KB")
+    print(f"  Sent on the wire (new):       {counter.bytes / 1024:>9,.1f} KB "
+          f"({counter.uploads} uploads, {counter.offers} hash offers)")
+    print(f"  Screenshot file bytes:        {unique_bytes / 1024:>9,.1f} KB "
+          f"(agent counted {sync.screenshot_bytes_uploaded / 1024:,.1f} KB)")
+    print(f"{'='*80}")
+
+    if counter.uploads != len(sizes) or sync.screenshot_bytes_uploaded != unique_bytes:
+        print("❌ Some screenshots were uploaded more than once (or not at all)")
+        print(f"{'='*80}\n")
+        sys.exit(1)
+
+    print("✅ Every screenshot was uploaded exactly once")
+    print(f"{'='*80}\n")
+
+if __name__ == '__main__':
+    main()
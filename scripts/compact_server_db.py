@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Run one retention/compaction pass on the server database and print the report
+"""
+
+import os
+import sys
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+# This script runs the pass itself; don't also start the background compactor
+os.environ['RETENTION_ENABLED'] = 'False'
+
+from server.app import create_app
+from server.config.settings import config
+from server.api.retention import Compactor
+
+def main():
+    app = create_app()
+    compactor = Compactor(app, config.RETENTION_POLICY, batch_size=config.COMPACTION_BATCH_SIZE)
+
+    with app.app_context():
+        report = compactor.run_once()
+
+    print(f"\n{'='*60}")
+    print("🧹 COMPACTION REPORT")
+    print(f"{'='*60}")
+    for table, rows in report['rows_deleted'].items():
+        print(f"  {table:<16} {rows:>10,} rows deleted")
+    print("-" * 60)
+    print(f"  {'Total':<16} {report['total_rows']:>10,} rows")
+    if report['bytes_reclaimed'] is not None:
+        print(f"  {'Reclaimed':<16} {report['bytes_reclaimed']:>10,} bytes")
+    print(f"  {'Duration':<16} {report['seconds']:>10} s")
+    print(f"{'='*60}\n")
+
+if __name__ == '__main__':
+    main()
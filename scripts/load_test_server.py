@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Load test the production server against the ingest endpoints
+Starts server/serve.py with each worker count in turn and reports
+requests/sec and latency for concurrent system_stats uploads
+"""
+
+import os
+import sys
+import time
+import signal
+import argparse
+import tempfile
+import threading
+import subprocess
+import multiprocessing
+from pathlib import Path
+from datetime import datetime
+
+import requests
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+API_KEY = os.getenv('API_KEY', 'dev-key-123')
+
+def start_server(workers, threads, port, tmp_dir):
+    """Launch serve.py on a fresh SQLite database and wait until it answers"""
+    env = dict(os.environ)
+    env.update({
+        'API_KEY': API_KEY,
+        'RETENTION_ENABLED': 'False',
+        'COMPACTION_LOCK_FILE': str(Path(tmp_dir) / 'compactor.lock')
+    })
+    if env.get('DATABASE_TYPE', 'sqlite') == 'sqlite':
+        env['DATABASE_PATH'] = str(Path(tmp_dir) / f'load_{workers}.db')
+
+    process = subprocess.Popen(
+        [sys.executable, str(project_root / 'server' / 'serve.py'),
+         '--workers', str(workers), '--threads', str(threads), '--bind', f'127.0.0.1:{port}'],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+    base_url = f'http://127.0.0.1:{port}/api/v1'
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if requests.get(f'{base_url}/health', timeout=1).status_code == 200:
+                return process, base_url
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.2)
+
+    process.kill()
+    raise RuntimeError(f'Server with {workers} workers did not start')
+
+def client_process(base_url, device_ids, threads, duration, batch_size, results):
+    """One load generating process: `threads` keep-alive clients posting in a loop"""
+    stop_at = time.perf_counter() + duration
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def worker(device_id):
+        session = requests.Session()
+        session.headers['X-API-Key'] = API_KEY
+        url = f'{base_url}/devices/{device_id}/system_stats'
+        local = []
+        failed = 0
+        while time.perf_counter() < stop_at:
+            payload = {'stats': [
+                {
+                    'timestamp': datetime.utcnow().isoformat(),
+                    'cpu_percent': 12.5,
+                    'memory_percent': 40.0,
+                    'disk_percent': 55.0,
+                    'uptime': i
+                }
+                for i in range(batch_size)
+            ]}
+            started = time.perf_counter()
+            try:
+                ok = session.post(url, json=payload, timeout=30).status_code == 200
+            except requests.exceptions.RequestException:
+                ok = False
+            if ok:
+                local.append(time.perf_counter() - started)
+            else:
+                failed += 1
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    pool = [threading.Thread(target=worker, args=(device_ids[i % len(device_ids)],)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+
+    results.put((latencies, errors[0]))
+
+def run_load(base_url, clients, threads, duration, batch_size, devices):
+    """Drive the server from several processes so the client isn't the bottleneck"""
+    device_ids = [f'load-device-{i}' for i in range(devices)]
+    for device_id in device_ids:
+        requests.post(f'{base_url}/devices/register', json={'device_id': device_id, 'hostname': device_id},
+                      headers={'X-API-Key': API_KEY}, timeout=10)
+
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(
+            target=client_process,
+            args=(base_url, device_ids[i::clients] or device_ids, threads, duration, batch_size, results)
+        )
+        for i in range(clients)
+    ]
+    for process in processes:
+        process.start()
+
+    latencies, errors = [], 0
+    for _ in processes:
+        chunk, failed = results.get()
+        latencies.extend(chunk)
+        errors += failed
+    for process in processes:
+        process.join()
+
+    latencies.sort()
+    return latencies, errors
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the server ingest endpoints')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--threads', type=int, default=8, help='Threads per server worker')
+    parser.add_argument('--clients', type=int, default=4, help='Load generating processes')
+    parser.add_argument('--client-threads', type=int, default=8, help='Concurrent connections per client process')
+    parser.add_argument('--duration', type=int, default=10, help='Seconds per run')
+    parser.add_argument('--batch-size', type=int, default=10, help='Stats per request')
+    parser.add_argument('--devices', type=int, default=32)
+    parser.add_argument('--port', type=int, default=5099)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix='devmon_load_')
+
+    print(f"\n{'='*80}")
+    print(f"🔥 {args.clients}x{args.client_threads} connections, {args.batch_size} stats/request, {args.duration}s per run")
+    print(f"{'='*80}")
+    print(f"{'Workers':>7} | {'Requests/s':>11} | {'Rows/s':>10} | {'p50 ms':>8} | {'p95 ms':>8} | {'Errors':>6}")
+    print("-" * 80)
+
+    for workers in args.workers:
+        process, base_url = start_server(workers, args.threads, args.port, tmp_dir)
+        try:
+            latencies, errors = run_load(
+                base_url, args.clients, args.client_threads, args.duration, args.batch_size, args.devices
+            )
+        finally:
+            process.send_signal(signal.SIGTERM)
+            process.wait(timeout=30)
+
+        rate = len(latencies) / args.duration
+        p50 = latencies[len(latencies) // 2] * 1000 if latencies else 0
+        p95 = latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0
+        print(f"{workers:>7} | {rate:>11,.0f} | {rate * args.batch_size:>10,.0f} | {p50:>8.1f} | {p95:>8.1f} | {errors:>6}")
+
+    print(f"{'='*80}\n")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Rebuild system stat rollups (1m/1h/1d) from raw stats
+Run once after upgrading a server database that predates the rollup tables.
+Rollups older than the oldest remaining raw stat are kept, not rebuilt
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from server.app import create_app
+from server.models.database import db, Device
+from server.api.rollups import rebuild_rollups
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild system stat rollups')
+    parser.add_argument('--device', help='Only rebuild this device_id')
+    args = parser.parse_args()
+
+    app = create_app()
+
+    with app.app_context():
+        query = Device.query
+        if args.device:
+            query = query.filter_by(device_id=args.device)
+
+        devices = query.all()
+        if not devices:
+            print("❌ No matching devices found")
+            return
+
+        for device in devices:
+            starts = rebuild_rollups(device.id)
+            db.session.commit()
+            if starts is None:
+                print(f"⏭️  No raw stats for {device.device_id}, rollups kept")
+                continue
+            print(f"✅ Rebuilt rollups for {device.device_id} from {starts['1d'].date()}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+List dead letters in the ingest spool (queued ingest mode) and optionally requeue them
+Dead letters are accepted uploads that failed max_attempts times because of their
+content; requeue them once whatever rejected them is fixed
+"""
+
+import sys
+import argparse
+from datetime import datetime
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from server.config.settings import config
+from server.api.spool import IngestSpool
+
+def main():
+    parser = argparse.ArgumentParser(description='List or requeue dead letters in the ingest spool')
+    parser.add_argument('--spool', default=config.INGEST_SPOOL_PATH, help='Spool file')
+    parser.add_argument('--requeue', action='store_true', help='Requeue the dead letters')
+    parser.add_argument('--ids', type=int, nargs='+', help='Only these spool ids (default: all)')
+    parser.add_argument('--limit', type=int, default=100, help='Dead letters listed')
+    args = parser.parse_args()
+
+    if not Path(args.spool).exists():
+        print(f"❌ No ingest spool at {args.spool}")
+        sys.exit(1)
+
+    spool = IngestSpool(
+        args.spool, config.INGEST_LEASE_SECONDS, config.INGEST_MAX_ATTEMPTS,
+        config.INGEST_RETRY_BACKOFF, config.INGEST_MAX_BACKOFF
+    )
+    letters = spool.dead_letters(args.limit)
+    if args.ids:
+        letters = [letter for letter in letters if letter['id'] in args.ids]
+
+    print(f"\n{'='*100}")
+    print(f"📮 DEAD LETTERS ({spool.stats()['dead_letters']} in {args.spool})")
+    print(f"{'='*100}")
+    for letter in letters:
+        received = datetime.fromtimestamp(letter['received_at']).isoformat(timespec='seconds')
+        print(f"  #{letter['id']:<8} {letter['device_id']:<24} {letter['kind']:<14} {received}  "
+              f"{letter['attempts']} attempts")
+        print(f"            {letter['last_error']}")
+    print(f"{'='*100}")
+
+    if args.requeue:
+        count = spool.requeue_dead_letters(args.ids)
+        print(f"🔁 Requeued {count} uploads; running writers pick them up within a few seconds")
+    print()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+"""
+Decoder for the compact columnar sync format
+Mirrors the layout documented in agent/sync/codec.py
+"""
+
+import json
+import zlib
+import struct
+from array import array
+from datetime import datetime, timedelta
+import sys
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+CONTENT_TYPE = 'application/x-devmon-columnar'
+MAGIC = b'DMC1'
+INT64_NULL = -2 ** 63
+EPOCH = datetime(1970, 1, 1)
+# Timestamp unit per format version: version 1 agents sent milliseconds
+TIMESTAMP_UNITS = {1: timedelta(milliseconds=1), 2: timedelta(microseconds=1)}
+FORMAT_VERSION = max(TIMESTAMP_UNITS)
+
+SCHEMAS = {
+    'power_events': [
+        ('timestamp', 'ts'), ('event_type', 'str'), ('details', 'str')
+    ],
+    'session_events': [
+        ('session_type', 'str'), ('start_time', 'ts'), ('end_time', 'ts'),
+        ('duration', 'i8'), ('username', 'str')
+    ],
+    'system_stats': [
+        ('timestamp', 'ts'), ('cpu_percent', 'f4'), ('memory_percent', 'f4'),
+        ('disk_percent', 'f4'), ('uptime', 'i8')
+    ],
+    # Appended last: older decoders stop after the tables they know
+    'metric_samples': [
+        ('timestamp', 'ts'), ('metric', 'str'), ('label', 'str'), ('value', 'f8')
+    ]
+}
+
+# Columns added to an existing table after its schema shipped. Their blocks
+# follow every SCHEMAS block, so decoders that predate them (and stop at the
+# end of SCHEMAS) still read the base columns correctly
+EXTENSIONS = {
+    'system_stats': [
+        ('cpu_min', 'f4'), ('cpu_max', 'f4'), ('cpu_p95', 'f4'),
+        ('memory_min', 'f4'), ('memory_max', 'f4'), ('memory_p95', 'f4'),
+        ('sample_count', 'i8'), ('covered_seconds', 'f8')
+    ]
+}
+
+class UnsupportedEncoding(ValueError):
+    """Raised for a Content-Encoding the server can't decode"""
+
+def supported_encodings():
+    """Content-Encodings accepted for columnar uploads, preferred first"""
+    encodings = ['deflate']
+    if zstandard is not None:
+        encodings.insert(0, 'zstd')
+    return encodings
+
+def decompress(data, encoding, max_size):
+    """Decompress a request body, refusing anything that inflates past max_size"""
+    if not encoding or encoding == 'identity':
+        return data
+    if encoding == 'deflate':
+        inflater = zlib.decompressobj()
+        try:
+            out = inflater.decompress(data, max_size)
+        except zlib.error as e:
+            raise ValueError(f'Corrupt deflate body: {e}')
+        if inflater.unconsumed_tail:
+            raise ValueError('Decoded payload too large')
+        if not inflater.eof:
+            raise ValueError('Truncated deflate body')
+        return out
+    if encoding == 'zstd' and zstandard is not None:
+        try:
+            reader = zstandard.ZstdDecompressor().stream_reader(data)
+            out = reader.read(max_size + 1)
+        except zstandard.ZstdError as e:
+            raise ValueError(f'Corrupt zstd body: {e}')
+        if len(out) > max_size:
+            raise ValueError('Decoded payload too large')
+        return out
+    raise UnsupportedEncoding(f"Unsupported Content-Encoding: {encoding}")
+
+def _read_column(kind, buffer, offset, count, unit):
+    """
+    Unpack one numeric column, returns (values, new offset)
+    :param unit: timedelta of one timestamp tick
+    :raises ValueError: When the block runs past the end of the buffer
+    """
+    packed = array({'f4': 'f', 'f8': 'd'}.get(kind, 'q'))
+    size = packed.itemsize * count
+    if offset + size > len(buffer):
+        raise ValueError('Truncated payload: column block runs past the end')
+    packed.frombytes(buffer[offset:offset + size])
+    if sys.byteorder == 'big':
+        packed.byteswap()
+
+    if kind == 'f4':
+        # float32 carries ~7 significant digits; percentages need two decimals
+        values = [round(v, 2) if v == v else None for v in packed]  # NaN != NaN
+    elif kind == 'f8':
+        values = [v if v == v else None for v in packed]
+    elif kind == 'ts':
+        try:
+            values = [None if v == INT64_NULL else EPOCH + unit * v for v in packed]
+        except OverflowError:
+            raise ValueError('Timestamp out of range')
+    else:
+        values = [None if v == INT64_NULL else v for v in packed]
+    return values, offset + size
+
+def _table_meta(header, table):
+    """
+    A table's header entry, checked against what decode() relies on
+    :raises ValueError: For a malformed entry
+    """
+    meta = header['tables'].get(table, {'count': 0, 'strings': {}})
+    if not isinstance(meta, dict):
+        raise ValueError(f'Malformed header entry for {table}')
+    count = meta.get('count')
+    strings = meta.get('strings', {})
+    if not isinstance(count, int) or isinstance(count, bool) or count < 0:
+        raise ValueError(f'Invalid row count for {table}')
+    if not isinstance(strings, dict):
+        raise ValueError(f'Invalid string columns for {table}')
+    for name, column in strings.items():
+        if column is not None and (not isinstance(column, list) or len(column) != count):
+            raise ValueError(f'String column {table}.{name} does not match the row count')
+    if not isinstance(meta.get('extensions', []), list):
+        raise ValueError(f'Invalid extension list for {table}')
+    return meta
+
+def decode(body, encoding=None, max_size=64 * 1024 * 1024):
+    """
+    Decode a columnar upload into a batch envelope
+    Timestamps come back as datetime objects ready for the bulk insert helpers
+    :return: Dict of table name -> list of row dicts
+    :raises ValueError: For a truncated or malformed payload
+    """
+    data = decompress(body, encoding, max_size)
+    if len(data) < 8 or data[:4] != MAGIC:
+        raise ValueError('Not a columnar payload')
+
+    (header_len,) = struct.unpack_from('<I', data, 4)
+    offset = 8 + header_len
+    if offset > len(data):
+        raise ValueError('Truncated payload: header runs past the end')
+    header = json.loads(data[8:offset])  # JSONDecodeError is a ValueError
+    if not isinstance(header, dict) or not isinstance(header.get('tables'), dict):
+        raise ValueError('Header has no tables')
+    version = header.get('version', 1)
+    unit = TIMESTAMP_UNITS.get(version) if isinstance(version, int) else None
+    if unit is None:
+        raise ValueError(f'Unsupported format version: {version}')
+    # Refuse rather than drop tables this server can't store, so the agent
+    # keeps them unsynced instead of losing them
+    unknown = set(header['tables']) - set(SCHEMAS)
+    if unknown:
+        raise ValueError(f"Unknown tables: {', '.join(sorted(unknown))}")
+
+    envelope = {}
+    for table, columns in SCHEMAS.items():
+        meta = _table_meta(header, table)
+        count = meta['count']
+
+        values = {}
+        for name, kind in columns:
+            if kind == 'str':
+                values[name] = meta.get('strings', {}).get(name) or [None] * count
+            else:
+                values[name], offset = _read_column(kind, data, offset, count, unit)
+
+        names = [name for name, _ in columns]
+        envelope[table] = [dict(zip(names, row)) for row in zip(*(values[n] for n in names))]
+
+    for table, columns in EXTENSIONS.items():
+        present = set(_table_meta(header, table).get('extensions', []))
+        rows = envelope[table]
+        for name, kind in columns:
+            if name not in present:
+                break  # an older agent; it can only have sent a prefix of the list
+            column, offset = _read_column(kind, data, offset, len(rows), unit)
+            for row, value in zip(rows, column):
+                row[name] = value
+
+    return envelope
@@ -0,0 +1,161 @@
+"""
+In-process device lookup cache for the ingest routes
+Maps external device_id to the integer primary key and coalesces last_seen
+writes, so an agent upload costs no extra SELECT and no per-request UPDATE.
+Mappings are looked up again after ttl seconds, so a device deleted or
+re-created by another process isn't written to under a stale pk for long.
+A background thread writes the pending last_seen values in their own
+transaction every flush_interval seconds, and once more at shutdown
+"""
+
+import time
+import atexit
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from sqlalchemy import bindparam
+from server.models.database import db, Device
+from server.config.settings import config
+
+class DeviceCache:
+    def __init__(self, max_size=10000, flush_interval=30, ttl=300):
+        """
+        Initialize the cache
+        :param max_size: Maximum device_id -> pk entries kept (least recently used evicted)
+        :param flush_interval: Seconds between batched last_seen writes
+        :param ttl: Seconds a device_id -> pk mapping is trusted before it is checked again
+        """
+        self.max_size = max_size
+        self.flush_interval = flush_interval
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        # device_id -> (pk, monotonic expiry)
+        self._ids = OrderedDict()
+        self._last_seen = {}
+        self.app = None
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.failed_flushes = 0
+
+    def get_pk(self, device_id):
+        """
+        Resolve an external device_id to its primary key
+        :return: Integer pk, or None if the device is not registered
+        """
+        with self.lock:
+            entry = self._ids.get(device_id)
+            if entry is not None and time.monotonic() < entry[1]:
+                self._ids.move_to_end(device_id)
+                return entry[0]
+
+        # Misses are not cached, the device may register from another worker
+        pk = db.session.execute(
+            db.select(Device.id).where(Device.device_id == device_id)
+        ).scalar()
+        if entry is not None and entry[0] != pk:
+            # Deleted or re-created since it was cached: its pending last_seen is for a row that is gone
+            self.invalidate(device_id)
+        if pk is not None:
+            self._remember(device_id, pk)
+        return pk
+
+    def _remember(self, device_id, pk):
+        """Store a mapping, evicting the least recently used entry when full"""
+        with self.lock:
+            self._ids[device_id] = (pk, time.monotonic() + self.ttl)
+            self._ids.move_to_end(device_id)
+            while len(self._ids) > self.max_size:
+                self._ids.popitem(last=False)
+
+    def invalidate(self, device_id):
+        """
+        Drop a device's mapping and any pending last_seen write
+        Called on register, and when a write under the cached pk fails
+        """
+        with self.lock:
+            entry = self._ids.pop(device_id, None)
+            if entry is not None:
+                self._last_seen.pop(entry[0], None)
+
+    def touch(self, pk):
+        """
+        Record that a device was seen now
+        Held in memory until the next flush, so the request doesn't write it
+        """
+        with self.lock:
+            self._last_seen[pk] = datetime.utcnow()
+
+    def flush(self):
+        """
+        Write pending last_seen values with one executemany UPDATE and commit them
+        If the write fails the values are queued again (unless a newer one arrived)
+        :return: Number of devices updated
+        """
+        with self.lock:
+            pending = self._last_seen
+            self._last_seen = {}
+
+        if not pending:
+            return 0
+
+        table = Device.__table__
+        try:
+            # Bind names must differ from column names in an executemany UPDATE
+            db.session.execute(
+                table.update()
+                .where(table.c.id == bindparam('_id'))
+                .values(last_seen=bindparam('_last_seen')),
+                [{'_id': pk, '_last_seen': seen} for pk, seen in pending.items()]
+            )
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            with self.lock:
+                for pk, seen in pending.items():
+                    self._last_seen.setdefault(pk, seen)
+            raise
+        return len(pending)
+
+    def start(self, app):
+        """Start the background flush thread (flushes once more at interpreter exit)"""
+        if self.thread is not None:
+            return
+        self.app = app
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._loop, name='DeviceCacheFlush', daemon=True)
+        self.thread.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        """Stop the flush thread and write whatever is still pending"""
+        if self.thread is None:
+            return
+        self.stop_event.set()
+        self.thread.join(timeout=5)
+        self.thread = None
+        self._flush_in_context()
+
+    def _loop(self):
+        """Flush every flush_interval seconds until stopped"""
+        while not self.stop_event.wait(self.flush_interval):
+            self._flush_in_context()
+
+    def _flush_in_context(self):
+        """Flush inside an app context; failures are retried on the next run"""
+        with self.app.app_context():
+            try:
+                self.flush()
+            except Exception as e:
+                self.failed_flushes += 1
+                self.app.logger.warning(f"last_seen flush failed, retrying next interval: {e}")
+
+    def stats(self):
+        """Current cache size and pending last_seen writes"""
+        with self.lock:
+            return {
+                'cached_devices': len(self._ids),
+                'pending_last_seen': len(self._last_seen),
+                'failed_flushes': self.failed_flushes
+            }
+
+device_cache = DeviceCache(config.DEVICE_CACHE_SIZE, config.LAST_SEEN_FLUSH_INTERVAL, config.DEVICE_CACHE_TTL)
@@ -0,0 +1,220 @@
+"""
+Bulk ingest helpers for agent uploads
+Writes whole payloads with one Core executemany per table instead of one ORM object per row
+"""
+
+from datetime import datetime
+from sqlalchemy import DateTime, Float, Integer, String
+from server.models.database import db, PowerEvent, SystemStat, SessionEvent, MetricSample
+from server.api.rollups import fold_system_stats
+
+# Summary columns an aggregating agent sends with each system stat
+SUMMARY_COLUMNS = [
+    'cpu_min', 'cpu_max', 'cpu_p95', 'memory_min', 'memory_max', 'memory_p95', 'sample_count', 'covered_seconds'
+]
+
+# Fields an upload row must carry (NOT NULL columns the insert helpers have no default for)
+REQUIRED_FIELDS = {
+    PowerEvent: ('event_type',),
+    SessionEvent: ('session_type',),
+    MetricSample: ('metric',)
+}
+
+# Columns the server fills in, never read from an upload
+SERVER_COLUMNS = ('id', 'device_id', 'created_at')
+
+def validate_rows(model, rows, name):
+    """
+    Check upload rows against the columns they are written to
+    Runs before anything is inserted or queued, so a bad row is a 400 for the
+    whole upload instead of a failed transaction later
+    :param name: Payload key, used in error messages
+    :raises ValueError: For a missing required field or a value of the wrong type
+    """
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        raise ValueError(f'{name} must be a list of objects')
+
+    required = REQUIRED_FIELDS.get(model, ())
+    columns = [column for column in model.__table__.columns if column.name not in SERVER_COLUMNS]
+    for index, row in enumerate(rows):
+        for column in columns:
+            value = row.get(column.name)
+            if value is None or value == '':
+                if column.name in required:
+                    raise ValueError(f'{name}[{index}].{column.name} is required')
+                continue
+
+            kind = column.type
+            if isinstance(kind, String):
+                valid = isinstance(value, str) and (kind.length is None or len(value) <= kind.length)
+            elif isinstance(kind, DateTime):
+                valid = isinstance(value, datetime)
+                if isinstance(value, str):
+                    try:
+                        datetime.fromisoformat(value)
+                        valid = True
+                    except ValueError:
+                        pass
+            elif isinstance(kind, Integer):
+                valid = isinstance(value, int) or (isinstance(value, float) and value.is_integer())
+            elif isinstance(kind, Float):
+                valid = isinstance(value, (int, float))
+            else:
+                valid = True
+            # bool is an int subclass but never a valid stat value
+            if not valid or isinstance(value, bool):
+                raise ValueError(f'{name}[{index}].{column.name} has an invalid value')
+
+def parse_timestamps(values, default=None):
+    """
+    Parse a column of ISO timestamps in one pass
+    :param values: Iterable of ISO strings, datetimes (already decoded) or None
+    :param default: Value used for missing timestamps (default: utcnow, computed once)
+    """
+    if default is None:
+        default = datetime.utcnow()
+
+    parsed = []
+    cache = {}
+    for value in values:
+        if not value:
+            parsed.append(default)
+            continue
+        if isinstance(value, datetime):
+            parsed.append(value)
+            continue
+
+        # Agents sample on fixed intervals, so repeated strings are common
+        ts = cache.get(value)
+        if ts is None:
+            ts = datetime.fromisoformat(value)
+            cache[value] = ts
+        parsed.append(ts)
+
+    return parsed
+
+def insert_power_events(device_pk, events, now=None):
+    """
+    Insert a list of power event dicts for a device, returns rows written
+    :param now: Receive time, used for created_at and missing timestamps (default: utcnow)
+    """
+    if not events:
+        return 0
+
+    now = now or datetime.utcnow()
+    timestamps = parse_timestamps((e.get('timestamp') for e in events), default=now)
+
+    rows = [
+        {
+            'device_id': device_pk,
+            'event_type': event.get('event_type'),
+            'timestamp': timestamp,
+            'details': event.get('details'),
+            'created_at': now
+        }
+        for event, timestamp in zip(events, timestamps)
+    ]
+
+    db.session.execute(PowerEvent.__table__.insert(), rows)
+    return len(rows)
+
+def insert_system_stats(device_pk, stats, now=None):
+    """
+    Insert a list of system stat dicts for a device, returns rows written
+    :param now: Receive time, used for created_at and missing timestamps (default: utcnow)
+    """
+    if not stats:
+        return 0
+
+    now = now or datetime.utcnow()
+    timestamps = parse_timestamps((s.get('timestamp') for s in stats), default=now)
+
+    rows = [
+        {
+            'device_id': device_pk,
+            'timestamp': timestamp,
+            'cpu_percent': stat.get('cpu_percent'),
+            'memory_percent': stat.get('memory_percent'),
+            'disk_percent': stat.get('disk_percent'),
+            'uptime': stat.get('uptime'),
+            # Window summary from agents that pre-aggregate (absent for single samples)
+            **{column: stat.get(column) for column in SUMMARY_COLUMNS},
+            'created_at': now
+        }
+        for stat, timestamp in zip(stats, timestamps)
+    ]
+
+    db.session.execute(SystemStat.__table__.insert(), rows)
+    fold_system_stats(device_pk, rows)
+    return len(rows)
+
+def insert_session_events(device_pk, sessions, now=None):
+    """
+    Insert a list of session event dicts for a device, returns rows written
+    :param now: Receive time, used for created_at and missing start times (default: utcnow)
+    """
+    if not sessions:
+        return 0
+
+    now = now or datetime.utcnow()
+    start_times = parse_timestamps((s.get('start_time') for s in sessions), default=now)
+    # A session that is still open has no end time, keep it NULL
+    end_times = [
+        parse_timestamps([s['end_time']])[0] if s.get('end_time') else None
+        for s in sessions
+    ]
+
+    rows = [
+        {
+            'device_id': device_pk,
+            'session_type': session.get('session_type'),
+            'start_time': start_time,
+            'end_time': end_time,
+            'duration': session.get('duration'),
+            'username': session.get('username'),
+            'created_at': now
+        }
+        for session, start_time, end_time in zip(sessions, start_times, end_times)
+    ]
+
+    db.session.execute(SessionEvent.__table__.insert(), rows)
+    return len(rows)
+
+def insert_metric_samples(device_pk, samples, now=None):
+    """
+    Insert a list of metric sample dicts for a device, returns rows written
+    :param now: Receive time, used for missing timestamps (default: utcnow)
+    """
+    if not samples:
+        return 0
+
+    now = now or datetime.utcnow()
+    timestamps = parse_timestamps((s.get('timestamp') for s in samples), default=now)
+
+    rows = [
+        {
+            'device_id': device_pk,
+            'timestamp': timestamp,
+            'metric': sample.get('metric'),
+            'label': sample.get('label') or '',
+            'value': sample.get('value')
+        }
+        for sample, timestamp in zip(samples, timestamps)
+    ]
+
+    db.session.execute(MetricSample.__table__.insert(), rows)
+    return len(rows)
+
+def ingest_batch(device_pk, payload, now=None):
+    """
+    Write a multi-table agent envelope for a device
+    The caller owns the transaction and commits once for all tables
+    :param now: Receive time (default: utcnow)
+    :return: Dict of rows written per table
+    """
+    return {
+        'power_events': insert_power_events(device_pk, payload.get('power_events', []), now),
+        'session_events': insert_session_events(device_pk, payload.get('session_events', []), now),
+        'system_stats': insert_system_stats(device_pk, payload.get('system_stats', []), now),
+        'metric_samples': insert_metric_samples(device_pk, payload.get('metric_samples', []), now)
+    }
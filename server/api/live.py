@@ -0,0 +1,250 @@
+"""
+Pub/sub for live dashboard updates over server-sent events
+Ingest routes publish once per commit; each connected browser gets its own
+bounded queue, and a client that falls behind is dropped instead of letting
+its backlog grow (it reconnects and reloads over REST).
+Commits also add a row to the change_events feed in their own transaction;
+every worker process polls it, so clients connected to one worker hear about
+ingests handled by another (and that worker's response cache is invalidated).
+Feed ids are assigned at insert but become visible at commit, so a slow
+transaction can appear below ids already read; skipped ids are looked up
+again on later polls until they show up or feed_lookback seconds pass
+"""
+
+import time
+import uuid
+import queue
+import threading
+from datetime import datetime, timedelta
+from server.models.database import db, ChangeEvent
+from server.api.serializers import dumps
+from server.api.response_cache import response_cache
+from server.config.settings import config
+
+# Most skipped feed ids waited for at once (the oldest are given up first)
+MAX_FEED_GAPS = 1000
+
+class Subscription:
+    def __init__(self, broker, device_id, queue_size):
+        """
+        A single SSE client
+        :param device_id: Only receive events for this device (None for all devices)
+        """
+        self.broker = broker
+        self.device_id = device_id
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = False
+
+    def stream(self, heartbeat):
+        """
+        Yield SSE frames until the client disconnects or is dropped
+        :param heartbeat: Seconds between keepalive comments while idle
+        """
+        try:
+            # Reconnect after 5s if the connection closes
+            yield 'retry: 5000\n\n'
+            while not self.dropped:
+                try:
+                    yield self.queue.get(timeout=heartbeat)
+                except queue.Empty:
+                    # Keeps proxies from timing out and surfaces dead clients
+                    yield ': keepalive\n\n'
+            yield 'event: dropped\ndata: {}\n\n'
+        finally:
+            self.broker.unsubscribe(self)
+
+class EventBroker:
+    def __init__(self, queue_size=100, max_clients=100, feed_interval=2, feed_retention=600, feed_lookback=60):
+        """
+        Initialize the broker
+        :param queue_size: Maximum undelivered messages per client before it is dropped
+        :param max_clients: Maximum concurrent subscribers
+        :param feed_interval: Seconds between polls of the change feed
+        :param feed_retention: Seconds feed rows are kept before they are pruned
+        :param feed_lookback: Seconds a skipped feed id is looked for again (uncommitted when passed)
+        """
+        self.queue_size = queue_size
+        self.max_clients = max_clients
+        self.feed_interval = feed_interval
+        self.feed_retention = feed_retention
+        self.feed_lookback = feed_lookback
+        self.lock = threading.Lock()
+        self._subscribers = set()
+        self.published = 0
+        self.dropped = 0
+
+        # Set per process in start(), so forked workers don't share the master's
+        self.origin = uuid.uuid4().hex
+        self.app = None
+        self.stop_event = threading.Event()
+        self.thread = None
+        self._last_feed_id = None
+        # Skipped feed id -> monotonic time it stops being looked for
+        self._feed_gaps = {}
+        self._last_prune = None
+        self.feed_events = 0
+        self.feed_errors = 0
+
+    def subscribe(self, device_id=None):
+        """
+        Register a new client
+        :return: Subscription, or None when max_clients are already connected
+        """
+        with self.lock:
+            if len(self._subscribers) >= self.max_clients:
+                return None
+            subscription = Subscription(self, device_id, self.queue_size)
+            self._subscribers.add(subscription)
+            return subscription
+
+    def unsubscribe(self, subscription):
+        """Forget a client (safe to call more than once)"""
+        with self.lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, event, device_id, data):
+        """
+        Fan an event out to every matching client without blocking
+        The frame is encoded once and shared by all clients
+        :return: Number of clients it was queued for
+        """
+        with self.lock:
+            targets = [s for s in self._subscribers if s.device_id in (None, device_id)]
+        if not targets:
+            return 0
+
+        frame = f"event: {event}\ndata: {dumps({'device_id': device_id, 'data': data}).decode()}\n\n"
+        delivered = 0
+        for subscription in targets:
+            try:
+                subscription.queue.put_nowait(frame)
+                delivered += 1
+            except queue.Full:
+                # Backpressure: a slow client is cut off, never waited on
+                subscription.dropped = True
+                self.unsubscribe(subscription)
+                with self.lock:
+                    self.dropped += 1
+
+        with self.lock:
+            self.published += 1
+        return delivered
+
+    def record(self, event, device_id):
+        """
+        Add a change to the feed in the caller's transaction (call before its commit)
+        Other worker processes publish it on their next poll; this one publishes directly
+        :param device_id: External device id, None for fleet-wide changes (compaction)
+        """
+        db.session.execute(ChangeEvent.__table__.insert().values(
+            device_id=device_id,
+            event=event,
+            origin=self.origin,
+            created_at=datetime.utcnow()
+        ))
+
+    def start(self, app):
+        """Start polling the change feed in a background thread"""
+        if self.thread is not None:
+            return
+        self.app = app
+        self.origin = uuid.uuid4().hex
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._loop, name='ChangeFeed', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop polling the change feed"""
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+            self.thread = None
+
+    def _loop(self):
+        """Poll the feed every feed_interval seconds until stopped"""
+        while not self.stop_event.wait(self.feed_interval):
+            with self.app.app_context():
+                try:
+                    self.poll_feed()
+                except Exception as e:
+                    db.session.rollback()
+                    self.feed_errors += 1
+                    self.app.logger.error(f"Change feed poll failed: {e}")
+
+    def poll_feed(self):
+        """
+        Publish changes written by other processes since the last poll
+        Their clients only reload over REST, so the frames carry no data
+        :return: Number of changes from other processes
+        """
+        table = ChangeEvent.__table__
+        if self._last_feed_id is None:
+            # Start from the current end of the feed
+            self._last_feed_id = db.session.execute(db.select(db.func.max(table.c.id))).scalar() or 0
+
+        columns = (table.c.id, table.c.device_id, table.c.event, table.c.origin)
+        rows = db.session.execute(
+            db.select(*columns).where(table.c.id > self._last_feed_id).order_by(table.c.id)
+        ).all()
+        # Rows of transactions that committed after a later id was read
+        late = []
+        if self._feed_gaps:
+            late = db.session.execute(
+                db.select(*columns).where(table.c.id.in_(list(self._feed_gaps))).order_by(table.c.id)
+            ).all()
+
+        now = datetime.utcnow()
+        if self._last_prune is None or now - self._last_prune > timedelta(seconds=self.feed_retention / 10):
+            db.session.execute(table.delete().where(
+                table.c.created_at < now - timedelta(seconds=self.feed_retention)
+            ))
+            self._last_prune = now
+        db.session.commit()
+
+        self._track_gaps(rows, late)
+        remote = 0
+        for feed_id, device_id, event, origin in late + rows:
+            if origin == self.origin:
+                continue
+            remote += 1
+            response_cache.invalidate(device_id)
+            if device_id is not None:
+                self.publish(event, device_id, None)
+        self.feed_events += remote
+        return remote
+
+    def _track_gaps(self, rows, late):
+        """Advance the feed cursor past new rows, remembering ids they skipped"""
+        now = time.monotonic()
+        for feed_id, *_ in late:
+            self._feed_gaps.pop(feed_id, None)
+
+        deadline = now + self.feed_lookback
+        for feed_id, *_ in rows:
+            # Bounded, so a jump in the sequence can't grow the set without limit
+            for missing in range(max(self._last_feed_id + 1, feed_id - MAX_FEED_GAPS), feed_id):
+                self._feed_gaps[missing] = deadline
+            self._last_feed_id = feed_id
+
+        expired = [feed_id for feed_id, until in self._feed_gaps.items() if until <= now]
+        for feed_id in expired:
+            del self._feed_gaps[feed_id]
+        for feed_id in sorted(self._feed_gaps)[:len(self._feed_gaps) - MAX_FEED_GAPS]:
+            del self._feed_gaps[feed_id]
+
+    def stats(self):
+        """Connected clients, publish/drop counters and change feed activity"""
+        with self.lock:
+            return {
+                'clients': len(self._subscribers),
+                'published': self.published,
+                'dropped_clients': self.dropped,
+                'feed_events': self.feed_events,
+                'feed_gaps': len(self._feed_gaps),
+                'feed_errors': self.feed_errors
+            }
+
+event_broker = EventBroker(
+    config.SSE_QUEUE_SIZE, config.SSE_MAX_CLIENTS, config.SSE_FEED_INTERVAL, config.SSE_FEED_RETENTION,
+    config.SSE_FEED_LOOKBACK
+)
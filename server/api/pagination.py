@@ -0,0 +1,126 @@
+"""
+Keyset pagination, time windows and field projection for the read routes
+Pages are addressed by an opaque (timestamp, id) cursor instead of an offset,
+so every page is one index range scan no matter how deep it is
+"""
+
+import base64
+from datetime import datetime
+from sqlalchemy import and_, or_
+from server.models.database import db
+from server.api.serializers import rows_to_dicts
+
+class InvalidQuery(ValueError):
+    """A pagination, window or fields parameter could not be parsed"""
+
+def make_cursor(timestamp, row_id):
+    """Encode a (timestamp, id) position as an opaque URL-safe cursor"""
+    raw = f"{timestamp.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def parse_cursor(value):
+    """Decode a cursor made by make_cursor, returns (timestamp, id)"""
+    try:
+        raw = base64.urlsafe_b64decode(value + '=' * (-len(value) % 4)).decode()
+        timestamp, row_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        raise InvalidQuery(f"Invalid cursor: {value}")
+
+def parse_time(value, name):
+    """Parse an ISO timestamp query parameter (a trailing Z is accepted)"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value[:-1] if value.endswith('Z') else value)
+    except ValueError:
+        raise InvalidQuery(f"{name} must be an ISO timestamp")
+
+def parse_fields(value, allowed):
+    """
+    Parse a comma separated fields= parameter
+    :param allowed: Names that may be requested
+    :return: List of names, or None when no projection was requested
+    """
+    if not value:
+        return None
+    fields = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in allowed]
+    if unknown:
+        raise InvalidQuery(f"Unknown fields: {', '.join(unknown)} (allowed: {', '.join(allowed)})")
+    return fields
+
+def keyset_page(query, time_column, id_column, args, default_limit=None):
+    """
+    Apply window, cursor, ordering and limit to a select
+    :param query: Select over the rows to page through
+    :param time_column: Column the window and cursor are based on
+    :param id_column: Unique tiebreaker for rows with equal timestamps
+    :param args: Request args (from, to, before, after, limit)
+    :param default_limit: Page size when no limit is given (None returns everything)
+    :return: (query, limit); after= pages are oldest-first, all others newest-first
+    """
+    start = parse_time(args.get('from'), 'from')
+    end = parse_time(args.get('to'), 'to')
+    if start is not None:
+        query = query.where(time_column >= start)
+    if end is not None:
+        query = query.where(time_column < end)
+
+    before = args.get('before')
+    after = args.get('after')
+    if before and after:
+        raise InvalidQuery("Use either before or after, not both")
+
+    if after:
+        # Newer than the cursor, walking forward in time
+        timestamp, row_id = parse_cursor(after)
+        query = query.where(or_(
+            time_column > timestamp,
+            and_(time_column == timestamp, id_column > row_id)
+        )).order_by(time_column.asc(), id_column.asc())
+    else:
+        if before:
+            timestamp, row_id = parse_cursor(before)
+            query = query.where(or_(
+                time_column < timestamp,
+                and_(time_column == timestamp, id_column < row_id)
+            ))
+        query = query.order_by(time_column.desc(), id_column.desc())
+
+    limit = args.get('limit', default_limit, type=int)
+    if limit is not None:
+        if limit < 1:
+            raise InvalidQuery("limit must be a positive integer")
+        query = query.limit(limit)
+
+    return query, limit
+
+def next_cursor(rows, limit, time_key, id_key):
+    """
+    Cursor continuing in the same direction, or None on the last page
+    :param rows: Fetched model objects, in page order
+    """
+    if limit is None or len(rows) < limit:
+        return None
+    return make_cursor(getattr(rows[-1], time_key), getattr(rows[-1], id_key))
+
+def fetch_page(model, time_column, args, filters=(), default_limit=None):
+    """
+    Fetch one page of a model's rows as raw column tuples
+    Only the fields= columns are loaded (all columns when not given)
+    :return: (items, next_cursor); items hold datetimes, encode with serializers.dumps
+    """
+    table = model.__table__
+    fields = parse_fields(args.get('fields'), list(table.c.keys())) or list(table.c.keys())
+
+    # Cursor columns are loaded after the requested ones even when not requested
+    columns = [table.c[name] for name in fields]
+    query = db.select(*columns, time_column.label('cursor_time'), table.c.id.label('cursor_id')).where(*filters)
+    query, limit = keyset_page(query, time_column, table.c.id, args, default_limit)
+    rows = db.session.execute(query).all()
+
+    cursor = None
+    if limit is not None and len(rows) == limit:
+        cursor = make_cursor(*rows[-1][-2:])
+    return rows_to_dicts(rows, columns), cursor
@@ -0,0 +1,122 @@
+"""
+Ingest-versioned response cache and conditional GET for polled read routes
+Cached bodies are keyed by URL and tagged with the ingest version they were
+built at; ingest commits bump the version, so a poll between uploads is served
+from memory and a client holding the same body gets 304 Not Modified
+"""
+
+import time
+import hashlib
+import threading
+from functools import wraps
+from collections import OrderedDict
+from flask import request, current_app
+from server.config.settings import config
+
+class ResponseCache:
+    def __init__(self, max_entries=1024, ttl=120):
+        """
+        Initialize the cache
+        :param max_entries: Maximum cached responses (least recently used evicted)
+        :param ttl: Seconds an entry may be served; versions already invalidate on
+                    ingest, this bounds staleness when another worker process
+                    ingested and this one never saw the bump
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._global_version = 0
+        self._fleet_version = 0
+        self._device_versions = {}
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def invalidate(self, device_id=None):
+        """
+        Bump versions after an ingest commit
+        :param device_id: External id of the device written to, None for fleet-wide
+                          changes (compaction), which invalidate every device's routes too
+        """
+        with self.lock:
+            self._global_version += 1
+            if device_id is not None:
+                self._device_versions[device_id] = self._device_versions.get(device_id, 0) + 1
+            else:
+                self._fleet_version += 1
+
+    def _version(self, device_id):
+        """Version a response depends on: its device's (plus fleet-wide changes), or the global one"""
+        if device_id is not None:
+            return ('device', self._fleet_version, self._device_versions.get(device_id, 0))
+        return ('global', self._global_version)
+
+    def cached(self, view):
+        """
+        Decorator for GET views returning JSON
+        Routes with a device_id argument are invalidated by that device's ingest
+        and by fleet-wide changes; all other routes by any ingest
+        """
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = request.full_path
+            device_id = kwargs.get('device_id')
+
+            with self.lock:
+                version = self._version(device_id)
+                entry = self._entries.get(key)
+                if entry and entry[0] == version and time.monotonic() - entry[1] < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                else:
+                    entry = None
+                    self.misses += 1
+
+            if entry is None:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+                body = response.get_data()
+                etag = hashlib.blake2b(body, digest_size=8).hexdigest()
+                # Stored under the version read before the view ran, so an ingest
+                # that commits meanwhile still invalidates it
+                entry = (version, time.monotonic(), etag, body, response.mimetype)
+                with self.lock:
+                    self._entries[key] = entry
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+
+            return self._respond(*entry[2:])
+
+        return wrapper
+
+    def _respond(self, etag, body, mimetype):
+        """Full response, or 304 when the client already holds this body"""
+        if request.if_none_match.contains(etag):
+            with self.lock:
+                self.not_modified += 1
+            response = current_app.response_class(status=304)
+        else:
+            response = current_app.response_class(body, mimetype=mimetype)
+
+        response.set_etag(etag)
+        # Let browsers keep the body but revalidate on every poll
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+    def stats(self):
+        """Hit/miss counters and current size"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'not_modified': self.not_modified,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else None
+            }
+
+response_cache = ResponseCache(config.RESPONSE_CACHE_SIZE, config.RESPONSE_CACHE_TTL)
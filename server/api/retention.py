@@ -0,0 +1,225 @@
+"""
+Retention and compaction for server history tables
+Deletes rows past their retention horizon in bounded batches, each in its own
+short transaction, so ingest is never blocked behind one long delete. Batches
+are found device by device through the (device_id, timestamp) indexes
+"""
+
+import time
+import threading
+from datetime import datetime, timedelta
+from server.models.database import db, Device, PowerEvent, SystemStat, SessionEvent, MetricSample, SystemStatRollup
+from server.api.rollups import RESOLUTIONS, bucket_start, fold_system_stats
+from server.api.response_cache import response_cache
+from server.api.live import event_broker
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Raw tables and the column their horizon applies to
+RAW_TABLES = {
+    'system_stats': (SystemStat, SystemStat.timestamp),
+    'power_events': (PowerEvent, PowerEvent.timestamp),
+    'session_events': (SessionEvent, SessionEvent.start_time),
+    'metric_samples': (MetricSample, MetricSample.timestamp)
+}
+
+def acquire_lock(path):
+    """
+    Take an exclusive, non-blocking lock on a file
+    Used so only one worker process runs background compaction
+    :return: Open lock file (keep it open to hold the lock), or None if another process holds it
+    """
+    handle = open(path, 'a')
+    if fcntl is None:
+        # No multi-process servers on Windows, the dev server is a single process
+        return handle
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        return None
+    return handle
+
+class Compactor:
+    def __init__(self, app, policy, batch_size=5000, interval=3600, lock_path=None):
+        """
+        Initialize the compactor
+        :param app: Flask app, used for an app context in the background thread
+        :param policy: Dict of table or rollup_<resolution> -> days to keep (0 keeps forever)
+        :param batch_size: Maximum rows deleted per transaction
+        :param interval: Seconds between background runs
+        :param lock_path: Lock file shared by worker processes, only the holder compacts
+        """
+        self.app = app
+        self.policy = policy
+        self.batch_size = batch_size
+        self.interval = interval
+        self.lock_path = lock_path
+        self.lock_file = None
+        self.stop_event = threading.Event()
+        self.thread = None
+        # (device, day) buckets created by backfill during the current run
+        self._backfilled = set()
+
+    def start(self):
+        """Start periodic compaction in a background thread"""
+        self.thread = threading.Thread(target=self._loop, name='Compactor', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop the background thread and release the lock"""
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+        if self.lock_file:
+            self.lock_file.close()
+            self.lock_file = None
+
+    def _acquire_lock(self):
+        """True if this process may compact (holds the lock, or no lock is configured)"""
+        if self.lock_path is None or self.lock_file is not None:
+            return True
+        self.lock_file = acquire_lock(self.lock_path)
+        return self.lock_file is not None
+
+    def _loop(self):
+        """Run compaction every interval until stopped"""
+        # Let the server finish starting before the first run
+        delay = min(60, self.interval)
+        while not self.stop_event.wait(delay):
+            delay = self.interval
+            if not self._acquire_lock():
+                # Another worker runs compaction; retry soon in case it exits or is reloaded
+                delay = min(60, self.interval)
+                continue
+            try:
+                with self.app.app_context():
+                    self.run_once()
+            except Exception as e:
+                self.app.logger.error(f"Compaction failed: {e}")
+
+    def run_once(self):
+        """
+        Apply the retention policy once
+        :return: Report dict with rows deleted per table and bytes reclaimed
+        """
+        started = time.perf_counter()
+        self._backfilled = set()
+        free_before = self._free_bytes()
+        now = datetime.utcnow()
+        deleted = {}
+
+        for table_name, (model, column) in RAW_TABLES.items():
+            days = self.policy.get(table_name, 0)
+            if days > 0:
+                horizon = now - timedelta(days=days)
+                before_delete = self._fold_unrolled if model is SystemStat else None
+                deleted[table_name] = self._delete_batches(model, column, horizon, before_delete=before_delete)
+
+        for resolution in RESOLUTIONS:
+            days = self.policy.get(f'rollup_{resolution}', 0)
+            if days > 0:
+                horizon = now - timedelta(days=days)
+                deleted[f'rollup_{resolution}'] = self._delete_batches(
+                    SystemStatRollup, SystemStatRollup.bucket_start, horizon,
+                    where=SystemStatRollup.resolution == resolution
+                )
+
+        if any(deleted.values()):
+            # Other worker processes invalidate their caches when they see this in the feed
+            event_broker.record('compaction', None)
+            db.session.commit()
+            response_cache.invalidate()
+
+        free_after = self._free_bytes()
+        report = {
+            'rows_deleted': deleted,
+            'total_rows': sum(deleted.values()),
+            'bytes_reclaimed': free_after - free_before if free_before is not None else None,
+            'seconds': round(time.perf_counter() - started, 3)
+        }
+        self.app.logger.info(f"Compaction complete: {report}")
+        return report
+
+    def _delete_batches(self, model, column, horizon, before_delete=None, where=None):
+        """
+        Delete rows with column < horizon batch_size at a time, committing after each batch
+        Each device is walked oldest first, so a batch is a range scan of the
+        table's (device_id, column) index instead of a scan of the whole table
+        :param where: Extra condition the rows must match
+        """
+        table = model.__table__
+        total = 0
+        device_pks = db.session.execute(db.select(Device.id).order_by(Device.id)).scalars().all()
+
+        for device_pk in device_pks:
+            condition = (table.c.device_id == device_pk) & (column < horizon)
+            if where is not None:
+                condition = condition & where
+
+            while not self.stop_event.is_set():
+                ids = db.session.execute(
+                    db.select(table.c.id).where(condition).order_by(column).limit(self.batch_size)
+                ).scalars().all()
+                if not ids:
+                    break
+
+                try:
+                    if before_delete:
+                        before_delete(ids)
+                    db.session.execute(table.delete().where(table.c.id.in_(ids)))
+                    db.session.commit()
+                except Exception:
+                    db.session.rollback()
+                    raise
+
+                total += len(ids)
+
+        return total
+
+    def _fold_unrolled(self, ids):
+        """
+        Fold raw stats that never reached the rollups before they are deleted
+        Ingest folds rows as they arrive, so this only matters for history that
+        predates the rollup tables; the daily tier is the one kept longest
+        """
+        rows = db.session.execute(
+            db.select(
+                SystemStat.device_id, SystemStat.timestamp, SystemStat.cpu_percent,
+                SystemStat.memory_percent, SystemStat.disk_percent, SystemStat.cpu_min, SystemStat.cpu_max,
+                SystemStat.memory_min, SystemStat.memory_max, SystemStat.sample_count,
+                SystemStat.covered_seconds
+            ).where(SystemStat.id.in_(ids))
+        ).mappings().all()
+
+        by_device = {}
+        for row in rows:
+            by_device.setdefault(row['device_id'], []).append(row)
+
+        day = RESOLUTIONS['1d']
+        for device_pk, device_rows in by_device.items():
+            days = {bucket_start(row['timestamp'], day) for row in device_rows}
+            rolled = set(db.session.execute(
+                db.select(SystemStatRollup.bucket_start).where(
+                    SystemStatRollup.device_id == device_pk,
+                    SystemStatRollup.resolution == '1d',
+                    SystemStatRollup.bucket_start.in_(days)
+                )
+            ).scalars())
+            # A day backfilled by an earlier batch of this run is still incomplete
+            missing_days = {d for d in days if d not in rolled or (device_pk, d) in self._backfilled}
+            missing = [row for row in device_rows if bucket_start(row['timestamp'], day) in missing_days]
+            if missing:
+                fold_system_stats(device_pk, missing)
+                self._backfilled.update((device_pk, d) for d in missing_days)
+
+    def _free_bytes(self):
+        """Bytes on the SQLite freelist (reusable space), None for other databases"""
+        if db.engine.dialect.name != 'sqlite':
+            return None
+        page_size = db.session.execute(db.text('PRAGMA page_size')).scalar()
+        free_pages = db.session.execute(db.text('PRAGMA freelist_count')).scalar()
+        return page_size * free_pages
@@ -0,0 +1,225 @@
+"""
+Incremental time-series rollups for system stats
+Folds ingested rows into per-device 1m/1h/1d buckets inside the ingest transaction,
+with one atomic upsert so concurrent ingests of the same device can't lose updates
+"""
+
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+from server.models.database import db, SystemStat, SystemStatRollup
+
+# Resolution name -> bucket width
+RESOLUTIONS = {
+    '1m': timedelta(minutes=1),
+    '1h': timedelta(hours=1),
+    '1d': timedelta(days=1)
+}
+
+# Raw column -> rollup column prefix
+METRICS = {
+    'cpu_percent': 'cpu',
+    'memory_percent': 'memory',
+    'disk_percent': 'disk'
+}
+
+EPOCH = datetime(1970, 1, 1)
+
+def bucket_start(timestamp, width):
+    """Floor a timestamp to the start of its bucket"""
+    return EPOCH + ((timestamp - EPOCH) // width) * width
+
+def _empty_bucket():
+    """Zeroed aggregate for one bucket"""
+    bucket = {'sample_count': 0}
+    for prefix in METRICS.values():
+        bucket.update({
+            f'{prefix}_min': None,
+            f'{prefix}_max': None,
+            f'{prefix}_sum': 0.0,
+            f'{prefix}_count': 0
+        })
+    return bucket
+
+def row_weight(row):
+    """
+    Weight of a raw stat row in bucket averages
+    Agent summaries weigh the seconds their probes covered (whole seconds, the
+    bucket's per-metric counts are integers), so windows of fast spike probes
+    don't outweigh calm ones; other rows fall back to their sample count
+    """
+    covered = row.get('covered_seconds')
+    if covered:
+        return max(1, round(covered))
+    return row.get('sample_count') or 1
+
+def aggregate(rows):
+    """
+    Aggregate raw stat rows into buckets for every resolution
+    A row summarizing several agent probes (sample_count, <prefix>_min/_max set)
+    counts as that many samples and is weighted by the time it covers (see
+    row_weight), so bucket averages and extremes stay exact
+    :param rows: Dicts with a datetime 'timestamp' and the raw metric columns
+    :return: Dict of (resolution, bucket_start) -> aggregate dict
+    """
+    buckets = {}
+    for row in rows:
+        timestamp = row['timestamp']
+        samples = row.get('sample_count') or 1
+        weight = row_weight(row)
+        for resolution, width in RESOLUTIONS.items():
+            key = (resolution, bucket_start(timestamp, width))
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = _empty_bucket()
+
+            bucket['sample_count'] += samples
+            for column, prefix in METRICS.items():
+                value = row.get(column)
+                if value is None:
+                    continue
+                bucket[f'{prefix}_sum'] += value * weight
+                bucket[f'{prefix}_count'] += weight
+                low = row.get(f'{prefix}_min') if row.get(f'{prefix}_min') is not None else value
+                high = row.get(f'{prefix}_max') if row.get(f'{prefix}_max') is not None else value
+                current_min = bucket[f'{prefix}_min']
+                current_max = bucket[f'{prefix}_max']
+                if current_min is None or low < current_min:
+                    bucket[f'{prefix}_min'] = low
+                if current_max is None or high > current_max:
+                    bucket[f'{prefix}_max'] = high
+    return buckets
+
+def _upsert_statement(table):
+    """
+    INSERT ... ON CONFLICT DO UPDATE adding a batch's aggregates to existing buckets
+    The merge happens in the database, so two transactions folding into the same
+    bucket both count instead of one overwriting the other
+    """
+    if db.engine.dialect.name == 'postgresql':
+        statement = postgresql.insert(table)
+        least, greatest = func.least, func.greatest
+    else:
+        statement = sqlite.insert(table)
+        least, greatest = func.min, func.max  # SQLite's multi-argument min/max
+
+    incoming = statement.excluded
+    values = {
+        'sample_count': table.c.sample_count + incoming.sample_count,
+        'updated_at': incoming.updated_at
+    }
+    for prefix in METRICS.values():
+        for part in ('sum', 'count'):
+            column = f'{prefix}_{part}'
+            values[column] = func.coalesce(table.c[column], 0) + incoming[column]
+        for part, pick in (('min', least), ('max', greatest)):
+            column = f'{prefix}_{part}'
+            # COALESCE both ways, so a NULL on either side keeps the other value
+            values[column] = pick(
+                func.coalesce(table.c[column], incoming[column]),
+                func.coalesce(incoming[column], table.c[column])
+            )
+
+    return statement.on_conflict_do_update(
+        index_elements=['device_id', 'resolution', 'bucket_start'],
+        set_=values
+    )
+
+def fold_system_stats(device_pk, rows, since=None):
+    """
+    Fold newly ingested stat rows into the device's rollup buckets
+    Runs in the caller's transaction, so raw rows and rollups commit together
+    :param since: Optional dict of resolution -> first bucket start to fold;
+                  buckets before it are left as they are
+    :return: Number of buckets touched
+    """
+    if not rows:
+        return 0
+
+    buckets = aggregate(rows)
+    if since:
+        buckets = {key: bucket for key, bucket in buckets.items() if key[1] >= since[key[0]]}
+        if not buckets:
+            return 0
+    table = SystemStatRollup.__table__
+    now = datetime.utcnow()
+
+    records = []
+    # A fixed order, so concurrent batches lock shared buckets in the same order
+    for (resolution, start), bucket in sorted(buckets.items()):
+        bucket.update({
+            'device_id': device_pk,
+            'resolution': resolution,
+            'bucket_start': start,
+            'updated_at': now
+        })
+        records.append(bucket)
+
+    db.session.execute(_upsert_statement(table), records)
+    return len(buckets)
+
+def _rebuild_starts(device_pk, oldest):
+    """
+    First bucket start per resolution that raw stats can fully rebuild
+    A bucket that starts before the oldest raw row may also hold compacted
+    rows; when it already has a rollup it is kept as it is
+    """
+    starts = {}
+    for resolution, width in RESOLUTIONS.items():
+        start = bucket_start(oldest, width)
+        if start < oldest:
+            existing = db.session.execute(
+                db.select(SystemStatRollup.id).where(
+                    SystemStatRollup.device_id == device_pk,
+                    SystemStatRollup.resolution == resolution,
+                    SystemStatRollup.bucket_start == start
+                )
+            ).first()
+            if existing is not None:
+                start += width
+        starts[resolution] = start
+    return starts
+
+def rebuild_rollups(device_pk, chunk_size=10000):
+    """
+    Recompute a device's rollups from its raw stats
+    Used to backfill databases that predate the rollup tables. Only buckets
+    the remaining raw stats cover are replaced: rollups older than them are
+    all that is left of compacted history and are kept
+    :return: Dict of resolution -> first rebuilt bucket start, None without raw stats
+    """
+    oldest = db.session.execute(
+        db.select(func.min(SystemStat.timestamp)).where(SystemStat.device_id == device_pk)
+    ).scalar()
+    if oldest is None:
+        return None
+
+    starts = _rebuild_starts(device_pk, oldest)
+    for resolution, start in starts.items():
+        db.session.execute(
+            SystemStatRollup.__table__.delete().where(
+                SystemStatRollup.device_id == device_pk,
+                SystemStatRollup.resolution == resolution,
+                SystemStatRollup.bucket_start >= start
+            )
+        )
+
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            db.select(
+                SystemStat.id, SystemStat.timestamp, SystemStat.cpu_percent,
+                SystemStat.memory_percent, SystemStat.disk_percent,
+                # Agent summaries weigh the time they cover, with their own extremes
+                SystemStat.sample_count, SystemStat.covered_seconds, SystemStat.cpu_min, SystemStat.cpu_max,
+                SystemStat.memory_min, SystemStat.memory_max
+            )
+            .where(SystemStat.device_id == device_pk, SystemStat.id > last_id)
+            .order_by(SystemStat.id)
+            .limit(chunk_size)
+        ).mappings().all()
+        if not rows:
+            return starts
+
+        fold_system_stats(device_pk, rows, since=starts)
+        last_id = rows[-1]['id']
@@ -2,24 +2,103 @@
 API routes for device monitoring server
 """
 
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, Response, current_app, request, jsonify, send_file
 from datetime import datetime
 from pathlib import Path
 import os
 from werkzeug.utils import secure_filename
-from server.models.database import db, Device, PowerEvent, SystemStat, SessionEvent, Screenshot
+from sqlalchemy.exc import IntegrityError
+from server.models.database import db, Device, PowerEvent, SystemStat, SessionEvent, MetricSample, Screenshot, SystemStatRollup
 from server.api.auth import require_api_key
+from server.api.ingest import insert_power_events, insert_system_stats, ingest_batch
+from server.api import codec
+from server.api.rollups import RESOLUTIONS
+from server.api.device_cache import device_cache
+from server.api.pagination import InvalidQuery, keyset_page, next_cursor, parse_fields, fetch_page
+from server.api.serializers import json_response
+from server.api.response_cache import response_cache
+from server.api.live import event_broker
+from server.api.spool import ingest_spool, validate_upload, upload_counts
+from server.storage.blob_store import blob_store, SHA256_PATTERN
+from server.config.settings import config
 
 api = Blueprint('api', __name__, url_prefix='/api/v1')
 
+SCREENSHOTS_PER_DEVICE = 3
+
+# Flat directory used before screenshots moved to the blob store
+LEGACY_SCREENSHOT_DIR = Path(__file__).parent.parent / 'screenshots'
+
+# Keys a rollup row serializes to, for fields= on resolution queries
+ROLLUP_FIELDS = [
+    'id', 'device_id', 'resolution', 'timestamp', 'sample_count',
+    'cpu_percent', 'cpu_min', 'cpu_max', 'memory_percent', 'memory_min', 'memory_max',
+    'disk_percent', 'disk_min', 'disk_max'
+]
+
 @api.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     return jsonify({
         'status': 'healthy',
-        'timestamp': datetime.utcnow().isoformat()
+        'timestamp': datetime.utcnow().isoformat(),
+        'sync_encodings': codec.supported_encodings(),
+        'sync_format': codec.FORMAT_VERSION
     }), 200
 
+@api.route('/metrics', methods=['GET'])
+def get_metrics():
+    """In-process cache counters for this worker"""
+    return jsonify({
+        'response_cache': response_cache.stats(),
+        'device_cache': device_cache.stats(),
+        'live_updates': event_broker.stats(),
+        'ingest_queue': _ingest_queue_stats()
+    }), 200
+
+def _ingest_queue_stats():
+    """Spool depth and writer lag in queued ingest mode, None otherwise"""
+    writer = current_app.extensions.get('ingest_writer')
+    if writer is not None:
+        return writer.stats()
+    if ingest_spool is not None:
+        return ingest_spool.stats()
+    return None
+
+def _queue_upload(device_pk, device_id, kind, payload):
+    """Spool a validated upload for the writer pool (queued ingest mode)"""
+    ingest_spool.enqueue(device_pk, device_id, kind, payload)
+    counts = upload_counts(kind, payload)
+    count = sum(counts.values())
+    return jsonify({
+        'message': f'{count} records queued',
+        'queued': count,
+        'counts': counts
+    }), 202
+
+def _ingest_failed(device_id, error):
+    """
+    Roll back a failed ingest and build its error response
+    A foreign key failure can mean the cached pk belongs to a device deleted
+    since; if so, answer 404 so the agent registers again
+    """
+    db.session.rollback()
+    if isinstance(error, IntegrityError):
+        device_cache.invalidate(device_id)
+        if device_cache.get_pk(device_id) is None:
+            return jsonify({'error': 'Device not found'}), 404
+    return jsonify({'error': str(error)}), 500
+
+def _read_batch_payload():
+    """Read a batch envelope sent as JSON or in the compact columnar format"""
+    if request.mimetype == codec.CONTENT_TYPE:
+        return codec.decode(
+            request.get_data(),
+            request.headers.get('Content-Encoding'),
+            max_size=config.MAX_DECODED_PAYLOAD
+        )
+    return request.get_json()
+
 @api.route('/devices/register', methods=['POST'])
 @require_api_key
 def register_device():
@@ -56,7 +135,11 @@ def register_device():
             )
             db.session.add(device)
         
+        event_broker.record('device', device_id)
         db.session.commit()
+        device_cache.invalidate(device_id)
+        response_cache.invalidate(device_id)
+        event_broker.publish('device', device_id, device.to_dict())
         
         return jsonify({
             'message': 'Device registered successfully',
@@ -75,33 +158,35 @@ def submit_power_events(device_id):
         data = request.get_json()
         events = data.get('events', [])
         
-        # Find device
-        device = Device.query.filter_by(device_id=device_id).first()
-        if not device:
+        # Find device (cached pk, last_seen written in periodic batches)
+        device_pk = device_cache.get_pk(device_id)
+        if device_pk is None:
             return jsonify({'error': 'Device not found'}), 404
         
-        # Update last seen
-        device.last_seen = datetime.utcnow()
+        try:
+            validate_upload('power_events', data)
+        except ValueError as e:
+            return jsonify({'error': f'Invalid payload: {e}'}), 400
         
-        # Add power events
-        for event_data in events:
-            power_event = PowerEvent(
-                device_id=device.id,
-                event_type=event_data.get('event_type'),
-                timestamp=datetime.fromisoformat(event_data.get('timestamp')) if event_data.get('timestamp') else datetime.utcnow(),
-                details=event_data.get('details')
-            )
-            db.session.add(power_event)
+        device_cache.touch(device_pk)
+        
+        if ingest_spool is not None:
+            return _queue_upload(device_pk, device_id, 'power_events', data)
+        
+        # Add power events in one executemany
+        insert_power_events(device_pk, events)
+        event_broker.record('power_events', device_id)
         
         db.session.commit()
+        response_cache.invalidate(device_id)
+        event_broker.publish('power_events', device_id, events)
         
         return jsonify({
             'message': f'{len(events)} power events submitted successfully'
         }), 200
         
     except Exception as e:
-        db.session.rollback()
-        return jsonify({'error': str(e)}), 500
+        return _ingest_failed(device_id, e)
 
 @api.route('/devices/<device_id>/system_stats', methods=['POST'])
 @require_api_key
@@ -111,49 +196,103 @@ def submit_system_stats(device_id):
         data = request.get_json()
         stats = data.get('stats', [])
         
-        # Find device
-        device = Device.query.filter_by(device_id=device_id).first()
-        if not device:
+        # Find device (cached pk, last_seen written in periodic batches)
+        device_pk = device_cache.get_pk(device_id)
+        if device_pk is None:
             return jsonify({'error': 'Device not found'}), 404
         
-        # Update last seen
-        device.last_seen = datetime.utcnow()
-        
-        # Add system stats
-        for stat_data in stats:
-            system_stat = SystemStat(
-                device_id=device.id,
-                timestamp=datetime.fromisoformat(stat_data.get('timestamp')) if stat_data.get('timestamp') else datetime.utcnow(),
-                cpu_percent=stat_data.get('cpu_percent'),
-                memory_percent=stat_data.get('memory_percent'),
-                disk_percent=stat_data.get('disk_percent'),
-                uptime=stat_data.get('uptime')
-            )
-            db.session.add(system_stat)
+        try:
+            validate_upload('system_stats', data)
+        except ValueError as e:
+            return jsonify({'error': f'Invalid payload: {e}'}), 400
+        
+        device_cache.touch(device_pk)
+        
+        if ingest_spool is not None:
+            return _queue_upload(device_pk, device_id, 'system_stats', data)
+        
+        # Add system stats in one executemany
+        insert_system_stats(device_pk, stats)
+        event_broker.record('system_stats', device_id)
         
         db.session.commit()
+        response_cache.invalidate(device_id)
+        event_broker.publish('system_stats', device_id, stats)
         
         return jsonify({
             'message': f'{len(stats)} system stats submitted successfully'
         }), 200
         
     except Exception as e:
-        db.session.rollback()
-        return jsonify({'error': str(e)}), 500
+        return _ingest_failed(device_id, e)
+
+@api.route('/devices/<device_id>/batch', methods=['POST'])
+@require_api_key
+def submit_batch(device_id):
+    """Submit power events, session events, system stats and metric samples in one transaction"""
+    try:
+        try:
+            data = _read_batch_payload()
+        except codec.UnsupportedEncoding as e:
+            return jsonify({'error': str(e)}), 415
+        except ValueError as e:
+            return jsonify({'error': f'Invalid payload: {e}'}), 400
+        
+        # Find device (cached pk, last_seen written in periodic batches)
+        device_pk = device_cache.get_pk(device_id)
+        if device_pk is None:
+            return jsonify({'error': 'Device not found'}), 404
+        
+        try:
+            validate_upload('batch', data)
+        except ValueError as e:
+            return jsonify({'error': f'Invalid payload: {e}'}), 400
+        
+        device_cache.touch(device_pk)
+        
+        if ingest_spool is not None:
+            return _queue_upload(device_pk, device_id, 'batch', data)
+        
+        counts = ingest_batch(device_pk, data)
+        published = [table for table in ('power_events', 'system_stats') if data.get(table)]
+        for table in published:
+            event_broker.record(table, device_id)
+        
+        db.session.commit()
+        response_cache.invalidate(device_id)
+        for table in published:
+            event_broker.publish(table, device_id, data[table])
+        
+        return jsonify({
+            'message': f'{sum(counts.values())} records submitted successfully',
+            'counts': counts
+        }), 200
+        
+    except Exception as e:
+        return _ingest_failed(device_id, e)
 
 @api.route('/devices', methods=['GET'])
+@response_cache.cached
 def get_devices():
-    """Get all devices"""
+    """
+    Get devices, most recently seen first
+    Optional: limit, before/after cursor, from/to on last_seen, fields projection
+    """
     try:
-        devices = Device.query.order_by(Device.last_seen.desc()).all()
-        return jsonify({
-            'devices': [device.to_dict() for device in devices],
-            'total': len(devices)
+        # last_seen lags ingest by up to LAST_SEEN_FLUSH_INTERVAL (written by the background flusher)
+        devices, cursor = fetch_page(Device, Device.last_seen, request.args)
+        return json_response({
+            'devices': devices,
+            'total': len(devices),
+            'next_cursor': cursor
         }), 200
+    except InvalidQuery as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @api.route('/devices/<device_id>', methods=['GET'])
+@response_cache.cached
 def get_device(device_id):
     """Get a specific device"""
     try:
@@ -166,123 +305,257 @@ def get_device(device_id):
         return jsonify({'error': str(e)}), 500
 
 @api.route('/devices/<device_id>/stats', methods=['GET'])
+@response_cache.cached
 def get_device_stats(device_id):
-    """Get system statistics for a device"""
+    """
+    Get system statistics for a device, newest first
+    Optional: limit, resolution, before/after cursor, from/to window, fields projection
+    """
     try:
-        device = Device.query.filter_by(device_id=device_id).first()
-        if not device:
+        device_pk = device_cache.get_pk(device_id)
+        if device_pk is None:
             return jsonify({'error': 'Device not found'}), 404
         
         # Get query parameters
-        limit = request.args.get('limit', 50, type=int)
+        resolution = request.args.get('resolution', 'raw')
+        
+        if resolution == 'raw':
+            # Get recent stats
+            stats, cursor = fetch_page(
+                SystemStat, SystemStat.timestamp, request.args,
+                filters=[SystemStat.device_id == device_pk],
+                default_limit=50
+            )
+        elif resolution in RESOLUTIONS:
+            # Rollup rows are derived in to_dict, so fields= filters the serialized keys
+            fields = parse_fields(request.args.get('fields'), ROLLUP_FIELDS)
+            query, limit = keyset_page(
+                db.select(SystemStatRollup).where(
+                    SystemStatRollup.device_id == device_pk,
+                    SystemStatRollup.resolution == resolution
+                ),
+                SystemStatRollup.bucket_start, SystemStatRollup.id, request.args, default_limit=50
+            )
+            rollups = db.session.execute(query).scalars().all()
+            stats = [rollup.to_dict() for rollup in rollups]
+            if fields:
+                stats = [{name: stat[name] for name in fields} for stat in stats]
+            cursor = next_cursor(rollups, limit, 'bucket_start', 'id')
+        else:
+            allowed = ', '.join(['raw'] + list(RESOLUTIONS))
+            return jsonify({'error': f'resolution must be one of: {allowed}'}), 400
         
-        # Get recent stats
-        stats = SystemStat.query.filter_by(device_id=device.id)\
-            .order_by(SystemStat.timestamp.desc())\
-            .limit(limit)\
-            .all()
+        return json_response({
+            'device_id': device_id,
+            'resolution': resolution,
+            'stats': stats,
+            'total': len(stats),
+            'next_cursor': cursor
+        }), 200
+    except InvalidQuery as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/devices/<device_id>/metric_samples', methods=['GET'])
+@response_cache.cached
+def get_metric_samples(device_id):
+    """
+    Get detailed metric samples for a device, newest first
+    Optional: metric (e.g. fs.percent), label, limit, before/after cursor, from/to window, fields projection
+    """
+    try:
+        device_pk = device_cache.get_pk(device_id)
+        if device_pk is None:
+            return jsonify({'error': 'Device not found'}), 404
         
-        return jsonify({
+        filters = [MetricSample.device_id == device_pk]
+        if request.args.get('metric'):
+            filters.append(MetricSample.metric == request.args['metric'])
+            if request.args.get('label') is not None:
+                filters.append(MetricSample.label == request.args['label'])
+        
+        samples, cursor = fetch_page(
+            MetricSample, MetricSample.timestamp, request.args,
+            filters=filters,
+            default_limit=200
+        )
+        
+        return json_response({
             'device_id': device_id,
-            'stats': [stat.to_dict() for stat in stats],
-            'total': len(stats)
+            'samples': samples,
+            'total': len(samples),
+            'next_cursor': cursor
         }), 200
+    except InvalidQuery as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @api.route('/devices/<device_id>/power_events', methods=['GET'])
+@response_cache.cached
 def get_power_events(device_id):
-    """Get power events for a device"""
+    """
+    Get power events for a device, newest first
+    Optional: limit, before/after cursor, from/to window, fields projection
+    """
     try:
-        device = Device.query.filter_by(device_id=device_id).first()
-        if not device:
+        device_pk = device_cache.get_pk(device_id)
+        if device_pk is None:
             return jsonify({'error': 'Device not found'}), 404
         
-        # Get query parameters
-        limit = request.args.get('limit', 50, type=int)
-        
         # Get recent events
-        events = PowerEvent.query.filter_by(device_id=device.id)\
-            .order_by(PowerEvent.timestamp.desc())\
-            .limit(limit)\
-            .all()
+        events, cursor = fetch_page(
+            PowerEvent, PowerEvent.timestamp, request.args,
+            filters=[PowerEvent.device_id == device_pk],
+            default_limit=50
+        )
         
-        return jsonify({
+        return json_response({
             'device_id': device_id,
-            'events': [event.to_dict() for event in events],
-            'total': len(events)
+            'events': events,
+            'total': len(events),
+            'next_cursor': cursor
         }), 200
+    except InvalidQuery as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @api.route('/devices/<device_id>/screenshots', methods=['POST'])
 @require_api_key
 def upload_screenshot(device_id):
-    """Upload a screenshot from a device"""
+    """
+    Upload a screenshot from a device
+    A JSON body {"sha256": ..., "filename": ...} instead of a file records a screenshot
+    the device already uploaded once, without sending it again (404 if it isn't stored)
+    """
+    written_new = False
+    committed = False
     try:
         # Find device
-        device = Device.query.filter_by(device_id=device_id).first()
-        if not device:
+        device_pk = device_cache.get_pk(device_id)
+        if device_pk is None:
             return jsonify({'error': 'Device not found'}), 404
         
-        # Check if file is present
-        if 'file' not in request.files:
-            return jsonify({'error': 'No file provided'}), 400
-        
-        file = request.files['file']
-        if file.filename == '':
-            return jsonify({'error': 'Empty filename'}), 400
-        
-        # Secure the filename and save
-        filename = secure_filename(file.filename)
-        
-        # Create screenshots directory if not exists
-        screenshot_dir = Path(__file__).parent.parent / 'screenshots'
-        screenshot_dir.mkdir(exist_ok=True)
-        
-        # Save file
-        filepath = screenshot_dir / filename
-        file.save(str(filepath))
-        
-        # Get file size in KB
-        filesize = filepath.stat().st_size / 1024
+        if request.is_json:
+            data = request.get_json(silent=True) or {}
+            sha256 = data.get('sha256')
+            if not isinstance(sha256, str) or not SHA256_PATTERN.match(sha256):
+                return jsonify({'error': 'Invalid sha256'}), 400
+            
+            filepath = blob_store.path(device_pk, sha256)
+            if not filepath.exists():
+                return jsonify({'error': 'Screenshot not stored', 'stored': False}), 404
+            
+            filename = secure_filename(str(data.get('filename') or f'{sha256}.jpg'))
+            size = filepath.stat().st_size
+        else:
+            # Check if file is present
+            if 'file' not in request.files:
+                return jsonify({'error': 'No file provided'}), 400
+            
+            file = request.files['file']
+            if file.filename == '':
+                return jsonify({'error': 'Empty filename'}), 400
+            
+            # The body was hashed while it streamed to a temp file (see UploadRequest);
+            # an identical earlier upload from this device means nothing new is written
+            sha256, size, written_new = blob_store.commit(device_pk, file.stream)
+            filename = secure_filename(file.filename)
         
         # Add to database
         screenshot = Screenshot(
-            device_id=device.id,
+            device_id=device_pk,
             filename=filename,
-            filesize=filesize,
+            filesize=size / 1024,
+            sha256=sha256,
             timestamp=datetime.utcnow()
         )
         db.session.add(screenshot)
-        
-        # Keep only 3 screenshots per device
-        screenshots = Screenshot.query.filter_by(device_id=device.id)\
-            .order_by(Screenshot.timestamp.desc())\
-            .all()
-        
-        if len(screenshots) > 3:
-            # Delete oldest screenshots
-            for old_screenshot in screenshots[3:]:
-                # Delete file
-                old_filepath = screenshot_dir / old_screenshot.filename
-                if old_filepath.exists():
-                    old_filepath.unlink()
-                # Delete from database
-                db.session.delete(old_screenshot)
+        db.session.flush()
+        
+        # Keep only the newest screenshots, in one delete served by ix_screenshots_device_timestamp
+        newest = db.select(Screenshot.id)\
+            .where(Screenshot.device_id == device_pk)\
+            .order_by(Screenshot.timestamp.desc(), Screenshot.id.desc())\
+            .limit(SCREENSHOTS_PER_DEVICE)
+        pruned = db.session.execute(
+            db.delete(Screenshot)
+            .where(Screenshot.device_id == device_pk, Screenshot.id.not_in(newest))
+            .returning(Screenshot.sha256, Screenshot.filename)
+            .execution_options(synchronize_session=False)
+        ).all()
         
         db.session.commit()
+        committed = True
+        response_cache.invalidate(device_id)
+        
+        if pruned:
+            try:
+                _remove_screenshot_files(device_pk, pruned)
+            except Exception as e:
+                # The screenshot is stored; a file left behind only costs space
+                current_app.logger.warning(f"Could not remove pruned screenshot files for device {device_id}: {e}")
         
         return jsonify({
             'message': 'Screenshot uploaded successfully',
-            'screenshot': screenshot.to_dict()
+            'deduplicated': not written_new,
+            'screenshot': _screenshot_dict(screenshot, device_id)
         }), 200
         
     except Exception as e:
         db.session.rollback()
+        if written_new and not committed:
+            # A concurrent upload of the same image may have recorded the blob meanwhile
+            try:
+                _delete_unreferenced_blob(device_pk, sha256)
+            except Exception as cleanup_error:
+                current_app.logger.warning(f"Could not remove screenshot blob for device {device_id}: {cleanup_error}")
         return jsonify({'error': str(e)}), 500
 
+def _delete_unreferenced_blob(device_pk, sha256):
+    """
+    Delete a device's blob unless a committed screenshot still references it
+    Checked per blob right before unlinking, so an upload that deduplicated
+    against it after our own commit keeps its file
+    :return: True if the file was deleted
+    """
+    referenced = db.session.execute(
+        db.select(
+            db.select(Screenshot.id)
+            .where(Screenshot.device_id == device_pk, Screenshot.sha256 == sha256)
+            .exists()
+        )
+    ).scalar()
+    db.session.rollback()
+    if referenced:
+        return False
+    blob_store.delete(device_pk, sha256)
+    return True
+
+def _remove_screenshot_files(device_pk, pruned):
+    """Delete the files of pruned screenshots that no committed screenshot still shares"""
+    checked = set()
+    for sha256, filename in pruned:
+        if sha256 is None:
+            # Uploaded before the blob store existed
+            (LEGACY_SCREENSHOT_DIR / filename).unlink(missing_ok=True)
+        elif sha256 not in checked:
+            checked.add(sha256)
+            _delete_unreferenced_blob(device_pk, sha256)
+
+def _screenshot_dict(screenshot, device_id):
+    """Screenshot as a dict with the URL its image is served from"""
+    data = screenshot.to_dict()
+    if screenshot.sha256:
+        data['url'] = f"/api/v1/devices/{device_id}/screenshots/{screenshot.sha256}"
+    else:
+        data['url'] = f"/api/v1/screenshots/{screenshot.filename}"
+    return data
+
 @api.route('/devices/<device_id>/screenshots', methods=['GET'])
+@response_cache.cached
 def get_screenshots(device_id):
     """Get screenshots for a device"""
     try:
@@ -290,26 +563,46 @@ def get_screenshots(device_id):
         if not device:
             return jsonify({'error': 'Device not found'}), 404
         
-        # Get recent screenshots (max 3)
+        # Get recent screenshots
         screenshots = Screenshot.query.filter_by(device_id=device.id)\
-            .order_by(Screenshot.timestamp.desc())\
-            .limit(3)\
+            .order_by(Screenshot.timestamp.desc(), Screenshot.id.desc())\
+            .limit(SCREENSHOTS_PER_DEVICE)\
             .all()
         
         return jsonify({
             'device_id': device_id,
-            'screenshots': [screenshot.to_dict() for screenshot in screenshots],
+            'screenshots': [_screenshot_dict(screenshot, device_id) for screenshot in screenshots],
             'total': len(screenshots)
         }), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@api.route('/devices/<device_id>/screenshots/<sha256>', methods=['GET'])
+def get_screenshot_blob(device_id, sha256):
+    """Serve a screenshot from the blob store; its content never changes, so clients cache it for good"""
+    try:
+        if not SHA256_PATTERN.match(sha256):
+            return jsonify({'error': 'Screenshot not found'}), 404
+        
+        device_pk = device_cache.get_pk(device_id)
+        if device_pk is None:
+            return jsonify({'error': 'Device not found'}), 404
+        
+        filepath = blob_store.path(device_pk, sha256)
+        if not filepath.exists():
+            return jsonify({'error': 'Screenshot not found'}), 404
+        
+        response = send_file(str(filepath), mimetype='image/jpeg', etag=sha256, max_age=31536000)
+        response.cache_control.immutable = True
+        return response
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @api.route('/screenshots/<filename>', methods=['GET'])
 def get_screenshot_file(filename):
-    """Serve a screenshot file"""
+    """Serve a screenshot file uploaded before the blob store existed"""
     try:
-        screenshot_dir = Path(__file__).parent.parent / 'screenshots'
-        filepath = screenshot_dir / secure_filename(filename)
+        filepath = LEGACY_SCREENSHOT_DIR / secure_filename(filename)
         
         if not filepath.exists():
             return jsonify({'error': 'Screenshot not found'}), 404
@@ -317,3 +610,31 @@ def get_screenshot_file(filename):
         return send_file(str(filepath), mimetype='image/jpeg')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+def _event_stream(device_id=None):
+    """Open an SSE response for one subscriber"""
+    subscription = event_broker.subscribe(device_id)
+    if subscription is None:
+        return jsonify({'error': 'Too many live update clients'}), 503
+    
+    response = Response(
+        subscription.stream(config.SSE_HEARTBEAT),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # Don't let nginx buffer the stream
+        }
+    )
+    # Also covers clients that disconnect before the stream starts
+    response.call_on_close(lambda: event_broker.unsubscribe(subscription))
+    return response
+
+@api.route('/stream', methods=['GET'])
+def stream_all():
+    """Live stats, power events and registrations for every device (server-sent events)"""
+    return _event_stream()
+
+@api.route('/devices/<device_id>/stream', methods=['GET'])
+def stream_device(device_id):
+    """Live stats and power events for one device (server-sent events)"""
+    return _event_stream(device_id)
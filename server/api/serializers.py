@@ -0,0 +1,68 @@
+"""
+Fast JSON serialization for the hot read routes
+Works on raw column tuples instead of ORM objects and encodes with orjson
+when it is installed, falling back to the standard library
+"""
+
+import json
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import DateTime
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _default(value):
+    """Stdlib fallback for values json can't encode natively"""
+    if isinstance(value, datetime):
+        return value.isoformat() + 'Z'
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(obj):
+    """Encode obj as compact JSON bytes; naive datetimes are written as UTC with a Z suffix"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z)
+    return json.dumps(obj, separators=(',', ':'), default=_default).encode()
+
+def json_response(payload):
+    """Build a JSON response with the fast encoder (drop-in for jsonify)"""
+    return current_app.response_class(dumps(payload), mimetype='application/json')
+
+def format_timestamps(values):
+    """
+    Format a column of datetimes the way to_dict does, in one pass
+    Rows from one upload share created_at and often timestamp, so each distinct
+    value is formatted once
+    """
+    cache = {}
+    formatted = []
+    for value in values:
+        if value is None:
+            formatted.append(None)
+            continue
+        text = cache.get(value)
+        if text is None:
+            text = cache[value] = value.isoformat() + 'Z'
+        formatted.append(text)
+    return formatted
+
+def rows_to_dicts(rows, columns):
+    """
+    Turn raw result tuples into response dicts keyed by column name
+    :param rows: Result rows whose leading values line up with columns
+    :param columns: Selected table columns, in select order
+    """
+    names = [column.key for column in columns]
+    if not rows:
+        return []
+
+    values = list(zip(*rows))[:len(names)]
+    # orjson formats datetimes natively; the fallback formats each column in bulk
+    if orjson is None:
+        for i, column in enumerate(columns):
+            if isinstance(column.type, DateTime):
+                values[i] = format_timestamps(values[i])
+
+    return [dict(zip(names, row)) for row in zip(*values)]
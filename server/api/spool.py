@@ -0,0 +1,442 @@
+"""
+Durable ingest spool and writer pool for queued ingest mode
+The ingest routes validate an upload, append it to a local SQLite spool and
+answer 202; writer threads claim spooled uploads under a lease and write many
+of them per database transaction. A worker that dies mid-batch leaves its
+claims to expire, so another writer (in any worker process) picks them up.
+Each write records its spool ids in the same transaction, so an upload whose
+ack was lost (a crash between commit and ack, or a failed spool write) is
+acked on its next claim instead of being written twice.
+A failed write is retried with exponential backoff. Only failures caused by
+the upload itself (integrity or data errors) count toward max_attempts, so a
+database outage delays uploads instead of turning them into dead letters.
+"""
+
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import exc
+from server.models.database import db, PowerEvent, SystemStat, SessionEvent, MetricSample, IngestedUpload
+from server.api.ingest import insert_power_events, insert_system_stats, ingest_batch, validate_rows
+from server.api.response_cache import response_cache
+from server.api.live import event_broker
+from server.config.settings import config
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Upload kind -> {list key: model its rows are written to}
+KINDS = {
+    'power_events': {'events': PowerEvent},
+    'system_stats': {'stats': SystemStat},
+    'batch': {
+        'power_events': PowerEvent, 'session_events': SessionEvent, 'system_stats': SystemStat,
+        'metric_samples': MetricSample
+    }
+}
+
+# How long committed spool ids are remembered; far longer than any lease or retry backoff
+LEDGER_RETENTION = timedelta(days=1)
+
+def _encode(payload):
+    """Serialize a payload for the spool; naive datetimes stay naive so ingest parses them as before"""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(',', ':'), default=lambda v: v.isoformat()).encode()
+
+def _decode(blob):
+    """Inverse of _encode"""
+    return orjson.loads(blob) if orjson is not None else json.loads(blob)
+
+def validate_upload(kind, payload):
+    """
+    Check an upload before it is written or queued (a queued one can no longer be rejected)
+    Both ingest modes apply the same rules, so an upload is accepted by both or by neither
+    :raises ValueError: If a list is malformed, a required field is missing or a value has the wrong type
+    """
+    if not isinstance(payload, dict):
+        raise ValueError('Payload must be a JSON object')
+    for key, model in KINDS[kind].items():
+        validate_rows(model, payload.get(key) or [], key)
+
+def is_transient(error):
+    """True for database outages (connection lost, server restarting, lock timeout), not bad uploads"""
+    if isinstance(error, exc.DBAPIError) and error.connection_invalidated:
+        return True
+    return isinstance(error, (exc.OperationalError, exc.InterfaceError, exc.DisconnectionError, exc.TimeoutError))
+
+def upload_counts(kind, payload):
+    """Number of rows in an upload per key, echoed so the agent knows what was accepted"""
+    return {key: len(payload.get(key) or []) for key in KINDS[kind]}
+
+class IngestSpool:
+    def __init__(self, path, lease_seconds=60, max_attempts=5, retry_backoff=1.0, max_backoff=300):
+        """
+        Initialize the spool
+        :param path: SQLite spool file, shared by all worker processes
+        :param lease_seconds: How long a claimed upload is reserved for its writer
+        :param max_attempts: Failed attempts (bad upload, or the writer died) before
+                             an upload is left aside as a dead letter
+        :param retry_backoff: Seconds before the first retry of a failed write, doubled per failure
+        :param max_backoff: Longest wait between retries in seconds
+        """
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.max_backoff = max_backoff
+        self.local = threading.local()
+        # Wakes writers in this process as soon as something is enqueued
+        self.notify = threading.Event()
+        # Identifies this spool file in the database's record of committed uploads
+        self.uid = None
+        self._init_spool()
+
+    def _init_spool(self):
+        """Create the spool tables (on a throwaway connection, so none leaks across fork)"""
+        connection = sqlite3.connect(self.path, timeout=30)
+        try:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('''
+                CREATE TABLE IF NOT EXISTS spool (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    device_pk INTEGER NOT NULL,
+                    device_id TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    payload BLOB NOT NULL,
+                    received_at REAL NOT NULL,
+                    lease_until REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    failures INTEGER NOT NULL DEFAULT 0,
+                    last_error TEXT
+                )
+            ''')
+            # Spools created before retries backed off
+            columns = [row[1] for row in connection.execute('PRAGMA table_info(spool)')]
+            if 'failures' not in columns:
+                connection.execute('ALTER TABLE spool ADD COLUMN failures INTEGER NOT NULL DEFAULT 0')
+            connection.execute('CREATE TABLE IF NOT EXISTS spool_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+            connection.execute(
+                "INSERT OR IGNORE INTO spool_meta (key, value) VALUES ('uid', ?)", (uuid.uuid4().hex,)
+            )
+            self.uid = connection.execute("SELECT value FROM spool_meta WHERE key = 'uid'").fetchone()[0]
+            connection.commit()
+        finally:
+            connection.close()
+
+    def _connection(self):
+        """Per-thread connection in autocommit mode (transactions are explicit)"""
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            # An accepted (202) upload must survive power loss
+            connection.execute('PRAGMA synchronous=FULL')
+            self.local.connection = connection
+        return connection
+
+    def enqueue(self, device_pk, device_id, kind, payload):
+        """Append an upload to the spool"""
+        self._connection().execute(
+            'INSERT INTO spool (device_pk, device_id, kind, payload, received_at) VALUES (?, ?, ?, ?, ?)',
+            (device_pk, device_id, kind, _encode(payload), time.time())
+        )
+        self.notify.set()
+
+    def claim(self, limit):
+        """
+        Lease up to `limit` of the oldest available uploads
+        Each claim counts as an attempt until release() refunds it, so an upload
+        whose writer keeps dying still ends up a dead letter
+        :return: List of dicts with id, device_pk, device_id, kind, payload, received_at
+        """
+        connection = self._connection()
+        now = time.time()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            rows = connection.execute('''
+                SELECT id, device_pk, device_id, kind, payload, received_at FROM spool
+                WHERE attempts < ? AND (lease_until IS NULL OR lease_until < ?)
+                ORDER BY id LIMIT ?
+            ''', (self.max_attempts, now, limit)).fetchall()
+            if rows:
+                connection.execute(
+                    f"UPDATE spool SET lease_until = ?, attempts = attempts + 1 "
+                    f"WHERE id IN ({','.join('?' * len(rows))})",
+                    [now + self.lease_seconds] + [row[0] for row in rows]
+                )
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+
+        return [
+            {
+                'id': row[0],
+                'device_pk': row[1],
+                'device_id': row[2],
+                'kind': row[3],
+                'payload': _decode(row[4]),
+                'received_at': row[5]
+            }
+            for row in rows
+        ]
+
+    def ack(self, ids):
+        """Remove uploads that were committed to the database"""
+        self._connection().execute(f"DELETE FROM spool WHERE id IN ({','.join('?' * len(ids))})", ids)
+
+    def release(self, ids, error, transient=False):
+        """
+        Give uploads back for another attempt after a failed write
+        They become available again after retry_backoff * 2^failures seconds (capped)
+        :param transient: The database was unavailable; the attempt doesn't count toward max_attempts
+        """
+        self._connection().execute(
+            f"UPDATE spool SET lease_until = ? + MIN(?, ? * (1 << MIN(failures, 20))), "
+            f"failures = failures + 1, attempts = attempts - ?, last_error = ? "
+            f"WHERE id IN ({','.join('?' * len(ids))})",
+            [time.time(), self.max_backoff, self.retry_backoff, 1 if transient else 0, error] + list(ids)
+        )
+
+    def dead_letters(self, limit=100):
+        """Uploads left aside after max_attempts, oldest first"""
+        rows = self._connection().execute('''
+            SELECT id, device_id, kind, received_at, attempts, last_error FROM spool
+            WHERE attempts >= ? ORDER BY id LIMIT ?
+        ''', (self.max_attempts, limit)).fetchall()
+        return [
+            {
+                'id': row[0],
+                'device_id': row[1],
+                'kind': row[2],
+                'received_at': row[3],
+                'attempts': row[4],
+                'last_error': row[5]
+            }
+            for row in rows
+        ]
+
+    def requeue_dead_letters(self, ids=None):
+        """
+        Give dead letters a fresh set of attempts (e.g. after fixing what rejected them)
+        :param ids: Spool ids to requeue, None for all of them
+        :return: Number of uploads requeued
+        """
+        query = 'UPDATE spool SET attempts = 0, failures = 0, lease_until = NULL WHERE attempts >= ?'
+        params = [self.max_attempts]
+        if ids is not None:
+            if not ids:
+                return 0
+            query += f" AND id IN ({','.join('?' * len(ids))})"
+            params += list(ids)
+        count = self._connection().execute(query, params).rowcount
+        if count:
+            self.notify.set()
+        return count
+
+    def stats(self):
+        """Queue depth, uploads waiting to retry, dead letters and the age of the oldest waiting upload"""
+        depth, oldest, retrying, dead = self._connection().execute('''
+            SELECT
+                SUM(attempts < ?),
+                MIN(CASE WHEN attempts < ? THEN received_at END),
+                SUM(attempts < ? AND failures > 0),
+                SUM(attempts >= ?)
+            FROM spool
+        ''', (self.max_attempts,) * 4).fetchone()
+        return {
+            'depth': depth or 0,
+            'retrying': retrying or 0,
+            'dead_letters': dead or 0,
+            'oldest_age_seconds': round(time.time() - oldest, 3) if oldest else 0
+        }
+
+class IngestWriter:
+    def __init__(self, app, spool, writers=2, batch_size=200, poll_interval=1.0):
+        """
+        Initialize the writer pool
+        :param app: Flask app, used for an app context in the writer threads
+        :param spool: IngestSpool to drain
+        :param writers: Writer threads
+        :param batch_size: Maximum uploads written per transaction
+        :param poll_interval: Seconds between spool checks when idle (uploads
+                              accepted by this process wake writers immediately)
+        """
+        self.app = app
+        self.spool = spool
+        self.writers = writers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.stop_event = threading.Event()
+        self.threads = []
+        self.lock = threading.Lock()
+        self.uploads_written = 0
+        self.rows_written = 0
+        self.transactions = 0
+        self.failures = 0
+        self.last_lag = None
+        self.max_lag = 0.0
+        self._next_prune = 0.0
+
+    def start(self):
+        """Start the writer threads"""
+        for i in range(self.writers):
+            thread = threading.Thread(target=self._loop, name=f'IngestWriter-{i}', daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self):
+        """Stop the writer threads; unwritten uploads stay in the spool"""
+        self.stop_event.set()
+        self.spool.notify.set()
+        for thread in self.threads:
+            thread.join(timeout=5)
+
+    def _loop(self):
+        """Claim and write batches until stopped; an unexpected error backs the writer off instead of ending it"""
+        errors = 0
+        while not self.stop_event.is_set():
+            try:
+                self._step()
+                errors = 0
+            except Exception as e:
+                # Claimed uploads stay leased and are picked up again once the lease expires
+                errors += 1
+                delay = min(self.spool.max_backoff, self.poll_interval * (1 << min(errors, 20)))
+                self.app.logger.error(f"Ingest writer failed, retrying in {delay:.1f}s: {e}")
+                self.stop_event.wait(delay)
+
+    def _step(self):
+        """Claim and write one batch, or wait for uploads when the spool is empty"""
+        self.spool.notify.clear()
+        entries = self.spool.claim(self.batch_size)
+        if not entries:
+            self._prune_ledger()
+            self.spool.notify.wait(self.poll_interval)
+            return
+
+        with self.app.app_context():
+            written = self._write(entries)
+        if not written:
+            # The database is unavailable and the uploads are backing off; so does this writer
+            self.stop_event.wait(self.poll_interval)
+
+    def _prune_ledger(self):
+        """Forget committed spool ids older than LEDGER_RETENTION, at most once an hour"""
+        if time.monotonic() < self._next_prune:
+            return
+        self._next_prune = time.monotonic() + 3600
+        with self.app.app_context():
+            table = IngestedUpload.__table__
+            db.session.execute(table.delete().where(table.c.created_at < datetime.utcnow() - LEDGER_RETENTION))
+            db.session.commit()
+
+    def _written(self, ids):
+        """Spool ids among these that an earlier transaction already committed"""
+        table = IngestedUpload.__table__
+        return set(db.session.execute(
+            db.select(table.c.upload_id).where(table.c.spool == self.spool.uid, table.c.upload_id.in_(ids))
+        ).scalars())
+
+    def _apply(self, entry):
+        """Insert one spooled upload in the current transaction, returns rows written"""
+        received = datetime.utcfromtimestamp(entry['received_at'])
+        payload = entry['payload']
+        if entry['kind'] == 'power_events':
+            return insert_power_events(entry['device_pk'], payload.get('events', []), received)
+        if entry['kind'] == 'system_stats':
+            return insert_system_stats(entry['device_pk'], payload.get('stats', []), received)
+        return sum(ingest_batch(entry['device_pk'], payload, received).values())
+
+    def _write(self, entries):
+        """
+        Write uploads in one transaction, isolating any upload that fails
+        Uploads already committed by an earlier claim are only acked
+        :return: False if the database was unavailable (the uploads are released to retry later)
+        """
+        ids = [entry['id'] for entry in entries]
+        try:
+            written = self._written(ids)
+            entries = [entry for entry in entries if entry['id'] not in written]
+            rows = sum(self._apply(entry) for entry in entries)
+            for entry in entries:
+                for event in self._events(entry['payload']):
+                    event_broker.record(event, entry['device_id'])
+            if entries:
+                # Same transaction as the rows, so a replay after a lost ack is recognized
+                now = datetime.utcnow()
+                db.session.execute(IngestedUpload.__table__.insert(), [
+                    {'spool': self.spool.uid, 'upload_id': entry['id'], 'created_at': now} for entry in entries
+                ])
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            transient = is_transient(e)
+            if len(entries) > 1 and not transient:
+                # One bad upload must not hold back the rest of the batch
+                for entry in entries:
+                    self._write([entry])
+                return True
+            self.spool.release([entry['id'] for entry in entries], str(e), transient)
+            with self.lock:
+                self.failures += 1
+            if transient:
+                self.app.logger.warning(f"Database unavailable, {len(entries)} spooled uploads will be retried: {e}")
+            else:
+                self.app.logger.error(f"Ingest of spooled upload {entries[0]['id']} failed: {e}")
+            return not transient
+
+        try:
+            self.spool.ack(ids)
+        except sqlite3.Error as e:
+            self.app.logger.warning(f"Ack of {len(ids)} committed uploads failed, they are skipped when claimed again: {e}")
+        if not entries:
+            return True
+
+        lag = time.time() - min(entry['received_at'] for entry in entries)
+        with self.lock:
+            self.uploads_written += len(entries)
+            self.rows_written += rows
+            self.transactions += 1
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+
+        for entry in entries:
+            response_cache.invalidate(entry['device_id'])
+            for event, data in self._events(entry['payload']).items():
+                event_broker.publish(event, entry['device_id'], data)
+        return True
+
+    @staticmethod
+    def _events(payload):
+        """Live update event -> rows for one upload, whichever kind it is"""
+        events = {}
+        for key, event in (('events', 'power_events'), ('stats', 'system_stats'),
+                           ('power_events', 'power_events'), ('system_stats', 'system_stats')):
+            if payload.get(key):
+                events[event] = payload[key]
+        return events
+
+    def stats(self):
+        """Writer counters plus spool depth and lag"""
+        with self.lock:
+            stats = {
+                'uploads_written': self.uploads_written,
+                'rows_written': self.rows_written,
+                'transactions': self.transactions,
+                'failures': self.failures,
+                'last_lag_seconds': round(self.last_lag, 3) if self.last_lag is not None else None,
+                'max_lag_seconds': round(self.max_lag, 3)
+            }
+        stats.update(self.spool.stats())
+        return stats
+
+ingest_spool = IngestSpool(
+    config.INGEST_SPOOL_PATH, config.INGEST_LEASE_SECONDS, config.INGEST_MAX_ATTEMPTS,
+    config.INGEST_RETRY_BACKOFF, config.INGEST_MAX_BACKOFF
+) if config.INGEST_MODE == 'queued' else None
@@ -13,19 +13,46 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 
 from server.config.settings import config
-from server.models.database import db, Device, SystemStat, PowerEvent, Screenshot
+from server.models.database import db, Device, SystemStat, PowerEvent, Screenshot, SystemStatRollup
 from server.api.routes import api
+from server.api.response_cache import response_cache
+from server.models.migrations import upgrade_schema
+from server.api.retention import Compactor
+from server.api.spool import ingest_spool, IngestWriter
+from server.api.device_cache import device_cache
+from server.api.live import event_broker
+from server.storage.blob_store import UploadRequest
 
-def create_app():
-    """Create and configure the Flask application"""
+def init_database(app):
+    """Create tables and apply schema upgrades (run once per deployment, not per worker)"""
+    with app.app_context():
+        if db.engine.dialect.name == 'sqlite':
+            # Readers don't block the writer; the mode is stored in the database file
+            db.session.execute(db.text('PRAGMA journal_mode=WAL'))
+        db.create_all()
+        for change in upgrade_schema():
+            print(f"🔧 Schema upgrade: created {change}")
+        print("✅ Database initialized successfully")
+
+def create_app(init_db=True, background_tasks=True):
+    """
+    Create and configure the Flask application
+    :param init_db: Create tables and upgrade the schema (the gunicorn master does this once instead)
+    :param background_tasks: Start the last_seen flush and change feed threads, the retention
+                             compactor (only the process holding its lock file compacts) and,
+                             in queued ingest mode, the spool writer pool
+    """
     app = Flask(__name__,
                 template_folder='dashboard/templates',
                 static_folder='dashboard/static')
+    # Stream uploaded files into the screenshot store instead of buffering them
+    app.request_class = UploadRequest
     
     # Load configuration
     app.config['SECRET_KEY'] = config.SECRET_KEY
     app.config['SQLALCHEMY_DATABASE_URI'] = config.SQLALCHEMY_DATABASE_URI
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = config.SQLALCHEMY_TRACK_MODIFICATIONS
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = config.SQLALCHEMY_ENGINE_OPTIONS
     app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0  # Disable static file caching
     
     # Initialize extensions
@@ -36,9 +63,37 @@ def create_app():
     app.register_blueprint(api)
     
     # Create database tables
-    with app.app_context():
-        db.create_all()
-        print("✅ Database initialized successfully")
+    if init_db:
+        init_database(app)
+    
+    # Periodic last_seen writes for devices seen by this process, and the
+    # change feed carrying live updates and cache invalidations between processes
+    if background_tasks:
+        device_cache.start(app)
+        event_broker.start(app)
+    
+    # Background retention/compaction
+    if background_tasks and config.RETENTION_ENABLED:
+        compactor = Compactor(
+            app,
+            config.RETENTION_POLICY,
+            batch_size=config.COMPACTION_BATCH_SIZE,
+            interval=config.COMPACTION_INTERVAL,
+            lock_path=config.COMPACTION_LOCK_FILE
+        )
+        compactor.start()
+        app.extensions['compactor'] = compactor
+    
+    # Writer pool draining the ingest spool
+    if background_tasks and ingest_spool is not None:
+        writer = IngestWriter(
+            app,
+            ingest_spool,
+            writers=config.INGEST_WRITERS,
+            batch_size=config.INGEST_BATCH_SIZE
+        )
+        writer.start()
+        app.extensions['ingest_writer'] = writer
     
     # Dashboard routes
     @app.route('/')
@@ -63,6 +118,7 @@ def create_app():
     
     # Dashboard API endpoints (for frontend)
     @app.route('/dashboard/api/stats')
+    @response_cache.cached
     def dashboard_stats():
         """Get overall statistics for dashboard"""
         try:
@@ -70,12 +126,20 @@ def create_app():
             active_devices = Device.query.filter_by(is_active=True).count()
             total_events = PowerEvent.query.count()
             
-            # Get latest stats across all devices
-            latest_stats = db.session.query(
-                db.func.avg(SystemStat.cpu_percent).label('avg_cpu'),
-                db.func.avg(SystemStat.memory_percent).label('avg_memory'),
-                db.func.avg(SystemStat.disk_percent).label('avg_disk')
-            ).first()
+            # Average across all devices from the daily rollup tier (one row per device per day)
+            if db.session.query(SystemStatRollup.id).filter_by(resolution='1d').first():
+                latest_stats = db.session.query(
+                    (db.func.sum(SystemStatRollup.cpu_sum) / db.func.sum(SystemStatRollup.cpu_count)).label('avg_cpu'),
+                    (db.func.sum(SystemStatRollup.memory_sum) / db.func.sum(SystemStatRollup.memory_count)).label('avg_memory'),
+                    (db.func.sum(SystemStatRollup.disk_sum) / db.func.sum(SystemStatRollup.disk_count)).label('avg_disk')
+                ).filter(SystemStatRollup.resolution == '1d').first()
+            else:
+                # Databases that predate rollups until scripts/rebuild_rollups.py is run
+                latest_stats = db.session.query(
+                    db.func.avg(SystemStat.cpu_percent).label('avg_cpu'),
+                    db.func.avg(SystemStat.memory_percent).label('avg_memory'),
+                    db.func.avg(SystemStat.disk_percent).label('avg_disk')
+                ).first()
             
             return jsonify({
                 'total_devices': total_devices,
@@ -110,6 +174,7 @@ def main():
     print(f"📊 Dashboard: http://localhost:{config.PORT}")
     print(f"🔌 API: http://localhost:{config.PORT}/api/v1")
     print(f"🗄️  Database: {config.DATABASE_TYPE}")
+    print("💡 Development server; for production run: python server/serve.py")
     print("=" * 80)
     print("Press Ctrl+C to stop the server")
     print("=" * 80)
@@ -15,26 +15,81 @@ class ServerConfig:
     def __init__(self):
         # Flask settings
         self.SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
-        self.DEBUG = os.getenv('DEBUG', 'True').lower() == 'true'
+        self.DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
         
         # Server settings
         self.HOST = os.getenv('SERVER_HOST', '0.0.0.0')
         self.PORT = int(os.getenv('SERVER_PORT', 5000))
         
+        # Production (gunicorn) settings, see server/serve.py
+        self.WORKERS = int(os.getenv('SERVER_WORKERS', 2))
+        self.THREADS = int(os.getenv('SERVER_THREADS', 16))  # per worker; each live update client holds one
+        self.GRACEFUL_TIMEOUT = int(os.getenv('SERVER_GRACEFUL_TIMEOUT', 30))  # seconds
+        
         # Database settings
         self.DATABASE_TYPE = os.getenv('DATABASE_TYPE', 'sqlite')
         self.DATABASE_PATH = os.getenv('DATABASE_PATH', 'server_data.db')
         self.SQLALCHEMY_DATABASE_URI = self._get_database_uri()
         self.SQLALCHEMY_TRACK_MODIFICATIONS = False
+        self.SQLALCHEMY_ENGINE_OPTIONS = self._get_engine_options()
         
         # API settings
         self.API_KEY = os.getenv('API_KEY', 'dev-key-123')
         self.API_VERSION = 'v1'
+        self.MAX_DECODED_PAYLOAD = int(os.getenv('MAX_DECODED_PAYLOAD', 64 * 1024 * 1024))  # bytes
+        self.DEVICE_CACHE_SIZE = int(os.getenv('DEVICE_CACHE_SIZE', 10000))  # device_id -> pk entries
+        self.LAST_SEEN_FLUSH_INTERVAL = int(os.getenv('LAST_SEEN_FLUSH_INTERVAL', 30))  # seconds
+        self.DEVICE_CACHE_TTL = int(os.getenv('DEVICE_CACHE_TTL', 300))  # seconds before a cached pk is re-checked
+        self.RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', 1024))  # cached GET responses
+        self.RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', 120))  # seconds, longer than client polls
+        
+        # Screenshot blob store, content-addressed per device
+        self.SCREENSHOT_STORE_PATH = os.getenv(
+            'SCREENSHOT_STORE_PATH', str(Path(__file__).parent.parent / 'screenshot_store')
+        )
+        
+        # Ingest mode: 'sync' writes in the request, 'queued' spools and answers 202
+        self.INGEST_MODE = os.getenv('INGEST_MODE', 'sync').lower()
+        self.INGEST_SPOOL_PATH = os.getenv(
+            'INGEST_SPOOL_PATH', str(Path(__file__).parent.parent / 'ingest_spool.db')
+        )
+        self.INGEST_WRITERS = int(os.getenv('INGEST_WRITERS', 2))  # writer threads per worker
+        self.INGEST_BATCH_SIZE = int(os.getenv('INGEST_BATCH_SIZE', 200))  # uploads per transaction
+        self.INGEST_LEASE_SECONDS = int(os.getenv('INGEST_LEASE_SECONDS', 60))
+        self.INGEST_MAX_ATTEMPTS = int(os.getenv('INGEST_MAX_ATTEMPTS', 5))  # bad-upload failures before dead letter
+        self.INGEST_RETRY_BACKOFF = float(os.getenv('INGEST_RETRY_BACKOFF', 1))  # seconds, doubled per failure
+        self.INGEST_MAX_BACKOFF = int(os.getenv('INGEST_MAX_BACKOFF', 300))  # seconds
+        
+        # Live update (server-sent events) settings
+        self.SSE_QUEUE_SIZE = int(os.getenv('SSE_QUEUE_SIZE', 100))  # messages buffered per client
+        self.SSE_MAX_CLIENTS = int(os.getenv('SSE_MAX_CLIENTS', 100))  # per process; gunicorn workers allow threads / 4
+        self.SSE_HEARTBEAT = int(os.getenv('SSE_HEARTBEAT', 15))  # seconds
+        self.SSE_FEED_INTERVAL = float(os.getenv('SSE_FEED_INTERVAL', 2))  # seconds between change feed polls
+        self.SSE_FEED_RETENTION = int(os.getenv('SSE_FEED_RETENTION', 600))  # seconds feed rows are kept
+        self.SSE_FEED_LOOKBACK = int(os.getenv('SSE_FEED_LOOKBACK', 60))  # seconds a skipped feed id is waited for
         
         # Dashboard settings
         self.ITEMS_PER_PAGE = 20
         self.CHART_DATA_POINTS = 50
         
+        # Retention settings (days to keep, 0 keeps forever). Off unless opted in,
+        # so upgrading never deletes history on its own
+        self.RETENTION_ENABLED = os.getenv('RETENTION_ENABLED', 'False').lower() == 'true'
+        self.RETENTION_POLICY = {
+            'system_stats': int(os.getenv('RETENTION_SYSTEM_STATS_DAYS', 90)),
+            'power_events': int(os.getenv('RETENTION_POWER_EVENTS_DAYS', 0)),
+            'session_events': int(os.getenv('RETENTION_SESSION_EVENTS_DAYS', 0)),
+            'metric_samples': int(os.getenv('RETENTION_METRIC_SAMPLES_DAYS', 30)),
+            'rollup_1m': int(os.getenv('RETENTION_ROLLUP_1M_DAYS', 30)),
+            'rollup_1h': int(os.getenv('RETENTION_ROLLUP_1H_DAYS', 365)),
+            'rollup_1d': int(os.getenv('RETENTION_ROLLUP_1D_DAYS', 0))
+        }
+        self.COMPACTION_INTERVAL = int(os.getenv('COMPACTION_INTERVAL', 3600))  # seconds
+        self.COMPACTION_BATCH_SIZE = int(os.getenv('COMPACTION_BATCH_SIZE', 5000))  # rows per delete
+        self.COMPACTION_LOCK_FILE = os.getenv(
+            'COMPACTION_LOCK_FILE', str(Path(__file__).parent.parent / 'compactor.lock')
+        )  # only the worker holding it compacts
+        
     def _get_database_uri(self):
         """Get database URI based on type"""
         if self.DATABASE_TYPE == 'sqlite':
@@ -49,5 +104,11 @@ class ServerConfig:
             return f'postgresql://{user}:{password}@{host}:{port}/{name}'
         else:
             raise ValueError(f"Unsupported database type: {self.DATABASE_TYPE}")
+    
+    def _get_engine_options(self):
+        """Engine options; with several workers SQLite writers wait for the lock instead of failing"""
+        if self.DATABASE_TYPE == 'sqlite':
+            return {'connect_args': {'timeout': 30}}
+        return {'pool_pre_ping': True}
 
 config = ServerConfig()
@@ -16,12 +16,12 @@ document.addEventListener('DOMContentLoaded', function() {
     loadDevices();
     initCharts();
     
-    // Refresh data every 30 seconds
-    setInterval(() => {
+    // Refresh when devices upload new data
+    subscribeToUpdates('/stream', () => {
         loadDashboardStats();
         loadDevices();
         updateCharts();
-    }, 30000);
+    }, 5000);
 });
 
 /**
@@ -56,7 +56,7 @@ async function loadDashboardStats() {
  */
 async function loadDevices() {
     try {
-        const response = await fetch(`${API_BASE_URL}/devices`);
+        const response = await fetch(`${API_BASE_URL}/devices?fields=device_id,hostname,platform,is_active,last_seen`);
         const data = await response.json();
         
         const tbody = document.getElementById('devices-tbody');
@@ -180,8 +180,8 @@ function initCharts() {
  */
 async function updateCharts() {
     try {
-        // Get all devices
-        const devicesResponse = await fetch(`${API_BASE_URL}/devices`);
+        // Get the most recently seen device
+        const devicesResponse = await fetch(`${API_BASE_URL}/devices?limit=1&fields=device_id`);
         const devicesData = await devicesResponse.json();
         
         if (!devicesData.devices || devicesData.devices.length === 0) {
@@ -190,7 +190,7 @@ async function updateCharts() {
         
         // Get stats for the first device (you can modify this to aggregate all devices)
         const firstDevice = devicesData.devices[0];
-        const statsResponse = await fetch(`${API_BASE_URL}/devices/${firstDevice.device_id}/stats?limit=20`);
+        const statsResponse = await fetch(`${API_BASE_URL}/devices/${firstDevice.device_id}/stats?limit=20&fields=timestamp,cpu_percent,memory_percent`);
         const statsData = await statsResponse.json();
         
         if (!statsData.stats || statsData.stats.length === 0) {
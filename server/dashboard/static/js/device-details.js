@@ -15,11 +15,11 @@ document.addEventListener('DOMContentLoaded', function() {
     if (deviceId) {
         loadDeviceDetails();
         
-        // Refresh data every 30 seconds
-        setInterval(() => {
+        // Refresh when this device uploads new data
+        subscribeToUpdates(`/devices/${encodeURIComponent(deviceId)}/stream`, () => {
             loadDeviceDetails();
             updateCharts();
-        }, 30000);
+        });
     } else {
         showError();
     }
@@ -352,9 +352,9 @@ async function loadScreenshots() {
         container.innerHTML = data.screenshots.map(screenshot => `
             <div class="screenshot-card">
                 <div class="screenshot-image">
-                    <img src="/api/v1/screenshots/${screenshot.filename}" 
+                    <img src="${screenshot.url}" 
                          alt="Screenshot" 
-                         onclick="viewFullScreenshot('${screenshot.filename}')">
+                         onclick="viewFullScreenshot('${screenshot.url}')">
                 </div>
                 <div class="screenshot-info">
                     <div class="screenshot-time">
@@ -378,8 +378,7 @@ async function loadScreenshots() {
 /**
  * View screenshot in full size
  */
-function viewFullScreenshot(filename) {
-    const url = `/api/v1/screenshots/${filename}`;
+function viewFullScreenshot(url) {
     window.open(url, '_blank');
 }
 
@@ -9,8 +9,8 @@ let allDevices = [];
 document.addEventListener('DOMContentLoaded', function() {
     loadAllDevices();
     
-    // Refresh every 30 seconds
-    setInterval(loadAllDevices, 30000);
+    // Refresh when devices register or upload new data
+    subscribeToUpdates('/stream', loadAllDevices, 5000);
     
     // Search functionality
     document.getElementById('search-input').addEventListener('input', function(e) {
@@ -9,9 +9,60 @@ console.log('🚀 Device Monitor System Loaded');
 const CONFIG = {
     apiBaseUrl: '/api/v1',
     refreshInterval: 30000, // 30 seconds
+    slowRefreshInterval: 300000, // 5 minutes, alongside live updates
 };
 
 // Initialize app
 document.addEventListener('DOMContentLoaded', function() {
     console.log('✅ Application initialized');
 });
+
+/**
+ * Subscribe to live updates over server-sent events
+ * Calls onUpdate (debounced, so bursts of uploads cause one reload) whenever
+ * the server publishes new data. Falls back to polling without EventSource or
+ * when the server refuses the stream, and reloads every slowRefreshInterval
+ * regardless, so a missed event can't leave the page stale for long.
+ */
+function subscribeToUpdates(path, onUpdate, debounceMs = 1000) {
+    if (!window.EventSource) {
+        setInterval(onUpdate, CONFIG.refreshInterval);
+        return null;
+    }
+    
+    let timer = null;
+    const scheduleUpdate = () => {
+        if (timer) return;
+        timer = setTimeout(() => {
+            timer = null;
+            onUpdate();
+        }, debounceMs);
+    };
+    
+    setInterval(scheduleUpdate, CONFIG.slowRefreshInterval);
+    
+    const source = new EventSource(`${CONFIG.apiBaseUrl}${path}`);
+    ['system_stats', 'power_events', 'device'].forEach(type => {
+        source.addEventListener(type, scheduleUpdate);
+    });
+    
+    // After a reconnect (server restart, or dropped for falling behind)
+    // events may have been missed, so reload once
+    let connected = false;
+    source.addEventListener('open', () => {
+        if (connected) scheduleUpdate();
+        connected = true;
+    });
+    
+    // A refused stream (e.g. 503, too many live clients) is not retried
+    // by the browser, so poll instead
+    let polling = null;
+    source.addEventListener('error', () => {
+        if (source.readyState === EventSource.CLOSED && !polling) {
+            console.warn('Live updates unavailable, polling instead');
+            polling = setInterval(onUpdate, CONFIG.refreshInterval);
+        }
+    });
+    
+    return source;
+}
@@ -0,0 +1,50 @@
+"""
+Gunicorn settings for the Device Monitor server
+Usage: gunicorn -c server/gunicorn.conf.py server.wsgi:app
+       (or python server/serve.py, which uses this file)
+
+Send SIGHUP to the master process for a graceful reload: new workers are
+started with the new code before the old ones finish their requests and exit
+"""
+
+import sys
+import subprocess
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+# Not imported as `config`, which is itself a gunicorn setting name
+from server.config.settings import config as server_config
+
+SERVE_SCRIPT = Path(__file__).parent / 'serve.py'
+
+bind = f"{server_config.HOST}:{server_config.PORT}"
+workers = server_config.WORKERS
+# Threaded workers, so live update streams don't pin a whole process each
+worker_class = 'gthread'
+threads = server_config.THREADS
+graceful_timeout = server_config.GRACEFUL_TIMEOUT
+keepalive = 5
+accesslog = '-'
+
+def _init_database():
+    """
+    Create tables and upgrade the schema before any worker starts
+    Runs in a child process: the master never imports the app, so workers
+    forked after a reload import the new code instead of inheriting the old
+    """
+    subprocess.run([sys.executable, str(SERVE_SCRIPT), '--init-db'], check=True)
+
+def on_starting(server):
+    _init_database()
+
+def on_reload(server):
+    # New code may bring new tables or indexes
+    _init_database()
+
+def post_fork(server, worker):
+    # Each live update stream holds one of this worker's threads while it is
+    # open; keep three quarters of them for ingest and API calls (runs before
+    # the worker imports the app, so the broker is created with this cap)
+    server_config.SSE_MAX_CLIENTS = min(server_config.SSE_MAX_CLIENTS, max(1, worker.cfg.threads // 4))
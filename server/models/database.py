@@ -16,7 +16,7 @@ class Device(db.Model):
     hostname = db.Column(db.String(200), nullable=False)
     platform = db.Column(db.String(50))
     platform_version = db.Column(db.String(100))
-    last_seen = db.Column(db.DateTime, default=datetime.utcnow)
+    last_seen = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
@@ -24,6 +24,7 @@ class Device(db.Model):
     power_events = db.relationship('PowerEvent', backref='device', lazy=True, cascade='all, delete-orphan')
     system_stats = db.relationship('SystemStat', backref='device', lazy=True, cascade='all, delete-orphan')
     session_events = db.relationship('SessionEvent', backref='device', lazy=True, cascade='all, delete-orphan')
+    metric_samples = db.relationship('MetricSample', backref='device', lazy=True, cascade='all, delete-orphan')
     
     def to_dict(self):
         """Convert device to dictionary"""
@@ -41,6 +42,9 @@ class Device(db.Model):
 class PowerEvent(db.Model):
     """Power event model - stores power state changes"""
     __tablename__ = 'power_events'
+    __table_args__ = (
+        db.Index('ix_power_events_device_timestamp', 'device_id', 'timestamp'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     device_id = db.Column(db.Integer, db.ForeignKey('devices.id'), nullable=False)
@@ -63,6 +67,9 @@ class PowerEvent(db.Model):
 class SystemStat(db.Model):
     """System statistics model - stores system metrics"""
     __tablename__ = 'system_stats'
+    __table_args__ = (
+        db.Index('ix_system_stats_device_timestamp', 'device_id', 'timestamp'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     device_id = db.Column(db.Integer, db.ForeignKey('devices.id'), nullable=False)
@@ -71,6 +78,15 @@ class SystemStat(db.Model):
     memory_percent = db.Column(db.Float)
     disk_percent = db.Column(db.Float)
     uptime = db.Column(db.Integer)  # in seconds
+    # Set when the agent pre-aggregates: cpu/memory_percent are then window averages
+    cpu_min = db.Column(db.Float)
+    cpu_max = db.Column(db.Float)
+    cpu_p95 = db.Column(db.Float)
+    memory_min = db.Column(db.Float)
+    memory_max = db.Column(db.Float)
+    memory_p95 = db.Column(db.Float)
+    sample_count = db.Column(db.Integer)
+    covered_seconds = db.Column(db.Float)  # time the window's probes measured, averages are weighted by it
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     def to_dict(self):
@@ -83,12 +99,49 @@ class SystemStat(db.Model):
             'memory_percent': self.memory_percent,
             'disk_percent': self.disk_percent,
             'uptime': self.uptime,
+            'cpu_min': self.cpu_min,
+            'cpu_max': self.cpu_max,
+            'cpu_p95': self.cpu_p95,
+            'memory_min': self.memory_min,
+            'memory_max': self.memory_max,
+            'memory_p95': self.memory_p95,
+            'sample_count': self.sample_count,
+            'covered_seconds': self.covered_seconds,
             'created_at': self.created_at.isoformat() + 'Z' if self.created_at else None
         }
 
+class MetricSample(db.Model):
+    """Metric sample model - detailed per-core, per-disk, network and process metrics"""
+    __tablename__ = 'metric_samples'
+    __table_args__ = (
+        db.Index('ix_metric_samples_device_timestamp', 'device_id', 'timestamp'),
+        db.Index('ix_metric_samples_device_metric_timestamp', 'device_id', 'metric', 'timestamp'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    device_id = db.Column(db.Integer, db.ForeignKey('devices.id'), nullable=False)
+    timestamp = db.Column(db.DateTime, nullable=False)
+    metric = db.Column(db.String(64), nullable=False)  # e.g. cpu.core, fs.percent, net.rx_bps
+    label = db.Column(db.String(128), nullable=False, default='')  # core, mountpoint, process, ...
+    value = db.Column(db.Float)
+    
+    def to_dict(self):
+        """Convert metric sample to dictionary"""
+        return {
+            'id': self.id,
+            'device_id': self.device_id,
+            'timestamp': self.timestamp.isoformat() + 'Z' if self.timestamp else None,
+            'metric': self.metric,
+            'label': self.label,
+            'value': self.value
+        }
+
 class SessionEvent(db.Model):
     """Session event model - stores login/logout events"""
     __tablename__ = 'session_events'
+    __table_args__ = (
+        db.Index('ix_session_events_device_start_time', 'device_id', 'start_time'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     device_id = db.Column(db.Integer, db.ForeignKey('devices.id'), nullable=False)
@@ -115,11 +168,15 @@ class SessionEvent(db.Model):
 class Screenshot(db.Model):
     """Screenshot model - stores device screenshots"""
     __tablename__ = 'screenshots'
+    __table_args__ = (
+        db.Index('ix_screenshots_device_timestamp', 'device_id', 'timestamp'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     device_id = db.Column(db.Integer, db.ForeignKey('devices.id'), nullable=False)
     filename = db.Column(db.String(255), nullable=False)
     filesize = db.Column(db.Float)  # in KB
+    sha256 = db.Column(db.String(64))  # blob key in the screenshot store, NULL for legacy files
     timestamp = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
@@ -130,6 +187,74 @@ class Screenshot(db.Model):
             'device_id': self.device_id,
             'filename': self.filename,
             'filesize': self.filesize,
+            'sha256': self.sha256,
             'timestamp': self.timestamp.isoformat() + 'Z' if self.timestamp else None,
             'created_at': self.created_at.isoformat() + 'Z' if self.created_at else None
         }
+
+class SystemStatRollup(db.Model):
+    """System statistics rollup - min/avg/max per device per time bucket"""
+    __tablename__ = 'system_stat_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('device_id', 'resolution', 'bucket_start', name='uq_system_stat_rollups_bucket'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    device_id = db.Column(db.Integer, db.ForeignKey('devices.id'), nullable=False)
+    resolution = db.Column(db.String(4), nullable=False)  # 1m, 1h, 1d
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    sample_count = db.Column(db.Integer, nullable=False, default=0)
+    # Sums and per-metric weights (seconds covered, else samples) keep averages exact as buckets merge
+    cpu_min = db.Column(db.Float)
+    cpu_max = db.Column(db.Float)
+    cpu_sum = db.Column(db.Float, default=0)
+    cpu_count = db.Column(db.Integer, default=0)
+    memory_min = db.Column(db.Float)
+    memory_max = db.Column(db.Float)
+    memory_sum = db.Column(db.Float, default=0)
+    memory_count = db.Column(db.Integer, default=0)
+    disk_min = db.Column(db.Float)
+    disk_max = db.Column(db.Float)
+    disk_sum = db.Column(db.Float, default=0)
+    disk_count = db.Column(db.Integer, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        """Convert rollup to dictionary, shaped like a raw stat plus min/max"""
+        def avg(total, count):
+            return round(total / count, 2) if count else None
+        
+        return {
+            'id': self.id,
+            'device_id': self.device_id,
+            'resolution': self.resolution,
+            'timestamp': self.bucket_start.isoformat() + 'Z' if self.bucket_start else None,
+            'sample_count': self.sample_count,
+            'cpu_percent': avg(self.cpu_sum, self.cpu_count),
+            'cpu_min': self.cpu_min,
+            'cpu_max': self.cpu_max,
+            'memory_percent': avg(self.memory_sum, self.memory_count),
+            'memory_min': self.memory_min,
+            'memory_max': self.memory_max,
+            'disk_percent': avg(self.disk_sum, self.disk_count),
+            'disk_min': self.disk_min,
+            'disk_max': self.disk_max
+        }
+
+class ChangeEvent(db.Model):
+    """Change feed - one row per ingest commit, so every worker process can notify its live clients"""
+    __tablename__ = 'change_events'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    device_id = db.Column(db.String(255))  # external id, NULL for fleet-wide changes
+    event = db.Column(db.String(32), nullable=False)
+    origin = db.Column(db.String(32), nullable=False)  # process that wrote it, which published it directly
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+class IngestedUpload(db.Model):
+    """Spooled uploads already committed, so one replayed after a lost ack is not written twice"""
+    __tablename__ = 'ingested_uploads'
+    
+    spool = db.Column(db.String(32), primary_key=True)  # uid of the spool file; upload ids are per spool
+    upload_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
@@ -0,0 +1,52 @@
+"""
+Schema upgrades for existing server databases
+db.create_all() only creates missing tables, so columns and indexes added to
+models later are created here (SQLite and PostgreSQL)
+"""
+
+from sqlalchemy import inspect, text
+from server.models.database import db
+
+def add_missing_columns(connection):
+    """Add nullable model columns that don't exist yet on already-created tables"""
+    inspector = inspect(connection)
+    existing_tables = set(inspector.get_table_names())
+    created = []
+
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            column_type = column.type.compile(dialect=connection.dialect)
+            connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+            created.append(f'{table.name}.{column.name}')
+
+    return created
+
+def create_missing_indexes(connection):
+    """Create model indexes that don't exist yet on already-created tables"""
+    inspector = inspect(connection)
+    existing_tables = set(inspector.get_table_names())
+    created = []
+
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=connection)
+                created.append(index.name)
+
+    return created
+
+def upgrade_schema():
+    """Bring an existing database up to the current models, returns the changes made"""
+    with db.engine.begin() as connection:
+        # Columns first, new indexes may cover them
+        return add_missing_columns(connection) + create_missing_indexes(connection)
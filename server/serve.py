@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Device Monitor Server - Production Launcher
+Runs the Flask app under gunicorn with several worker processes
+"""
+
+import sys
+import runpy
+import argparse
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from server.config.settings import config
+
+CONFIG_FILE = Path(__file__).parent / 'gunicorn.conf.py'
+
+def parse_args():
+    """Parse command line overrides for the gunicorn settings"""
+    parser = argparse.ArgumentParser(description='Run the Device Monitor server in production mode')
+    parser.add_argument('--workers', type=int, default=config.WORKERS, help='Worker processes')
+    parser.add_argument('--threads', type=int, default=config.THREADS, help='Threads per worker')
+    parser.add_argument('--bind', default=f"{config.HOST}:{config.PORT}", help='Address to listen on')
+    parser.add_argument('--init-db', action='store_true',
+                        help='Create tables and upgrade the schema, then exit')
+    return parser.parse_args()
+
+def main():
+    """Main function to run the server"""
+    args = parse_args()
+
+    if args.init_db:
+        from server.app import create_app, init_database
+        init_database(create_app(init_db=False, background_tasks=False))
+        return
+
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        print("❌ gunicorn is not installed (pip install -r requirements.txt), or use python server/app.py")
+        sys.exit(1)
+
+    class ServerApplication(BaseApplication):
+        """Gunicorn application loading server/gunicorn.conf.py plus command line overrides"""
+
+        def load_config(self):
+            settings = runpy.run_path(str(CONFIG_FILE))
+            for key, value in settings.items():
+                if key in self.cfg.settings and value is not None:
+                    self.cfg.set(key, value)
+            self.cfg.set('workers', args.workers)
+            self.cfg.set('threads', args.threads)
+            self.cfg.set('bind', [args.bind])
+
+        def load(self):
+            # Runs in each worker, never in the master; the database was initialized before they started
+            from server.app import create_app
+            return create_app(init_db=False)
+
+    print("=" * 80)
+    print("🚀 Device Monitor Server Starting (production)...")
+    print("=" * 80)
+    print(f"📡 Listening on: http://{args.bind}")
+    print(f"⚙️  Workers: {args.workers} x {args.threads} threads")
+    print(f"🗄️  Database: {config.DATABASE_TYPE}")
+    print("🔄 Graceful reload: kill -HUP <master pid>")
+    print("=" * 80)
+
+    ServerApplication().run()
+
+if __name__ == '__main__':
+    main()
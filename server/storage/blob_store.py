@@ -0,0 +1,110 @@
+"""
+Content-addressed blob store for uploaded screenshots
+Blobs are keyed by sha256 under a per-device namespace and sharded by hash
+prefix: <root>/<device pk>/<ab>/<abcdef...>. An upload is hashed while it is
+streamed to a temp file, then renamed into place, or discarded when the
+device already has an identical blob.
+"""
+
+import os
+import re
+import hashlib
+import tempfile
+from pathlib import Path
+from flask import Request
+from server.config.settings import config
+
+SHA256_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+class HashingUpload:
+    """Temp file that hashes everything written to it (used as the multipart file stream)"""
+
+    def __init__(self, directory):
+        self._file = tempfile.NamedTemporaryFile(dir=directory, prefix='upload_', delete=False)
+        self.path = self._file.name
+        self.hash = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self.hash.update(data)
+        self.size += len(data)
+        return self._file.write(data)
+
+    def __getattr__(self, name):
+        # seek/read/close etc. go to the underlying file
+        return getattr(self._file, name)
+
+class BlobStore:
+    def __init__(self, root):
+        """
+        Initialize the store
+        :param root: Directory holding all blobs
+        """
+        self.root = Path(root)
+        self.tmp_dir = self.root / 'tmp'
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+
+    def open_upload(self):
+        """New hashing temp file for an incoming upload"""
+        return HashingUpload(self.tmp_dir)
+
+    def path(self, device_pk, sha256):
+        """Where a device's blob lives"""
+        return self.root / str(device_pk) / sha256[:2] / sha256
+
+    def commit(self, device_pk, upload):
+        """
+        Move a finished upload into the store
+        :param upload: HashingUpload the request body was streamed into
+        :return: (sha256, size in bytes, True if a new blob was written)
+        """
+        upload.close()
+        sha256 = upload.hash.hexdigest()
+        target = self.path(device_pk, sha256)
+
+        if target.exists():
+            # Identical upload from this device, keep the existing blob
+            os.unlink(upload.path)
+            return sha256, upload.size, False
+
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(upload.path, target)
+        return sha256, upload.size, True
+
+    def discard(self, upload):
+        """Remove the temp file of an upload that won't be committed"""
+        upload.close()
+        try:
+            os.unlink(upload.path)
+        except FileNotFoundError:
+            pass
+
+    def delete(self, device_pk, sha256):
+        """Delete a device's blob if present"""
+        try:
+            self.path(device_pk, sha256).unlink()
+        except FileNotFoundError:
+            pass
+
+class UploadRequest(Request):
+    """
+    Request whose multipart file parts stream straight into the blob store's
+    temp dir; temp files not committed by the view are removed on close
+    """
+
+    blob_store = None
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if self.blob_store is None:
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+        upload = self.blob_store.open_upload()
+        self.__dict__.setdefault('_uploads', []).append(upload)
+        return upload
+
+    def close(self):
+        super().close()
+        for upload in self.__dict__.get('_uploads', ()):
+            self.blob_store.discard(upload)
+
+blob_store = BlobStore(config.SCREENSHOT_STORE_PATH)
+UploadRequest.blob_store = blob_store
@@ -0,0 +1,16 @@
+"""
+WSGI entry point for production servers
+Tables are created once before the gunicorn workers start (see
+server/gunicorn.conf.py), so importing this in every worker never runs create_all. With a different
+WSGI server run `python server/serve.py --init-db` once before starting it.
+"""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from server.app import create_app
+
+app = create_app(init_db=False)